@@ -1,5 +1,5 @@
 import os
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 import logging
 
 # Set up logging
@@ -37,4 +37,17 @@ def loadAI():
         
     except Exception as e:
         print(f"Error initializing OpenAI client: {e}")
-        raise
\ No newline at end of file
+        raise
+
+def createAsyncAI():
+    """
+    Create an async OpenAI client.
+
+    A new client is created per call because an async client is bound to the
+    event loop it is first used on. Close it with `await client.close()`.
+    OPENAI_BASE_URL is honoured, e.g. to point at mockOpenAI.py.
+    """
+    api_key = os.environ.get("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY environment variable is not set")
+    return AsyncOpenAI(api_key=api_key)
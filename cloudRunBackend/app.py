@@ -6,6 +6,7 @@ import shutil
 import tempfile
 import base64
 import uuid
+import hmac
 from pathlib import Path
 import logging
 from flask import Flask, request, jsonify, render_template
@@ -63,8 +64,14 @@ try:
     from videoAnalysis import summarize
     from imageAnalysis import analyzePhoto
     from cleanJson import cleanJson
-    from vectorImplementation import categorize
-    from nerImplementation import getLocations
+    from vectorImplementation import categorize_many, get_embedding_cache_stats, get_model_registry
+    from nerImplementation import extractLocationNamesBatch, submitLocationNames, collectLocations, get_ner_registry, get_ner_load_timings, get_geocode_cache_stats
+    import workerPool
+    from messageFilter import filter_status
+    import translationStage
+    from llmCache import make_key, cached_response, get_llm_cache_stats
+    from openaiScheduler import create_chat_completion, get_scheduler_stats
+    from stageMetrics import SessionMetrics, stage_scope, write_report
     
     # Import google_access module for the new functions
     import google_access
@@ -108,25 +115,29 @@ def processVideo(individualMessage, video):
     try:
         # Get video transcription
         logger.info("Starting transcription")
-        transcription = transcribe(video)
+        with stage_scope("transcribe"):
+            transcription = transcribe(video)
         if transcription:
             individualMessage['VIDEO_TRANSCRIPTION'] = transcription
             logger.info(f"Transcription successful: {transcription[:50]}...")
             
             logger.info("Starting transcription translation")
-            transcriptionTranslation = translate(transcription)
+            with stage_scope("translate"):
+                transcriptionTranslation = translate(transcription)
             individualMessage['TRANSCRIPTION_TRANSLATION'] = transcriptionTranslation
             logger.info("Translation complete")
 
         # Extract frames
         framesDir = video + "Frames"
         logger.info(f"Extracting frames to: {framesDir}")
-        extractFrames(video, framesDir)
+        with stage_scope("frame_extraction"):
+            extractFrames(video, framesDir)
         logger.info("Frame extraction complete")
 
         # Perform analysis of video frames
         logger.info("Starting video frame analysis")
-        summary = summarize(framesDir)
+        with stage_scope("summary"):
+            summary = summarize(framesDir)
         if summary:
             individualMessage['VIDEO_SUMMARY'] = summary
             logger.info(f"Video analysis complete: {summary[:50]}...")
@@ -152,34 +163,79 @@ def processImage(individualMessage, photo):
         logger.error(f"Error in processImage: {e}")
         logger.error(traceback.format_exc())
 
-def processCategories(individualMessage, fullText):
-    logger.info(f"Processing categories for text: {fullText[:50]}...")
+def processCategoriesBatch(messages, fullTexts):
+    logger.info(f"Processing categories for {len(fullTexts)} messages in batch")
     try:
-        categories = categorize(fullText)
-        if categories:
-            individualMessage['CATEGORIES'] = categories
-            logger.info(f"Categories assigned: {categories}")
-        else:
-            logger.warning("Category processing returned None")
+        results = categorize_many(fullTexts)
+        for individualMessage, categories in zip(messages, results):
+            if categories:
+                individualMessage['CATEGORIES'] = categories
+            else:
+                logger.warning("Category processing returned None")
+        logger.info(f"Categories assigned for {len(results)} messages")
     except Exception as e:
-        logger.error(f"Error in processCategories: {e}")
+        logger.error(f"Error in processCategoriesBatch: {e}")
         logger.error(traceback.format_exc())
 
-def processLocations(individualMessage, fullText):
-    logger.info(f"Processing locations for text: {fullText[:50]}...")
+def startLocationsBatch(fullTexts):
+    """Run NER over all texts and schedule geocoding; returns one list of futures per text"""
+    logger.info(f"Extracting locations for {len(fullTexts)} messages in batch")
     try:
-        locations = getLocations(fullText)
-        if locations:
-            individualMessage['LOCATIONS'] = locations
-            logger.info(f"Locations found: {locations}")
-        else:
-            logger.warning("Location processing returned None")
+        return [submitLocationNames(names) for names in extractLocationNamesBatch(fullTexts)]
     except Exception as e:
-        logger.error(f"Error in processLocations: {e}")
+        logger.error(f"Error in startLocationsBatch: {e}")
         logger.error(traceback.format_exc())
+        return [[] for _ in fullTexts]
+
+def finishLocationsBatch(messages, pendingLocations):
+    """Wait for scheduled geocoding and attach the locations to the messages"""
+    found = 0
+    for individualMessage, futures in zip(messages, pendingLocations):
+        try:
+            locations = collectLocations(futures)
+            if locations:
+                individualMessage['LOCATIONS'] = locations
+                found += 1
+        except Exception as e:
+            logger.error(f"Error in finishLocationsBatch: {e}")
+            logger.error(traceback.format_exc())
+    logger.info(f"Locations found for {found} of {len(messages)} messages")
 
-def processJson(messageData, processedDirPath):
+def processTextsWithPool(messages, fullTexts):
+    logger.info(f"Processing categories and locations for {len(fullTexts)} messages with worker pool")
+    try:
+        pendingLocations = []
+        offset = 0
+        try:
+            for categories, locationNames in workerPool.iter_process_texts(fullTexts):
+                for individualMessage, messageCategories in zip(messages[offset:], categories):
+                    if messageCategories:
+                        individualMessage['CATEGORIES'] = messageCategories
+                # Geocode in this process so the provider's rate limit is respected,
+                # while the workers carry on with the next chunks
+                pendingLocations.extend(submitLocationNames(names) for names in locationNames)
+                offset += len(categories)
+        except workerPool.WorkerInitError as e:
+            # Workers that cannot load the models never will; finish in-process
+            logger.error(f"Worker pool unusable, processing the remaining {len(fullTexts) - offset} messages in-process: {e}")
+            workerPool.disable_pool()
+            pendingLocations.extend(startLocationsBatch(fullTexts[offset:]))
+            processCategoriesBatch(messages[offset:], fullTexts[offset:])
+        finishLocationsBatch(messages, pendingLocations)
+        logger.info(f"Worker pool processing complete for {len(fullTexts)} messages")
+    except Exception as e:
+        logger.error(f"Error in processTextsWithPool: {e}")
+        logger.error(traceback.format_exc())
+
+def processJson(messageData, processedDirPath, metrics=None):
+    """
+    Enrich the messages of an export in place.
+
+    metrics, a SessionMetrics, collects time, tokens and cost per message and stage.
+    """
     logger.info(f"Processing JSON with {len(messageData)} messages")
+    if metrics is None:
+        metrics = SessionMetrics()
     try:
         # Count how many messages we'll actually process
         service_count = sum(1 for msg in messageData if msg.get("type") == "service")
@@ -189,6 +245,23 @@ def processJson(messageData, processedDirPath):
         filtered_messages = [msg for msg in messageData if msg.get("type") != "service"]
         logger.info(f"After filtering, processing {len(filtered_messages)} messages")
         
+        # Messages and texts to categorize and geocode together once the loop is done
+        category_messages = []
+        category_texts = []
+        filtered_reasons = {}
+        
+        # Translate all message texts up front, many requests in flight at once
+        translated_up_front = translationStage.stage_enabled()
+        if translated_up_front:
+            try:
+                text_ids = [msg.get("id") for msg in filtered_messages if msg.get("text")]
+                with metrics.measure(text_ids, "translate"):
+                    translationStage.translate_messages(filtered_messages)
+            except Exception as e:
+                logger.error(f"Error in translation stage, translating one by one: {e}")
+                logger.error(traceback.format_exc())
+                translated_up_front = False
+        
         # Now process each message
         for i, individualMessage in enumerate(filtered_messages):
             logger.info(f"Processing message {i+1}/{len(filtered_messages)}")
@@ -197,22 +270,26 @@ def processJson(messageData, processedDirPath):
             if 'source_file' not in individualMessage:
                 individualMessage['source_file'] = os.path.basename(processedDirPath)
             
+            message_ids = [individualMessage.get("id")]
             text = individualMessage.get("text")
-            if text:
+            if text and not translated_up_front:
                 logger.info("Message contains text")
-                processText(individualMessage, text)
+                with metrics.measure(message_ids, "translate"):
+                    processText(individualMessage, text)
             
             video = individualMessage.get("file")
             if video and video != "(File exceeds maximum size. Change data exporting settings to download.)":
                 logger.info("Message contains video")
                 video_path = (f"{processedDirPath}/{video}").replace("\\", "/")
-                processVideo(individualMessage, video_path)
+                with metrics.measure(message_ids, "video"):
+                    processVideo(individualMessage, video_path)
 
             photo = individualMessage.get("photo")
             if photo and photo != "(File exceeds maximum size. Change data exporting settings to download.)":
                 logger.info("Message contains photo")
                 photo_path = (f"{processedDirPath}/{photo}").replace("\\", "/")
-                processImage(individualMessage, photo_path)
+                with metrics.measure(message_ids, "photo_analysis"):
+                    processImage(individualMessage, photo_path)
 
             fullText = ""
             if individualMessage.get("TRANSLATED_TEXT"):
@@ -228,9 +305,37 @@ def processJson(messageData, processedDirPath):
                 fullText += individualMessage["PHOTO_ANALYSIS"]
 
             if fullText:
+                # Trivial texts (emoji, "+1", bare links) skip categorization and NER
+                prefilter = filter_status(fullText)
+                if prefilter:
+                    individualMessage['PREFILTER'] = prefilter
+                    filtered_reasons[prefilter['reason']] = filtered_reasons.get(prefilter['reason'], 0) + 1
+                    continue
                 logger.info(f"Processing full text of length {len(fullText)}")
-                processCategories(individualMessage, fullText)
-                processLocations(individualMessage, fullText)
+                category_messages.append(individualMessage)
+                category_texts.append(fullText)
+        
+        if filtered_reasons:
+            logger.info(f"Pre-filter skipped {sum(filtered_reasons.values())} trivial messages: {filtered_reasons}")
+        
+        if category_texts:
+            category_ids = [msg.get("id") for msg in category_messages]
+            if workerPool.pool_enabled():
+                # Spread encoding and NER over the worker processes; the two
+                # are interleaved there, so they are timed as one stage
+                with metrics.measure(category_ids, "categorize_ner_geocode"):
+                    processTextsWithPool(category_messages, category_texts)
+            else:
+                # Stream all texts through the NER pipeline with nlp.pipe and
+                # geocode in the background while the encoder runs
+                with metrics.measure(category_ids, "ner_geocode"):
+                    pendingLocations = startLocationsBatch(category_texts)
+                # Categorize all messages with a single batched encoder pass
+                with metrics.measure(category_ids, "categorize"):
+                    processCategoriesBatch(category_messages, category_texts)
+                # Only the geocoding still running after categorization is waited for here
+                with metrics.measure(category_ids, "ner_geocode"):
+                    finishLocationsBatch(category_messages, pendingLocations)
         
         # Replace the original messageData with our filtered and processed messages
         messageData.clear()
@@ -246,6 +351,108 @@ def health_check():
     """Simple health check endpoint"""
     return jsonify({"status": "healthy"}), 200
 
+@app.route('/embedding-cache-stats', methods=['GET'])
+def embedding_cache_stats():
+    """API endpoint to report embedding cache hit/miss counters"""
+    try:
+        stats = get_embedding_cache_stats()
+        return jsonify({"success": True, "enabled": stats is not None, "stats": stats or {}})
+    except Exception as e:
+        logger.error(f"Error reading embedding cache stats: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/llm-cache-stats', methods=['GET'])
+def llm_cache_stats():
+    """API endpoint to report LLM response cache hit/miss counters"""
+    try:
+        stats = get_llm_cache_stats()
+        return jsonify({"success": True, "enabled": stats is not None, "stats": stats or {}})
+    except Exception as e:
+        logger.error(f"Error reading LLM cache stats: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/openai-stats', methods=['GET'])
+def openai_stats():
+    """API endpoint to report OpenAI request counters, concurrency and rate limit budgets per model"""
+    try:
+        return jsonify({"success": True, "models": get_scheduler_stats()})
+    except Exception as e:
+        logger.error(f"Error reading OpenAI scheduler stats: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/geocode-cache-stats', methods=['GET'])
+def geocode_cache_stats():
+    """API endpoint to report geocode cache hit/miss counters"""
+    try:
+        stats = get_geocode_cache_stats()
+        return jsonify({"success": True, "enabled": stats is not None, "stats": stats or {}})
+    except Exception as e:
+        logger.error(f"Error reading geocode cache stats: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify({"success": False, "error": str(e)}), 500
+
+def getModelRegistries():
+    """Return the model registries that are configured, keyed by model name"""
+    registries = {"vector": get_model_registry(), "ner": get_ner_registry()}
+    return {name: registry for name, registry in registries.items() if registry is not None}
+
+@app.route('/models', methods=['GET'])
+def model_versions():
+    """API endpoint to report the active version of each versioned model and NER load timings"""
+    try:
+        registries = getModelRegistries()
+        return jsonify({
+            "success": True,
+            "models": {name: registry.status() for name, registry in registries.items()},
+            "ner_load_timings": get_ner_load_timings()
+        })
+    except Exception as e:
+        logger.error(f"Error reading model versions: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/models/reload', methods=['POST'])
+def reload_model():
+    """
+    API endpoint to load a model version and swap it in without a restart.
+
+    Expects {"model": "vector" | "ner", "version": optional version name}.
+    A version is written to the versions directory's CURRENT file, so it stays
+    active across polls and worker processes switch to it through their own
+    watchers. Without a version, the version selected in the versions
+    directory is loaded.
+    """
+    # Disabled unless an admin token is configured
+    admin_token = os.environ.get("ADMIN_TOKEN")
+    if not admin_token:
+        return jsonify({"success": False, "error": "Model reloading is disabled (ADMIN_TOKEN not set)"}), 403
+    if not hmac.compare_digest(request.headers.get("X-Admin-Token", ""), admin_token):
+        return jsonify({"success": False, "error": "Unauthorized"}), 401
+
+    try:
+        data = request.get_json(silent=True) or {}
+        registries = getModelRegistries()
+        name = data.get("model")
+        if name not in registries:
+            return jsonify({
+                "success": False,
+                "error": f"Unknown or unversioned model: {name}",
+                "models": list(registries.keys())
+            }), 400
+
+        registry = registries[name]
+        started = registry.reload(data.get("version"), wait=bool(data.get("wait", False)))
+        return jsonify({"success": True, "started": started, "status": registry.status()}), 202
+    except FileNotFoundError as e:
+        return jsonify({"success": False, "error": str(e)}), 404
+    except Exception as e:
+        logger.error(f"Error reloading model: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify({"success": False, "error": str(e)}), 500
+
 # PHASE 1: Initialize processing session with JSON data
 @app.route('/process-json-init', methods=['POST'])
 def process_json_init():
@@ -518,9 +725,11 @@ def finalize_processing():
                 message_data = json_data.get("messages", [])
                 logs.append(f"Found {len(message_data)} messages")
                 
-                # Process the messages
+                # Process the messages; /session-status shows the metrics while this runs
                 logs.append("Processing messages")
-                processJson(message_data, processed_dir_path)
+                metrics = SessionMetrics()
+                session['metrics'] = metrics
+                processJson(message_data, processed_dir_path, metrics)
                 logs.append("Messages processed successfully")
             
             # Write the processed JSON
@@ -528,6 +737,10 @@ def finalize_processing():
                 json.dump(json_data, f, ensure_ascii=False, indent=4)
             logs.append("Processed JSON written to file")
             
+            # Write the per-stage metrics next to it
+            if write_report(metrics, result_json_path):
+                logs.append("Pipeline metrics written to file")
+            
             # Read the processed result to return
             with open(result_json_path, 'r', encoding='utf-8') as f:
                 result = json.load(f)
@@ -655,7 +868,8 @@ def process_json_api():
                     
                     # Process the messages
                     logs.append("Processing messages")
-                    processJson(message_data, processed_dir_path)
+                    metrics = SessionMetrics()
+                    processJson(message_data, processed_dir_path, metrics)
                     logs.append("Messages processed successfully")
                 
                 # Write the processed JSON
@@ -663,6 +877,10 @@ def process_json_api():
                     json.dump(json_data, f, ensure_ascii=False, indent=4)
                 logs.append("Processed JSON written to file")
                 
+                # Write the per-stage metrics next to it
+                if write_report(metrics, result_json_path):
+                    logs.append("Pipeline metrics written to file")
+                
                 # Read the processed result to return
                 with open(result_json_path, 'r', encoding='utf-8') as f:
                     result = json.load(f)
@@ -753,14 +971,19 @@ def ask():
             f"<start>{user_input}<end>"
         )
         
-        # Get AI response
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=500  # Increased for more detailed responses
-        )
+        # Get AI response (served from the LLM cache for a repeated question on the same data)
+        messages = [{"role": "user", "content": prompt}]
+        
+        def fetch():
+            response = create_chat_completion(
+                client,
+                model="gpt-4o",
+                messages=messages,
+                max_tokens=500  # Increased for more detailed responses
+            )
+            return response.choices[0].message.content
         
-        ai_response = response.choices[0].message.content
+        ai_response = cached_response(make_key("gpt-4o", messages, {"max_tokens": 500}), fetch)
         
         return jsonify({
             "success": True, 
@@ -787,7 +1010,8 @@ def generate_summary():
         prompt_data = google_access.GetData()
         
         # Call AI API
-        response = client.chat.completions.create(
+        response = create_chat_completion(
+            client,
             model="gpt-4o",
             messages=[
                 {"role": "system", "content": "Generate a summary report of the following dataframe:" + prompt_data},
@@ -832,12 +1056,18 @@ def session_status(session_id):
         total_received = len(session['received_media'])
         progress = (total_received / total_expected * 100) if total_expected > 0 else 100
         
+        # Time, tokens and cost per stage once processing has started
+        # (?messages=true adds the per-message breakdown)
+        metrics = session.get('metrics')
+        include_messages = request.args.get('messages', 'false').lower() == 'true'
+        
         return jsonify({
             "success": True,
             "status": session['status'],
             "progress": progress,
             "totalReceived": total_received,
-            "totalExpected": total_expected
+            "totalExpected": total_expected,
+            "metrics": metrics.report(include_messages) if metrics else None
         })
     
     except Exception as e:
@@ -0,0 +1,48 @@
+import os
+import sys
+import json
+import logging
+
+from nerImplementation import (
+    CHECKSUM_SUFFIX,
+    NER_EXTRACT_CACHE_DIR,
+    archive_checksum,
+    build_nlp_pipeline,
+    get_ner_load_timings,
+)
+
+# Set up logging
+logger = logging.getLogger("ner_implementation")
+
+def bake(model_package_path: str) -> dict:
+    """
+    Prepare a NER model package at build time so runtime never extracts or downloads.
+
+    Writes the archive's SHA-256 to a sidecar file, extracts the archive into
+    the checksum-keyed cache (NER_EXTRACT_CACHE_DIR, which must be the same at
+    runtime) and loads the full pipeline once (custom model,
+    en_core_web_sm and the merge components) to fail the build early if
+    anything is missing.
+
+    Args:
+        model_package_path: NER model package directory
+
+    Returns:
+        Phase timings of the verification load
+    """
+    archive_path = os.path.join(model_package_path, "ner_model.tar.gz")
+    if os.path.exists(archive_path):
+        checksum = archive_checksum(archive_path)
+        with open(archive_path + CHECKSUM_SUFFIX, 'w') as f:
+            f.write(f"{checksum}  {os.path.basename(archive_path)}\n")
+        logger.info(f"NER archive checksum: {checksum}")
+
+    logger.info(f"Baking extracted NER model into {NER_EXTRACT_CACHE_DIR}")
+    build_nlp_pipeline(model_package_path)
+    return get_ner_load_timings()
+
+if __name__ == "__main__":
+    # Build-time step: python bakeNerModel.py /app/models/ner_model_package
+    logging.basicConfig(level=logging.INFO)
+    package_path = sys.argv[1] if len(sys.argv) > 1 else os.environ.get("NER_MODEL_PATH", "/app/models/ner_model_package")
+    print(json.dumps(bake(package_path), indent=2))
@@ -0,0 +1,515 @@
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import argparse
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from aiLoader import loadAI
+from helpers import TRANSLATION_MODEL, buildTranslationPrompt
+from imageAnalysis import PHOTO_MODEL, PHOTO_PROMPT, encodeFrame, buildPhotoMessages
+from themePrompts import THEME_MODEL, buildThemeMessages, parseThemes, mergeThemes
+from llmCache import make_key, hash_file, get_llm_cache
+from languageId import local_translation
+
+# Set up logging
+logger = logging.getLogger("json-processor-api")
+
+# =====================================================================
+# CONFIGURATION - Use environment variables for Cloud Run compatibility
+# =====================================================================
+
+# Time the Batch API is given to finish a batch
+BATCH_COMPLETION_WINDOW = os.environ.get("BATCH_COMPLETION_WINDOW", "24h")
+
+# Seconds between status checks, and how long to wait before giving up
+BATCH_POLL_INTERVAL = float(os.environ.get("BATCH_POLL_INTERVAL_SECONDS", "60"))
+BATCH_TIMEOUT = float(os.environ.get("BATCH_TIMEOUT_SECONDS", str(26 * 3600)))
+
+# Batch API limits per input file (50,000 requests, 200 MB), with some headroom
+BATCH_MAX_REQUESTS = int(os.environ.get("BATCH_MAX_REQUESTS", "50000"))
+BATCH_MAX_BYTES = int(os.environ.get("BATCH_MAX_BYTES", str(190 * 1024 * 1024)))
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+# Batch statuses after which the batch will not change any more
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+# Telegram writes "(File exceeds maximum size. ...)" or "(File not included. ...)"
+# instead of the file name for media it did not export
+MISSING_FILE_PREFIX = "(File "
+
+# Phases run in this order; themes are built from the English text of the first
+PHASES = ["enrich", "themes"]
+
+STATE_FILE = "batch_state.json"
+
+class BatchItem:
+    """One chat completion request of a batch and how to merge its reply back."""
+
+    def __init__(self, custom_id: str, model: str, messages: List[Dict], cache_key: str, apply: Callable[[str], None]):
+        self.custom_id = custom_id
+        self.model = model
+        self.messages = messages
+        self.cache_key = cache_key
+        # Writes the reply into the message; raises if the reply does not parse
+        self.apply = apply
+
+    def to_line(self) -> Dict[str, Any]:
+        """Request line in the Batch API input format"""
+        return {
+            "custom_id": self.custom_id,
+            "method": "POST",
+            "url": BATCH_ENDPOINT,
+            "body": {"model": self.model, "messages": self.messages},
+        }
+
+class OpenAIBatchClient:
+    """Submits batch files to the OpenAI Batch API."""
+
+    def __init__(self, client=None):
+        self.client = client or loadAI()
+
+    def submit(self, input_path: str) -> str:
+        with open(input_path, 'rb') as f:
+            input_file = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=BATCH_COMPLETION_WINDOW
+        )
+        return batch.id
+
+    def status(self, batch_id: str) -> str:
+        return self.client.batches.retrieve(batch_id).status
+
+    def results(self, batch_id: str) -> List[Dict]:
+        """Output and error lines of a finished batch"""
+        batch = self.client.batches.retrieve(batch_id)
+        lines = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                content = self.client.files.content(file_id).text
+                lines.extend(json.loads(line) for line in content.splitlines() if line.strip())
+        return lines
+
+def mock_responder(body: Dict) -> str:
+    """Answer a request body with mockOpenAI's canned replies"""
+    from mockOpenAI import mock_reply
+
+    prompt = ""
+    for message in body.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, str):
+            prompt += content
+        elif isinstance(content, list):
+            prompt += "".join(part.get("text", "") for part in content if part.get("type") == "text")
+    return mock_reply(prompt)
+
+class LocalBatchClient:
+    """
+    File-based stand-in for the Batch API, for running batch jobs offline.
+
+    Each submitted file is copied into its own directory and answered by
+    responder once it has been polled polls_to_complete times, producing an
+    output file in the Batch API output format.
+    """
+
+    def __init__(self, directory: str, responder: Callable[[Dict], str] = None, polls_to_complete: int = 1):
+        self.directory = directory
+        self.responder = responder or mock_responder
+        self.polls_to_complete = polls_to_complete
+        os.makedirs(directory, exist_ok=True)
+
+    def _batch_dir(self, batch_id: str) -> str:
+        return os.path.join(self.directory, batch_id)
+
+    def _read_state(self, batch_id: str) -> Dict:
+        with open(os.path.join(self._batch_dir(batch_id), "state.json"), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _write_state(self, batch_id: str, state: Dict) -> None:
+        with open(os.path.join(self._batch_dir(batch_id), "state.json"), 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+
+    def submit(self, input_path: str) -> str:
+        batch_id = f"batch_local_{uuid.uuid4().hex[:12]}"
+        os.makedirs(self._batch_dir(batch_id))
+        shutil.copyfile(input_path, os.path.join(self._batch_dir(batch_id), "input.jsonl"))
+        self._write_state(batch_id, {"status": "validating", "polls": 0})
+        return batch_id
+
+    def status(self, batch_id: str) -> str:
+        state = self._read_state(batch_id)
+        if state["status"] not in TERMINAL_STATUSES:
+            state["polls"] += 1
+            state["status"] = "in_progress"
+            if state["polls"] >= self.polls_to_complete:
+                self._run(batch_id)
+                state["status"] = "completed"
+            self._write_state(batch_id, state)
+        return state["status"]
+
+    def _run(self, batch_id: str) -> None:
+        batch_dir = self._batch_dir(batch_id)
+        with open(os.path.join(batch_dir, "input.jsonl"), 'r', encoding='utf-8') as f_in, \
+                open(os.path.join(batch_dir, "output.jsonl"), 'w', encoding='utf-8') as f_out:
+            for line in f_in:
+                if not line.strip():
+                    continue
+                request = json.loads(line)
+                request_id = f"req_{uuid.uuid4().hex[:12]}"
+                try:
+                    content = self.responder(request["body"])
+                    result = {
+                        "id": f"batch_req_{uuid.uuid4().hex[:12]}",
+                        "custom_id": request["custom_id"],
+                        "response": {
+                            "status_code": 200,
+                            "request_id": request_id,
+                            "body": {
+                                "object": "chat.completion",
+                                "model": request["body"].get("model"),
+                                "choices": [{
+                                    "index": 0,
+                                    "message": {"role": "assistant", "content": content},
+                                    "finish_reason": "stop",
+                                }],
+                            },
+                        },
+                        "error": None,
+                    }
+                except Exception as e:
+                    result = {
+                        "id": f"batch_req_{uuid.uuid4().hex[:12]}",
+                        "custom_id": request["custom_id"],
+                        "response": {
+                            "status_code": 500,
+                            "request_id": request_id,
+                            "body": {"error": {"message": str(e), "type": "server_error"}},
+                        },
+                        "error": None,
+                    }
+                f_out.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+    def results(self, batch_id: str) -> List[Dict]:
+        path = os.path.join(self._batch_dir(batch_id), "output.jsonl")
+        if not os.path.exists(path):
+            return []
+        with open(path, 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+def _apply_translation(message: Dict) -> Callable[[str], None]:
+    def apply(content):
+        result = json.loads(content)
+        message['LANGUAGE'] = result.get("language", "unknown")
+        message['TRANSLATED_TEXT'] = result.get("translation", "")
+    return apply
+
+def _apply_photo(message: Dict) -> Callable[[str], None]:
+    def apply(content):
+        message['PHOTO_ANALYSIS'] = content.strip()
+    return apply
+
+def _apply_themes(message: Dict, field: str) -> Callable[[str], None]:
+    def apply(content):
+        mergeThemes(message.setdefault('SUBTOPICS', []), parseThemes(content))
+        fields = message.setdefault('SUBTOPIC_FIELDS', [])
+        if field not in fields:
+            fields.append(field)
+    return apply
+
+def build_enrichment_items(messages: List[Dict], media_dir: str) -> List[BatchItem]:
+    """Translation and photo analysis requests for messages that do not have them yet"""
+    items = []
+    for index, message in enumerate(messages):
+        if message.get("type") == "service":
+            continue
+        message_id = message.get("id")
+
+        text = message.get("text")
+        if text and isinstance(text, str) and "TRANSLATED_TEXT" not in message:
+            local = local_translation(text)
+            if local is not None:
+                # English and letterless texts do not need the LLM
+                message['LANGUAGE'] = local["language"]
+                message['TRANSLATED_TEXT'] = local["translation"]
+            else:
+                chat = [{"role": "user", "content": buildTranslationPrompt(text)}]
+                items.append(BatchItem(
+                    f"translate:{index}:{message_id}", TRANSLATION_MODEL, chat,
+                    make_key(TRANSLATION_MODEL, chat), _apply_translation(message)
+                ))
+
+        photo = message.get("photo")
+        if photo and not photo.startswith(MISSING_FILE_PREFIX) and "PHOTO_ANALYSIS" not in message:
+            photo_path = os.path.join(media_dir, photo)
+            base64Frame = encodeFrame(photo_path)
+            if not base64Frame:
+                continue
+            # Same key as analyzePhoto, so online and batch runs share cached replies
+            items.append(BatchItem(
+                f"photo:{index}:{message_id}", PHOTO_MODEL, buildPhotoMessages(base64Frame),
+                make_key(PHOTO_MODEL, PHOTO_PROMPT, media=[hash_file(photo_path)]), _apply_photo(message)
+            ))
+    return items
+
+def build_theme_items(messages: List[Dict]) -> List[BatchItem]:
+    """
+    Thematic analysis requests for the English text fields not analysed yet.
+
+    SUBTOPIC_FIELDS records the fields whose reply has been merged into
+    SUBTOPICS, so a field whose request failed is sent again on the next run.
+    Messages with SUBTOPICS but no SUBTOPIC_FIELDS come from an older run and
+    are left alone.
+    """
+    items = []
+    for index, message in enumerate(messages):
+        if message.get("type") == "service" or message.get("PREFILTER"):
+            continue
+        if "SUBTOPICS" in message and "SUBTOPIC_FIELDS" not in message:
+            continue
+        message_id = message.get("id")
+        done = message.get("SUBTOPIC_FIELDS", [])
+        for field in ("TRANSLATED_TEXT", "VIDEO_SUMMARY", "TRANSCRIPTION_TRANSLATION", "PHOTO_ANALYSIS"):
+            text = message.get(field)
+            if not text or not isinstance(text, str) or field in done:
+                continue
+            chat = buildThemeMessages(text)
+            items.append(BatchItem(
+                f"theme:{index}:{message_id}:{field}", THEME_MODEL, chat,
+                make_key(THEME_MODEL, chat), _apply_themes(message, field)
+            ))
+    return items
+
+def apply_cached(items: List[BatchItem]) -> List[BatchItem]:
+    """Apply replies already in the LLM cache and return the items still to submit"""
+    cache = get_llm_cache()
+    if cache is None:
+        return items
+
+    remaining = []
+    for item in items:
+        cached = cache.get(item.cache_key)
+        if cached is not None:
+            try:
+                item.apply(cached)
+                continue
+            except Exception as e:
+                logger.warning(f"Ignoring unparsable cached LLM response for {item.custom_id}: {e}")
+        remaining.append(item)
+    return remaining
+
+def write_batch_files(items: List[BatchItem], path_prefix: str) -> List[str]:
+    """
+    Write items as Batch API input files, split to stay within the per-file limits.
+
+    Args:
+        items: Requests to write
+        path_prefix: Files are named {path_prefix}_{n}.jsonl
+
+    Returns:
+        Paths of the files written
+    """
+    paths = []
+    f = None
+    count = 0
+    size = 0
+    try:
+        for item in items:
+            line = (json.dumps(item.to_line(), ensure_ascii=False) + "\n").encode("utf-8")
+            if f is None or count >= BATCH_MAX_REQUESTS or (count and size + len(line) > BATCH_MAX_BYTES):
+                if f is not None:
+                    f.close()
+                paths.append(f"{path_prefix}_{len(paths) + 1}.jsonl")
+                f = open(paths[-1], 'wb')
+                count = 0
+                size = 0
+            f.write(line)
+            count += 1
+            size += len(line)
+    finally:
+        if f is not None:
+            f.close()
+    return paths
+
+def wait_for_batch(batch_client, batch_id: str, poll_interval: float = None, timeout: float = None) -> str:
+    """Poll a batch until it reaches a terminal status and return that status"""
+    if poll_interval is None:
+        poll_interval = BATCH_POLL_INTERVAL
+    if timeout is None:
+        timeout = BATCH_TIMEOUT
+
+    deadline = time.time() + timeout
+    while True:
+        status = batch_client.status(batch_id)
+        if status in TERMINAL_STATUSES:
+            return status
+        if time.time() > deadline:
+            raise TimeoutError(f"Batch {batch_id} still {status} after {timeout:.0f} seconds")
+        logger.info(f"Batch {batch_id} is {status}, checking again in {poll_interval:.0f} seconds")
+        time.sleep(poll_interval)
+
+def reply_content(line: Dict) -> Optional[str]:
+    """Reply text of a Batch API output line, or None for a failed request"""
+    response = line.get("response") or {}
+    if line.get("error") or response.get("status_code") != 200:
+        return None
+    try:
+        return response["body"]["choices"][0]["message"]["content"]
+    except (KeyError, IndexError, TypeError):
+        return None
+
+def merge_results(items: List[BatchItem], lines: Iterable[Dict]) -> Dict[str, int]:
+    """
+    Merge Batch API output lines into the messages by custom_id.
+
+    Replies are written to the LLM cache once they have been applied.
+
+    Returns:
+        Counts of applied and failed requests
+    """
+    by_id = {item.custom_id: item for item in items}
+    cache = get_llm_cache()
+    counts = {"applied": 0, "failed": 0}
+
+    for line in lines:
+        item = by_id.get(line.get("custom_id"))
+        if item is None:
+            continue
+        content = reply_content(line)
+        if content is None:
+            logger.warning(f"Batch request {item.custom_id} failed: {line.get('error') or line.get('response')}")
+            counts["failed"] += 1
+            continue
+        try:
+            item.apply(content)
+        except Exception as e:
+            logger.warning(f"Could not merge reply for {item.custom_id}: {e}")
+            counts["failed"] += 1
+            continue
+        if cache is not None:
+            cache.put(item.cache_key, content)
+        counts["applied"] += 1
+    return counts
+
+def _load_state(work_dir: str) -> Dict:
+    path = os.path.join(work_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return {"batches": {}, "done": []}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _save_state(work_dir: str, state: Dict) -> None:
+    with open(os.path.join(work_dir, STATE_FILE), 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+
+def _write_json(path: str, data: Any) -> None:
+    """Write JSON next to path and rename it into place"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+    os.replace(tmp_path, path)
+
+def run_batch_job(result_json_path: str, batch_client, work_dir: str = None, media_dir: str = None,
+                  poll_interval: float = None, timeout: float = None) -> Dict[str, Dict[str, int]]:
+    """
+    Enrich a chat export through batch jobs instead of interactive requests.
+
+    Translation and photo analysis go in a first batch and thematic analysis
+    of the resulting English text in a second. Replies are merged into
+    result.json by custom_id after each phase. Submitted batch ids are kept
+    in work_dir, so a restarted job resumes polling instead of submitting
+    again; the state is removed once the job finishes.
+
+    Args:
+        result_json_path: Cleaned result.json of the export
+        batch_client: OpenAIBatchClient, LocalBatchClient or anything with
+            submit / status / results
+        work_dir: Where batch files and state go (defaults to a batch
+            directory next to result.json)
+        media_dir: Directory the photo paths are relative to (defaults to
+            the directory of result.json)
+        poll_interval: Seconds between status checks
+        timeout: Seconds to wait for each batch
+
+    Returns:
+        Request counts per phase
+    """
+    export_dir = os.path.dirname(os.path.abspath(result_json_path))
+    work_dir = work_dir or os.path.join(export_dir, "batch")
+    media_dir = media_dir or export_dir
+    os.makedirs(work_dir, exist_ok=True)
+
+    with open(result_json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    messages = data.get("messages", []) if isinstance(data, dict) else data
+
+    state = _load_state(work_dir)
+    summary = {}
+    for phase in PHASES:
+        if phase in state["done"]:
+            logger.info(f"Batch phase {phase} already merged, skipping")
+            continue
+
+        items = build_enrichment_items(messages, media_dir) if phase == "enrich" else build_theme_items(messages)
+        requested = len(items)
+        items = apply_cached(items)
+        counts = {"requests": requested, "cached": requested - len(items), "applied": 0, "failed": 0}
+
+        if items:
+            batch_ids = state["batches"].get(phase)
+            if not batch_ids:
+                paths = write_batch_files(items, os.path.join(work_dir, f"{phase}_requests"))
+                batch_ids = [batch_client.submit(path) for path in paths]
+                state["batches"][phase] = batch_ids
+                _save_state(work_dir, state)
+                logger.info(f"Submitted {len(items)} {phase} requests in {len(batch_ids)} batches: {batch_ids}")
+
+            for batch_id in batch_ids:
+                status = wait_for_batch(batch_client, batch_id, poll_interval, timeout)
+                if status != "completed":
+                    # Expired batches still return the requests that did finish
+                    logger.error(f"Batch {batch_id} ended as {status}")
+                merged = merge_results(items, batch_client.results(batch_id))
+                counts["applied"] += merged["applied"]
+                counts["failed"] += merged["failed"]
+
+        counts["missing"] = len(items) - counts["applied"] - counts["failed"]
+        summary[phase] = counts
+        _write_json(result_json_path, data)
+        state["done"].append(phase)
+        _save_state(work_dir, state)
+        logger.info(f"Batch phase {phase} merged into {result_json_path}: {counts}")
+
+    # Finished: a new run only submits what is still missing
+    os.remove(os.path.join(work_dir, STATE_FILE))
+    return summary
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Enrich a chat export's result.json through the OpenAI Batch API")
+    parser.add_argument("result_json", help="Path to result.json")
+    parser.add_argument("--work-dir", help="Directory for batch files and state (default: batch/ next to result.json)")
+    parser.add_argument("--clean", action="store_true", help="Run cleanJson on result.json first (raw Telegram exports)")
+    parser.add_argument("--local", metavar="DIR", help="Answer batches offline with the local stand-in, keeping its files in DIR")
+    parser.add_argument("--poll-interval", type=float, help="Seconds between status checks")
+    args = parser.parse_args()
+
+    if args.clean:
+        from cleanJson import cleanJson
+        cleanJson(args.result_json)
+
+    if args.local:
+        batch_client = LocalBatchClient(args.local)
+        poll_interval = args.poll_interval if args.poll_interval is not None else 0
+    else:
+        batch_client = OpenAIBatchClient()
+        poll_interval = args.poll_interval
+
+    summary = run_batch_job(args.result_json, batch_client, work_dir=args.work_dir, poll_interval=poll_interval)
+    json.dump(summary, sys.stdout, indent=2)
+    print()
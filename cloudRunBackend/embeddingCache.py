@@ -0,0 +1,238 @@
+import os
+import hashlib
+import sqlite3
+import threading
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# Set up logging
+logger = logging.getLogger("vector_classifier")
+
+# =====================================================================
+# CONFIGURATION - Use environment variables for Cloud Run compatibility
+# =====================================================================
+
+CACHE_ENABLED = os.environ.get("VECTOR_CACHE_ENABLED", "True").lower() == "true"
+CACHE_PATH = os.environ.get("VECTOR_CACHE_PATH", "/tmp/processing/embedding_cache.sqlite")
+CACHE_MEMORY_ITEMS = int(os.environ.get("VECTOR_CACHE_MEMORY_ITEMS", "4096"))
+CACHE_MAX_ITEMS = int(os.environ.get("VECTOR_CACHE_MAX_ITEMS", "200000"))
+
+def make_cache_key(text: str, model_version: str) -> str:
+    """
+    Build the cache key for a cleaned text and model version.
+
+    Args:
+        text: Cleaned text that will be encoded
+        model_version: Identifier of the model producing the embedding
+
+    Returns:
+        Hex SHA-256 digest of the model version and text
+    """
+    digest = hashlib.sha256()
+    digest.update(model_version.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+class EmbeddingCache:
+    """
+    Content-hash embedding cache with an in-process LRU in front of SQLite.
+
+    Embeddings are keyed by a hash of the cleaned text and the model version,
+    so reposted messages and overlapping exports skip the encoder entirely.
+    The on-disk store keeps at most max_items rows and evicts the least
+    recently used ones when it grows past that.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        model_version: str,
+        memory_items: int = 4096,
+        max_items: int = 200000
+    ):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            db_path: Path to the SQLite file
+            model_version: Identifier of the model producing the embeddings
+            memory_items: Number of embeddings kept in the in-process LRU
+            max_items: Maximum number of embeddings kept on disk
+        """
+        self.db_path = db_path
+        self.model_version = model_version
+        self.memory_items = memory_items
+        self.max_items = max_items
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes_since_evict = 0
+
+        # Hit/miss counters
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        parent_dir = os.path.dirname(db_path)
+        if parent_dir:
+            os.makedirs(parent_dir, exist_ok=True)
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY,"
+            " dim INTEGER NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings(last_access)"
+        )
+        self._conn.commit()
+        logger.info(f"Embedding cache opened at {db_path} for model version {model_version}")
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Look up embeddings for many texts.
+
+        Args:
+            texts: Cleaned texts
+
+        Returns:
+            List aligned with texts holding the cached embedding or None on a miss
+        """
+        keys = [make_cache_key(text, self.model_version) for text in texts]
+        results = [None] * len(texts)
+        disk_lookup = {}
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    results[i] = vector
+                    self.memory_hits += 1
+                else:
+                    disk_lookup.setdefault(key, []).append(i)
+
+            if disk_lookup:
+                found = self._read_disk(list(disk_lookup.keys()))
+                for key, positions in disk_lookup.items():
+                    vector = found.get(key)
+                    if vector is None:
+                        self.misses += len(positions)
+                        continue
+                    self.disk_hits += len(positions)
+                    self._remember(key, vector)
+                    for i in positions:
+                        results[i] = vector
+
+        return results
+
+    def put_many(self, texts: List[str], vectors: List[np.ndarray]) -> None:
+        """
+        Store embeddings for many texts.
+
+        Args:
+            texts: Cleaned texts
+            vectors: Embeddings aligned with texts
+        """
+        now = time.time()
+        rows = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                key = make_cache_key(text, self.model_version)
+                vector = np.asarray(vector, dtype=np.float32)
+                self._remember(key, vector)
+                rows.append((key, int(vector.shape[0]), vector.tobytes(), now))
+
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, dim, vector, last_access) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+                self._conn.commit()
+                self._writes_since_evict += len(rows)
+                # Only check the table size every so often, counting rows is not free
+                if self._writes_since_evict >= 1000:
+                    self._evict()
+                    self._writes_since_evict = 0
+            except sqlite3.Error as e:
+                logger.error(f"Error writing to embedding cache: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters for the cache."""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            hits = self.memory_hits + self.disk_hits
+            return {
+                "model_version": self.model_version,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (hits / lookups) if lookups else 0.0,
+                "memory_items": len(self._memory)
+            }
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            try:
+                self._conn.close()
+            except sqlite3.Error as e:
+                logger.error(f"Error closing embedding cache: {e}")
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        """Add an embedding to the in-process LRU, evicting the oldest entry if full."""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _read_disk(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Read embeddings for the given keys from SQLite and refresh their access time."""
+        found = {}
+        try:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, dim, vector FROM embeddings WHERE key IN ({placeholders})",
+                    chunk
+                ).fetchall()
+                for key, dim, blob in rows:
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    if vector.shape[0] == dim:
+                        found[key] = vector
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error reading from embedding cache: {e}")
+        return found
+
+    def _evict(self) -> None:
+        """Delete the least recently used rows once the table exceeds max_items."""
+        count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        excess = count - self.max_items
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN ("
+                " SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+                (excess,)
+            )
+            self._conn.commit()
+            logger.info(f"Evicted {excess} entries from embedding cache")
@@ -0,0 +1,258 @@
+import os
+import json
+import bisect
+import argparse
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from geocodeCache import normalize_place_name
+
+# Set up logging
+logger = logging.getLogger("ner_implementation")
+
+# =====================================================================
+# CONFIGURATION - Use environment variables for Cloud Run compatibility
+# =====================================================================
+
+# Directory holding the compiled gazetteer index (geocoding falls back to
+# Nominatim for every name when it does not exist)
+GAZETTEER_PATH = os.environ.get("GAZETTEER_PATH", "/app/models/gazetteer")
+
+# Countries kept when compiling a GeoNames dump
+DEFAULT_COUNTRIES = ("PL", "UA", "BY", "DE")
+
+# GeoNames feature classes kept: P = populated places, A = administrative areas
+DEFAULT_FEATURE_CLASSES = ("P", "A")
+
+INFO_FILE_NAME = "gazetteer.json"
+NAMES_FILE_NAME = "gazetteer_names.bin"
+OFFSETS_FILE_NAME = "gazetteer_offsets.npy"
+COORDS_FILE_NAME = "gazetteer_coords.npy"
+POPULATION_FILE_NAME = "gazetteer_population.npy"
+
+def read_geonames(
+    paths: Iterable[str],
+    countries: Tuple[str, ...] = DEFAULT_COUNTRIES,
+    feature_classes: Tuple[str, ...] = DEFAULT_FEATURE_CLASSES,
+    min_population: int = 0
+) -> Dict[str, Tuple[float, float, int]]:
+    """
+    Read GeoNames-style dumps into a name -> (lat, lon, population) mapping.
+
+    Every name of a place is indexed: the main name, the ASCII name and all
+    alternate names (which include the Polish, Ukrainian and Russian forms).
+    When several places share a normalized name, the most populous one wins.
+
+    Args:
+        paths: Tab-separated GeoNames files (e.g. PL.txt, UA.txt, allCountries.txt)
+        countries: Country codes to keep (empty keeps all)
+        feature_classes: Feature classes to keep
+        min_population: Skip places with a smaller population
+
+    Returns:
+        Dictionary of normalized name to (latitude, longitude, population)
+    """
+    entries = {}
+    for path in paths:
+        logger.info(f"Reading gazetteer source {path}")
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                fields = line.rstrip("\n").split("\t")
+                if len(fields) < 15:
+                    continue
+                if countries and fields[8] not in countries:
+                    continue
+                if fields[6] not in feature_classes:
+                    continue
+                try:
+                    lat, lon = float(fields[4]), float(fields[5])
+                    population = int(fields[14] or 0)
+                except ValueError:
+                    continue
+                if population < min_population:
+                    continue
+
+                names = [fields[1], fields[2]] + fields[3].split(",")
+                for name in names:
+                    key = normalize_place_name(name)
+                    if not key:
+                        continue
+                    current = entries.get(key)
+                    if current is None or population > current[2]:
+                        entries[key] = (lat, lon, population)
+    return entries
+
+def compile_gazetteer(entries: Dict[str, Tuple[float, float, int]], output_dir: str, sources: List[str] = None) -> Dict:
+    """
+    Write the compact on-disk index used by Gazetteer.
+
+    Names are sorted by their UTF-8 bytes and concatenated into one blob with
+    an offsets array, next to aligned coordinate and population arrays, so a
+    lookup is a binary search over memory-mapped files.
+
+    Args:
+        entries: Output of read_geonames
+        output_dir: Directory for the index files
+        sources: Source file names recorded in gazetteer.json
+
+    Returns:
+        Index information written to gazetteer.json
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    keys = sorted(entries.keys(), key=lambda k: k.encode("utf-8"))
+    encoded = [k.encode("utf-8") for k in keys]
+
+    offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(e) for e in encoded])
+    coords = np.array([entries[k][:2] for k in keys], dtype=np.float64).reshape(-1, 2)
+    population = np.array([entries[k][2] for k in keys], dtype=np.int64)
+
+    with open(os.path.join(output_dir, NAMES_FILE_NAME), 'wb') as f:
+        f.write(b"".join(encoded))
+    np.save(os.path.join(output_dir, OFFSETS_FILE_NAME), offsets)
+    np.save(os.path.join(output_dir, COORDS_FILE_NAME), coords)
+    np.save(os.path.join(output_dir, POPULATION_FILE_NAME), population)
+
+    info = {
+        "names": len(keys),
+        "sources": [os.path.basename(s) for s in (sources or [])],
+    }
+    with open(os.path.join(output_dir, INFO_FILE_NAME), 'w', encoding='utf-8') as f:
+        json.dump(info, f, indent=2)
+
+    logger.info(f"Compiled gazetteer with {len(keys)} names to {output_dir}")
+    return info
+
+class _SortedNames:
+    """Sequence view over the names blob, so bisect can search it without decoding everything"""
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes()
+
+class Gazetteer:
+    """
+    Offline geocoder over a compiled GeoNames index.
+
+    Lookups normalize the name the same way as the geocode cache and binary
+    search the sorted names, so resolving a known place takes microseconds
+    and never touches the network.
+    """
+
+    def __init__(self, index_dir: str):
+        """
+        Open a compiled gazetteer.
+
+        Args:
+            index_dir: Directory written by compile_gazetteer
+        """
+        with open(os.path.join(index_dir, INFO_FILE_NAME), 'r', encoding='utf-8') as f:
+            self.info = json.load(f)
+
+        names_path = os.path.join(index_dir, NAMES_FILE_NAME)
+        if os.path.getsize(names_path):
+            blob = np.memmap(names_path, dtype=np.uint8, mode='r')
+        else:
+            # np.memmap cannot map an empty file
+            blob = np.zeros(0, dtype=np.uint8)
+        offsets = np.load(os.path.join(index_dir, OFFSETS_FILE_NAME))
+        self.names = _SortedNames(blob, offsets)
+        self.coords = np.load(os.path.join(index_dir, COORDS_FILE_NAME), mmap_mode='r')
+        self.population = np.load(os.path.join(index_dir, POPULATION_FILE_NAME), mmap_mode='r')
+
+        if len(self.names) != self.coords.shape[0] or len(self.names) != self.population.shape[0]:
+            raise ValueError(f"Gazetteer index in {index_dir} is inconsistent")
+
+        self.hits = 0
+        self.misses = 0
+        logger.info(f"Loaded gazetteer with {len(self.names)} names from {index_dir}")
+
+    def lookup(self, name: str) -> Optional[Tuple[float, float, int]]:
+        """
+        Resolve a place name.
+
+        Args:
+            name: Place name as found by NER
+
+        Returns:
+            (latitude, longitude, population), or None if the name is unknown
+        """
+        key = normalize_place_name(name).encode("utf-8")
+        i = bisect.bisect_left(self.names, key)
+        if key and i < len(self.names) and self.names[i] == key:
+            self.hits += 1
+            lat, lon = self.coords[i]
+            return float(lat), float(lon), int(self.population[i])
+        self.misses += 1
+        return None
+
+    def prefix_search(self, prefix: str, limit: int = 10) -> List[Tuple[str, float, float, int]]:
+        """
+        List the places whose normalized name starts with prefix, most populous first.
+
+        Args:
+            prefix: Name prefix
+            limit: Maximum number of results
+
+        Returns:
+            List of (name, latitude, longitude, population)
+        """
+        key = normalize_place_name(prefix).encode("utf-8")
+        if not key:
+            return []
+        start = bisect.bisect_left(self.names, key)
+        # Every name with this prefix sorts before prefix + 0xff
+        end = bisect.bisect_left(self.names, key + b"\xff", lo=start)
+
+        matches = sorted(range(start, end), key=lambda i: -int(self.population[i]))[:limit]
+        return [
+            (self.names[i].decode("utf-8"), float(self.coords[i][0]), float(self.coords[i][1]), int(self.population[i]))
+            for i in matches
+        ]
+
+    def stats(self) -> Dict:
+        """Return hit/miss counters."""
+        return {"names": len(self.names), "hits": self.hits, "misses": self.misses}
+
+def load_gazetteer(index_dir: str = GAZETTEER_PATH) -> Optional[Gazetteer]:
+    """
+    Open the gazetteer if it has been compiled.
+
+    Returns:
+        Gazetteer, or None if there is no usable index at index_dir
+    """
+    if not index_dir or not os.path.exists(os.path.join(index_dir, INFO_FILE_NAME)):
+        logger.info(f"No gazetteer index at {index_dir}, geocoding uses Nominatim only")
+        return None
+    try:
+        return Gazetteer(index_dir)
+    except Exception as e:
+        logger.error(f"Could not load gazetteer from {index_dir}: {e}")
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile GeoNames dumps into the offline gazetteer index")
+    parser.add_argument("sources", nargs="+", help="GeoNames files (e.g. PL.txt UA.txt BY.txt DE.txt)")
+    parser.add_argument("--output", default=GAZETTEER_PATH, help="Output directory")
+    parser.add_argument("--countries", default=",".join(DEFAULT_COUNTRIES),
+                        help="Comma-separated country codes to keep (empty keeps all)")
+    parser.add_argument("--min-population", type=int, default=0, help="Skip smaller places")
+    args = parser.parse_args()
+
+    countries = tuple(c for c in args.countries.split(",") if c)
+    entries = read_geonames(args.sources, countries=countries, min_population=args.min_population)
+    info = compile_gazetteer(entries, args.output, sources=args.sources)
+    print(json.dumps(info, indent=2))
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,197 @@
+import os
+import re
+import sqlite3
+import threading
+import logging
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Set up logging
+logger = logging.getLogger("ner_implementation")
+
+# =====================================================================
+# CONFIGURATION - Use environment variables for Cloud Run compatibility
+# =====================================================================
+
+GEOCODE_CACHE_ENABLED = os.environ.get("GEOCODE_CACHE_ENABLED", "True").lower() == "true"
+GEOCODE_CACHE_PATH = os.environ.get("GEOCODE_CACHE_PATH", "/tmp/processing/geocode_cache.sqlite")
+
+# Places that could not be geocoded are retried after this many seconds (default 7 days)
+GEOCODE_NEGATIVE_TTL = float(os.environ.get("GEOCODE_NEGATIVE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# Number of place names kept in the in-process LRU in front of SQLite
+GEOCODE_CACHE_MEMORY_ITEMS = int(os.environ.get("GEOCODE_CACHE_MEMORY_ITEMS", "10000"))
+
+def normalize_place_name(name: str) -> str:
+    """
+    Normalize a place name for use as a cache key.
+
+    "Kraków", " kraków " and "KRAKÓW," map to the same key, while different
+    spellings (e.g. "Krakow") stay distinct because Nominatim may resolve them
+    differently.
+
+    Args:
+        name: Place name as found by NER
+
+    Returns:
+        Normalized name
+    """
+    name = unicodedata.normalize("NFKC", name).casefold()
+    name = " ".join(name.split())
+    return re.sub(r"^[\W_]+|[\W_]+$", "", name)
+
+class GeocodeCache:
+    """
+    Persistent geocoding cache keyed by normalized place name.
+
+    Found coordinates are kept indefinitely. Names the provider could not
+    resolve are stored as negative results and expire after negative_ttl
+    seconds, so they are retried eventually without a network round trip
+    on every mention. Provider errors are never cached.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        negative_ttl: float = GEOCODE_NEGATIVE_TTL,
+        memory_items: int = GEOCODE_CACHE_MEMORY_ITEMS
+    ):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            db_path: Path to the SQLite file
+            negative_ttl: Seconds before a negative result is retried
+            memory_items: Number of place names kept in the in-process LRU
+        """
+        self.db_path = db_path
+        self.negative_ttl = negative_ttl
+        self.memory_items = memory_items
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Hit/miss counters
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+        parent_dir = os.path.dirname(db_path)
+        if parent_dir:
+            os.makedirs(parent_dir, exist_ok=True)
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS geocodes ("
+            " name TEXT PRIMARY KEY,"
+            " latitude REAL,"
+            " longitude REAL,"
+            " found INTEGER NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        logger.info(f"Geocode cache opened at {db_path}")
+
+    def get(self, name: str) -> Optional[Tuple[Optional[float], Optional[float]]]:
+        """
+        Look up a place name.
+
+        Args:
+            name: Place name
+
+        Returns:
+            (latitude, longitude) on a hit, (None, None) for a cached negative
+            result, or None if the name has to be geocoded
+        """
+        key = normalize_place_name(name)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+            else:
+                entry = self._read_disk(key)
+                if entry is not None:
+                    self._remember(key, entry)
+
+            if entry is not None:
+                latitude, longitude, found, updated_at = entry
+                if found:
+                    self.hits += 1
+                    return latitude, longitude
+                if time.time() - updated_at < self.negative_ttl:
+                    self.negative_hits += 1
+                    return None, None
+                # Expired negative result: geocode again
+                del self._memory[key]
+
+            self.misses += 1
+            return None
+
+    def put(self, name: str, latitude: Optional[float], longitude: Optional[float]) -> None:
+        """
+        Store the result of a geocoding lookup.
+
+        Args:
+            name: Place name
+            latitude: Latitude, or None if the place could not be geocoded
+            longitude: Longitude, or None if the place could not be geocoded
+        """
+        key = normalize_place_name(name)
+        found = latitude is not None and longitude is not None
+        entry = (latitude, longitude, found, time.time())
+        with self._lock:
+            self._remember(key, entry)
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO geocodes (name, latitude, longitude, found, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (key, latitude, longitude, int(found), entry[3])
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Error writing to geocode cache: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters for the cache."""
+        with self._lock:
+            lookups = self.hits + self.negative_hits + self.misses
+            return {
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "hit_rate": ((self.hits + self.negative_hits) / lookups) if lookups else 0.0,
+                "memory_items": len(self._memory)
+            }
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            try:
+                self._conn.close()
+            except sqlite3.Error as e:
+                logger.error(f"Error closing geocode cache: {e}")
+
+    def _remember(self, key: str, entry: Tuple[Optional[float], Optional[float], bool, float]) -> None:
+        """Add an entry to the in-process LRU, evicting the oldest entry if full."""
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _read_disk(self, key: str) -> Optional[Tuple[Optional[float], Optional[float], bool, float]]:
+        """Read one entry from SQLite."""
+        try:
+            row = self._conn.execute(
+                "SELECT latitude, longitude, found, updated_at FROM geocodes WHERE name = ?",
+                (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Error reading from geocode cache: {e}")
+            return None
+        if row is None:
+            return None
+        return row[0], row[1], bool(row[2]), row[3]
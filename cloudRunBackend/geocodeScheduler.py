@@ -0,0 +1,172 @@
+import os
+import time
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+
+# Set up logging
+logger = logging.getLogger("ner_implementation")
+
+# =====================================================================
+# CONFIGURATION - Use environment variables for Cloud Run compatibility
+# =====================================================================
+
+# Geocoding providers speaking the Nominatim search API, with their rate limits
+# (requests per second) and burst sizes. "stub" is the local server in
+# stubGeocoder.py, used for tests and offline runs.
+PROVIDERS = {
+    "nominatim": {"domain": "nominatim.openstreetmap.org", "scheme": "https", "rate": 1.0, "burst": 1},
+    "stub": {"domain": "localhost:8089", "scheme": "http", "rate": 100.0, "burst": 10},
+}
+
+GEOCODE_PROVIDER = os.environ.get("GEOCODE_PROVIDER", "nominatim").lower()
+if GEOCODE_PROVIDER not in PROVIDERS:
+    raise ValueError(f"Unsupported GEOCODE_PROVIDER '{GEOCODE_PROVIDER}', expected one of {list(PROVIDERS)}")
+
+_provider = PROVIDERS[GEOCODE_PROVIDER]
+GEOCODE_DOMAIN = os.environ.get("GEOCODE_DOMAIN", _provider["domain"])
+GEOCODE_SCHEME = os.environ.get("GEOCODE_SCHEME", _provider["scheme"])
+GEOCODE_RATE = float(os.environ.get("GEOCODE_RATE", str(_provider["rate"])))
+GEOCODE_BURST = int(os.environ.get("GEOCODE_BURST", str(_provider["burst"])))
+
+# Threads waiting on the provider; the token bucket, not this, sets the request rate
+GEOCODE_WORKERS = int(os.environ.get("GEOCODE_WORKERS", "4"))
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    Tokens are added at rate per second up to burst. acquire() blocks until a
+    token is available, so all threads sharing a bucket together stay under
+    the rate.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Take one token, waiting for it if necessary."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+class GeocodeScheduler:
+    """
+    Resolve place names concurrently under a shared provider rate limit.
+
+    Names that can be answered locally (gazetteer, cache) resolve immediately.
+    Other names are geocoded on a thread pool, each request taking a token
+    from the bucket first. Concurrent requests for the same name share one
+    future, so a city mentioned in many messages is looked up once.
+    """
+
+    def __init__(
+        self,
+        lookup_local: Callable[[str], Optional[Tuple[Optional[float], Optional[float]]]],
+        lookup_remote: Callable[[str], Tuple[Optional[float], Optional[float]]],
+        key: Callable[[str], str],
+        rate: float = GEOCODE_RATE,
+        burst: int = GEOCODE_BURST,
+        workers: int = GEOCODE_WORKERS
+    ):
+        """
+        Create a scheduler.
+
+        Args:
+            lookup_local: Returns (lat, lon) or (None, None) without network access,
+                or None if the name has to be geocoded remotely
+            lookup_remote: Geocodes a name with the provider, returning (lat, lon)
+            key: Normalizes a name for in-flight deduplication
+            rate: Provider requests per second
+            burst: Requests allowed back to back
+            workers: Threads used for provider requests
+        """
+        self.lookup_local = lookup_local
+        self.lookup_remote = lookup_remote
+        self.key = key
+        self.bucket = TokenBucket(rate, burst)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="geocode")
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+        # Counters
+        self.local = 0
+        self.remote = 0
+        self.deduplicated = 0
+
+    def submit(self, name: str) -> Future:
+        """
+        Schedule a lookup.
+
+        Args:
+            name: Place name
+
+        Returns:
+            Future resolving to (name, lat, lon)
+        """
+        local = self.lookup_local(name)
+        if local is not None:
+            future = Future()
+            future.set_result((name, local[0], local[1]))
+            with self._lock:
+                self.local += 1
+            return future
+
+        key = self.key(name)
+        with self._lock:
+            shared = self._in_flight.get(key)
+            if shared is None:
+                shared = self._executor.submit(self._geocode, key, name)
+                self._in_flight[key] = shared
+                self.remote += 1
+            else:
+                self.deduplicated += 1
+
+        # Report the name as the caller wrote it, even when the request is shared
+        future = Future()
+        shared.add_done_callback(lambda done: self._resolve(future, name, done))
+        return future
+
+    def stats(self) -> Dict:
+        """Return lookup counters."""
+        with self._lock:
+            return {
+                "local": self.local,
+                "remote": self.remote,
+                "deduplicated": self.deduplicated,
+                "in_flight": len(self._in_flight),
+                "rate": self.bucket.rate,
+            }
+
+    def _geocode(self, key: str, name: str) -> Tuple[Optional[float], Optional[float]]:
+        """Wait for a token and geocode a name with the provider."""
+        try:
+            self.bucket.acquire()
+            return self.lookup_remote(name)
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    @staticmethod
+    def _resolve(future: Future, name: str, done: Future) -> None:
+        """Complete a caller's future from a shared request."""
+        try:
+            lat, lon = done.result()
+        except Exception as e:
+            logger.error(f"Error geocoding {name}: {e}")
+            lat, lon = None, None
+        future.set_result((name, lat, lon))
@@ -9,35 +9,182 @@ logger = logging.getLogger("json-processor-api")
 
 # Import AI client at module level
 from aiLoader import loadAI
+from llmCache import make_key, hash_file, cached_response, cached_response_async
+from languageId import local_translation
+from openaiScheduler import create_chat_completion, create_chat_completion_async, create_transcription
+
+# Model used for translation
+TRANSLATION_MODEL = "gpt-4o"
+
+def buildTranslationPrompt(text):
+    """Build the translation prompt for a text"""
+    PROMPT_PART_1 = "Translate this text to English <start> " 
+    PROMPT_PART_2 = " <end>. Return back two things. The first is your translation to English of text that was between the <start> and <end> tags. The second is a one word description of the language of text that was between the <start> and <end> tags. If the text between the <start> and <end> tags is only whitespace, escape characters, or non-alphanumeric characters, as in not real words, return an empty string for both the translation and the description."
+    PROMPT_PART_3 = "Put the two items you return into a JSON structure. Your translation to English of text that was between the <start> and <end> tags placed inside a JSON tag named translation. Your one word description of the language of text that was between the <start> and <end> tags inside a JSON tag named language. Do not return any additional text, descriptions of your process or information beyond two items and output format of the tags specified. Do not encapsulate the result in ``` or any other characters."
+
+    return PROMPT_PART_1 + text + PROMPT_PART_2 + PROMPT_PART_3
+
+def buildPackedTranslationPrompt(items):
+    """Build one translation prompt for several texts, given as [{"id": ..., "text": ...}]"""
+    PROMPT_PART_1 = "Translate each text in the JSON array between the <texts> and </texts> tags to English. Each item has an id and a text. "
+    PROMPT_PART_2 = "Return a JSON array with exactly one object per item, each with three keys: id (the id of the item, unchanged), translation (your translation of its text to English) and language (a one word description of the language of its text). If a text is only whitespace, escape characters, or non-alphanumeric characters, as in not real words, return an empty string for both its translation and language. "
+    PROMPT_PART_3 = "Do not return any additional text, descriptions of your process or information beyond the JSON array. Do not encapsulate the result in ``` or any other characters."
+
+    return PROMPT_PART_1 + PROMPT_PART_2 + PROMPT_PART_3 + "\n<texts>\n" + json.dumps(items, ensure_ascii=False) + "\n</texts>"
+
+def parsePackedTranslation(content, ids):
+    """
+    Parse the reply to a packed translation prompt.
+
+    Args:
+        content: Model reply, expected to be a JSON array
+        ids: Ids that were sent
+
+    Returns:
+        Dict of id to {"translation", "language"} for every well-formed item
+        with a known id; missing and malformed items are left out
+
+    Raises:
+        ValueError: If the reply is not a JSON array at all
+    """
+    content = content.strip()
+    if content.startswith("```"):
+        content = content.strip("`").strip()
+        if content.startswith("json"):
+            content = content[4:]
+    items = json.loads(content)
+    if not isinstance(items, list):
+        raise ValueError("Packed translation reply is not a JSON array")
+
+    expected = set(ids)
+    results = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        itemId = item.get("id")
+        translation = item.get("translation")
+        language = item.get("language")
+        if itemId in expected and itemId not in results and isinstance(translation, str) and isinstance(language, str):
+            results[itemId] = {"translation": translation, "language": language}
+    return results
 
 def translate(text, client=None):
     """Translate text to English"""
     # Get client if not provided
     if client is None:
         client = loadAI()
-        
-    PROMPT_PART_1 = "Translate this text to English <start> " 
-    PROMPT_PART_2 = " <end>. Return back two things. The first is your translation to English of text that was between the <start> and <end> tags. The second is a one word description of the language of text that was between the <start> and <end> tags. If the text between the <start> and <end> tags is only whitespace, escape characters, or non-alphanumeric characters, as in not real words, return an empty string for both the translation and the description."
-    PROMPT_PART_3 = "Put the two items you return into a JSON structure. Your translation to English of text that was between the <start> and <end> tags placed inside a JSON tag named translation. Your one word description of the language of text that was between the <start> and <end> tags inside a JSON tag named language. Do not return any additional text, descriptions of your process or information beyond two items and output format of the tags specified. Do not encapsulate the result in ``` or any other characters."
 
     try:
+        # English and letterless texts do not need the LLM
+        local = local_translation(text)
+        if local is not None:
+            logger.info(f"Translation answered locally: {local['language'] or 'no letters'}")
+            return local
+        
         logger.info(f"Translating text: {text[:50]}...")
-        completion = client.chat.completions.create(
-            model="gpt-4o",
-            store=True,
-            messages=[
-                {"role": "user", "content": PROMPT_PART_1 + text + PROMPT_PART_2 + PROMPT_PART_3}
-            ]
-        )
+        messages = [
+            {"role": "user", "content": buildTranslationPrompt(text)}
+        ]
         
-        result = json.loads(completion.choices[0].message.content)
+        def fetch():
+            completion = create_chat_completion(
+                client,
+                model=TRANSLATION_MODEL,
+                store=True,
+                messages=messages
+            )
+            return completion.choices[0].message.content
+        
+        result = cached_response(make_key(TRANSLATION_MODEL, messages), fetch, json.loads)
         logger.info(f"Translation complete: {result.get('language', 'unknown')}")
         return result
 
     except Exception as e:
         logger.error(f"Error translating text: {e}")
         return None
+
+async def translateAsync(text, client, semaphore):
+    """Translate text to English with an async client, at most semaphore-many at a time"""
+    # English and letterless texts do not need the LLM
+    local = local_translation(text)
+    if local is not None:
+        return local
     
+    async with semaphore:
+        try:
+            logger.info(f"Translating text: {text[:50]}...")
+            messages = [
+                {"role": "user", "content": buildTranslationPrompt(text)}
+            ]
+            
+            async def fetch():
+                completion = await create_chat_completion_async(
+                    client,
+                    model=TRANSLATION_MODEL,
+                    store=True,
+                    messages=messages
+                )
+                return completion.choices[0].message.content
+            
+            result = await cached_response_async(make_key(TRANSLATION_MODEL, messages), fetch, json.loads)
+            logger.info(f"Translation complete: {result.get('language', 'unknown')}")
+            return result
+
+        except Exception as e:
+            logger.error(f"Error translating text: {e}")
+            return None
+
+async def translatePackedAsync(texts, client, semaphore):
+    """
+    Translate several texts in one request with an async client.
+
+    Args:
+        texts: Texts to translate together
+        client: Async OpenAI client
+        semaphore: Limits requests in flight
+
+    Returns:
+        Dict of index into texts to the translate() result dict; indexes the
+        reply left out or got wrong are missing (an empty dict on failure)
+    """
+    items = [{"id": i, "text": text} for i, text in enumerate(texts)]
+    ids = [item["id"] for item in items]
+    async with semaphore:
+        try:
+            logger.info(f"Translating {len(texts)} texts in one request")
+            messages = [
+                {"role": "user", "content": buildPackedTranslationPrompt(items)}
+            ]
+            
+            async def fetch():
+                completion = await create_chat_completion_async(
+                    client,
+                    model=TRANSLATION_MODEL,
+                    store=True,
+                    messages=messages
+                )
+                return completion.choices[0].message.content
+            
+            results = await cached_response_async(
+                make_key(TRANSLATION_MODEL, messages), fetch,
+                lambda content: parsePackedTranslation(content, ids)
+            )
+            if len(results) < len(ids):
+                logger.warning(f"Packed translation returned {len(results)}/{len(ids)} texts")
+            return results
+
+        except Exception as e:
+            logger.error(f"Error translating packed texts: {e}")
+            return {}
+    
+def mediaDuration(file):
+    """Duration of a media file in seconds, 0 if ffprobe cannot tell"""
+    try:
+        return float(ffmpeg.probe(file)["format"]["duration"])
+    except Exception as e:
+        logger.warning(f"Could not read duration of {file}: {e}")
+        return 0.0
+
 def convertToMP4(file):
     """Convert video to MP4 format"""
     stem = os.path.splitext(file)[0]
@@ -60,24 +207,35 @@ def transcribe(file, client=None):
     if client is None:
         client = loadAI()
         
-    # Convert to mp4 if necessary
-    fExtension = os.path.splitext(file)[1]
-    if fExtension == ".MOV" or fExtension == ".mov":
-        logger.info(f"Converting {file} to MP4 for transcription")
-        file = convertToMP4(file)
-        if not file:
-            logger.error("Video conversion failed, cannot transcribe")
-            return None
-
-    # Transcribe
+    # Key on the original file, so a cache hit also skips the conversion
     try:
-        logger.info(f"Transcribing file: {file}")
-        audio_file = open(file, "rb")
-        transcription = client.audio.transcriptions.create(
-            model="whisper-1", 
-            file=audio_file,
+        cache_key = make_key("whisper-1", "transcription", {"response_format": "text"}, [hash_file(file)])
+    except Exception as e:
+        logger.error(f"Error reading file {file}: {e}")
+        return None
+
+    def fetch():
+        mediaFile = file
+        # Convert to mp4 if necessary
+        fExtension = os.path.splitext(mediaFile)[1]
+        if fExtension == ".MOV" or fExtension == ".mov":
+            logger.info(f"Converting {mediaFile} to MP4 for transcription")
+            mediaFile = convertToMP4(mediaFile)
+            if not mediaFile:
+                raise RuntimeError("Video conversion failed, cannot transcribe")
+
+        logger.info(f"Transcribing file: {mediaFile}")
+        return create_transcription(
+            client,
+            mediaFile,
+            audio_seconds=mediaDuration(mediaFile),
+            model="whisper-1",
             response_format="text"
         )
+
+    # Transcribe
+    try:
+        transcription = cached_response(cache_key, fetch)
         
         logger.info(f"Transcription complete: {transcription[:50]}...")
         return transcription
@@ -8,6 +8,12 @@ logger = logging.getLogger("json-processor-api")
 
 # Import the AI client at module level
 from aiLoader import loadAI
+from llmCache import make_key, hash_file, cached_response
+from openaiScheduler import create_chat_completion
+
+# Model and prompt used for photo and frame analysis
+PHOTO_MODEL = "gpt-4o-mini"
+PHOTO_PROMPT = "Describe this image in one sentence."
 
 # Function to encode the frame
 def encodeFrame(framePath):
@@ -19,43 +25,55 @@ def encodeFrame(framePath):
         logger.error(f"Error opening frame file {framePath}: {e}")
         return None
     
+def buildPhotoMessages(base64Frame):
+    """Build the photo analysis chat messages for a base64-encoded JPEG"""
+    return [
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "text",
+                    "text": PHOTO_PROMPT,
+                },
+                {
+                    "type": "image_url",
+                    "image_url": {"url": f"data:image/jpeg;base64,{base64Frame}"},
+                },
+            ],
+        }
+    ]
+
 def analyzePhoto(framePath, client=None):
     """Analyze a photo using the OpenAI API"""
     # Get client if not provided
     if client is None:
         client = loadAI()
 
-    # Encode the frame
-    base64Frame = encodeFrame(framePath)
-
-    if base64Frame:
-        try:
-            logger.info(f"Analyzing photo: {framePath}")
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": "Describe this image in one sentence.",
-                            },
-                            {
-                                "type": "image_url",
-                                "image_url": {"url": f"data:image/jpeg;base64,{base64Frame}"},
-                            },
-                        ],
-                    }
-                ],
-            )
-            
-            analysis = response.choices[0].message.content.strip()
-            logger.info(f"Photo analysis complete: {analysis[:50]}...")
-            return analysis
-        except Exception as e:
-            logger.error(f"Error analyzing image {framePath}: {e}")
-            return None
-    else:
-        logger.error(f"Failed to encode image {framePath}")
+    # The image enters the cache key by content hash instead of its base64 text
+    try:
+        cache_key = make_key(PHOTO_MODEL, PHOTO_PROMPT, media=[hash_file(framePath)])
+    except Exception as e:
+        logger.error(f"Error opening frame file {framePath}: {e}")
+        return None
+
+    def fetch():
+        # Encode the frame
+        base64Frame = encodeFrame(framePath)
+        if not base64Frame:
+            raise ValueError(f"Failed to encode image {framePath}")
+
+        response = create_chat_completion(
+            client,
+            model=PHOTO_MODEL,
+            messages=buildPhotoMessages(base64Frame),
+        )
+        return response.choices[0].message.content
+
+    try:
+        logger.info(f"Analyzing photo: {framePath}")
+        analysis = cached_response(cache_key, fetch).strip()
+        logger.info(f"Photo analysis complete: {analysis[:50]}...")
+        return analysis
+    except Exception as e:
+        logger.error(f"Error analyzing image {framePath}: {e}")
         return None
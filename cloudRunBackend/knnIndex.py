@@ -0,0 +1,143 @@
+import os
+import json
+import logging
+from typing import List, Tuple
+
+import numpy as np
+
+# Set up logging
+logger = logging.getLogger("vector_classifier")
+
+# =====================================================================
+# CONFIGURATION - Use environment variables for Cloud Run compatibility
+# =====================================================================
+
+# Number of neighbours that vote on the categories of a text
+KNN_K = int(os.environ.get("VECTOR_KNN_K", "15"))
+
+# Number of inverted lists searched per query (higher = more exact, slower)
+KNN_NPROBE = int(os.environ.get("VECTOR_KNN_NPROBE", "8"))
+
+class KnnIndex:
+    """
+    Inverted-file (IVF) nearest neighbour index over training-example embeddings.
+
+    The index is built at package time by generate_knn_index in
+    production/categoryEmbeddings.py and consists of:
+        knn_index.json      label names and index sizes
+        knn_vectors.npy     (N x D) unit-length example embeddings, grouped by list
+        knn_labels.npy      (N x L) multi-hot example labels
+        knn_centroids.npy   (nlist x D) unit-length list centroids
+        knn_offsets.npy     (nlist + 1) start offset of each list in knn_vectors.npy
+
+    All arrays are memory-mapped, so a query only touches the lists it probes.
+    """
+
+    def __init__(self, index_path: str, k: int = KNN_K, nprobe: int = KNN_NPROBE):
+        """
+        Open a kNN index.
+
+        Args:
+            index_path: Path to knn_index.json; the .npy files sit next to it
+            k: Number of neighbours that vote
+            nprobe: Number of inverted lists searched per query
+        """
+        index_dir = os.path.dirname(index_path)
+        with open(index_path, 'r', encoding='utf-8') as f:
+            info = json.load(f)
+
+        self.labels = info["labels"]
+        self.k = k
+        self.nprobe = nprobe
+
+        self.vectors = np.load(os.path.join(index_dir, "knn_vectors.npy"), mmap_mode='r')
+        self.example_labels = np.load(os.path.join(index_dir, "knn_labels.npy"), mmap_mode='r')
+        self.centroids = np.load(os.path.join(index_dir, "knn_centroids.npy"), mmap_mode='r')
+        self.offsets = np.load(os.path.join(index_dir, "knn_offsets.npy"))
+
+        if self.example_labels.shape != (self.vectors.shape[0], len(self.labels)):
+            raise ValueError(
+                f"kNN index mismatch: {self.vectors.shape[0]} vectors, "
+                f"labels shape {self.example_labels.shape}, {len(self.labels)} label names"
+            )
+        if self.offsets[-1] != self.vectors.shape[0]:
+            raise ValueError("kNN index offsets do not cover all vectors")
+
+        logger.info(
+            f"Loaded kNN index with {self.vectors.shape[0]} examples, "
+            f"{self.centroids.shape[0]} lists, k={self.k}, nprobe={self.nprobe}"
+        )
+
+    def search(self, queries: np.ndarray) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+        """
+        Find the approximate k nearest training examples of each query.
+
+        Args:
+            queries: (Q x D) unit-length query embeddings
+
+        Returns:
+            Tuple of per-query neighbour indices and their cosine similarities,
+            best first
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        num_lists = self.centroids.shape[0]
+        nprobe = min(self.nprobe, num_lists)
+
+        # Pick the closest lists for every query at once
+        centroid_scores = queries @ self.centroids.T
+        if nprobe < num_lists:
+            probes = np.argpartition(-centroid_scores, nprobe - 1, axis=1)[:, :nprobe]
+        else:
+            probes = np.tile(np.arange(num_lists), (queries.shape[0], 1))
+
+        neighbour_ids = []
+        neighbour_scores = []
+        for query, lists in zip(queries, probes):
+            # Lists are contiguous row ranges, so candidates are read as slices
+            candidates = np.concatenate([
+                np.arange(self.offsets[l], self.offsets[l + 1]) for l in np.sort(lists)
+            ])
+            if candidates.size == 0:
+                neighbour_ids.append(candidates)
+                neighbour_scores.append(np.zeros(0, dtype=np.float32))
+                continue
+
+            scores = self.vectors[candidates] @ query
+            k = min(self.k, candidates.size)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind='stable')]
+            neighbour_ids.append(candidates[top])
+            neighbour_scores.append(scores[top])
+
+        return neighbour_ids, neighbour_scores
+
+    def category_scores(self, queries: np.ndarray, categories: List[str]) -> np.ndarray:
+        """
+        Score categories by similarity-weighted voting over the nearest neighbours.
+
+        The score of a category is the share of the neighbours' similarity mass
+        that carries that label, so it lies in [0, 1].
+
+        Args:
+            queries: (Q x D) unit-length query embeddings
+            categories: Category names defining the output columns
+
+        Returns:
+            (Q x C) matrix of vote scores
+        """
+        label_column = {label: i for i, label in enumerate(self.labels)}
+        columns = np.array([label_column.get(cat, -1) for cat in categories])
+        known = columns >= 0
+
+        neighbour_ids, neighbour_scores = self.search(queries)
+        scores = np.zeros((len(neighbour_ids), len(categories)), dtype=np.float32)
+
+        for row, (ids, sims) in enumerate(zip(neighbour_ids, neighbour_scores)):
+            weights = np.clip(sims, 0, None)
+            total = weights.sum()
+            if total <= 0:
+                continue
+            votes = weights @ np.asarray(self.example_labels[ids], dtype=np.float32) / total
+            scores[row, known] = votes[columns[known]]
+
+        return scores
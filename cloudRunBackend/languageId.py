@@ -0,0 +1,341 @@
+import os
+import re
+import sys
+import json
+import math
+import random
+import argparse
+import logging
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from languageSamples import SEED_TEXTS, EVALUATION_TEXTS
+
+# Set up logging
+logger = logging.getLogger("json-processor-api")
+
+# =====================================================================
+# CONFIGURATION - Use environment variables for Cloud Run compatibility
+# =====================================================================
+
+LANGID_ENABLED = os.environ.get("LANGID_ENABLED", "True").lower() == "true"
+
+# Character n-gram profiles shipped with the package (built with `python languageId.py train`)
+LANGID_PROFILE_PATH = os.environ.get(
+    "LANGID_PROFILE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "language_profiles.json")
+)
+
+# Texts are only kept away from the LLM when the English posterior reaches this
+LANGID_THRESHOLD = float(os.environ.get("LANGID_THRESHOLD", "0.99"))
+
+# Texts with fewer letters than this are too short to identify and go to the LLM
+LANGID_MIN_LETTERS = int(os.environ.get("LANGID_MIN_LETTERS", "12"))
+
+# Character n-gram orders used by the profiles
+NGRAM_ORDERS = (1, 2, 3)
+
+# Share of English texts allowed under the English floor. It is higher than
+# for other languages because the posterior only compares the profiled
+# languages: a text must also fit English itself to be kept untranslated.
+ENGLISH_FLOOR_QUANTILE = 0.02
+
+# Languages taken from the labelled exports (others come from languageSamples)
+TRAINING_LANGUAGES = ["Ukrainian", "Russian", "English", "Polish", "Spanish", "French", "Belarusian"]
+
+NON_LETTERS = re.compile(r"[^\w'’]+|[\d_]+")
+
+def normalize(text: str) -> str:
+    """Lowercase letters and apostrophes with single spaces between words"""
+    return " " + NON_LETTERS.sub(" ", text.lower()).strip() + " "
+
+def ngrams(text: str) -> Counter:
+    """Character n-gram counts of a normalized text"""
+    counts = Counter()
+    for n in NGRAM_ORDERS:
+        for i in range(len(text) - n + 1):
+            gram = text[i:i + n]
+            if gram != " " * n:
+                counts[gram] += 1
+    return counts
+
+def count_letters(text: str) -> int:
+    return sum(1 for c in text if c.isalpha())
+
+def is_non_linguistic(text: str) -> bool:
+    """Whether a text has no letters at all (whitespace, punctuation, digits, emoji)"""
+    return not any(c.isalpha() for c in text)
+
+class LanguageIdentifier:
+    """
+    Multinomial naive Bayes over character n-grams.
+
+    Each language profile holds log-probabilities of its most frequent
+    n-grams, the log-probability of unseen n-grams (shared by all profiles,
+    so a profile built from little text does not win on smoothing), and a
+    floor on the mean
+    per-n-gram log-likelihood. Texts scoring under the floor of the best
+    language look like none of the profiled languages and are not identified.
+    """
+
+    def __init__(self, profiles: Dict[str, Dict]):
+        self.profiles = profiles
+        self.languages = sorted(profiles)
+
+    @classmethod
+    def load(cls, path: str) -> "LanguageIdentifier":
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data["profiles"])
+
+    def log_likelihoods(self, text: str) -> Tuple[Dict[str, float], int]:
+        """Total log-likelihood of the text under each language, and its n-gram count"""
+        counts = ngrams(normalize(text))
+        total = sum(counts.values())
+        scores = {}
+        for language in self.languages:
+            profile = self.profiles[language]
+            grams = profile["ngrams"]
+            unseen = profile["unseen"]
+            scores[language] = sum(count * grams.get(gram, unseen) for gram, count in counts.items())
+        return scores, total
+
+    def scores(self, text: str) -> Dict[str, float]:
+        """Posterior probability of each language (uniform prior)"""
+        log_scores, _ = self.log_likelihoods(text)
+        best = max(log_scores.values())
+        exp_scores = {language: math.exp(score - best) for language, score in log_scores.items()}
+        norm = sum(exp_scores.values())
+        return {language: value / norm for language, value in exp_scores.items()}
+
+    def identify(self, text: str) -> Tuple[Optional[str], float]:
+        """
+        Identify the language of a text.
+
+        Returns:
+            (language, posterior), or (None, 0.0) when the text is too short or
+            matches none of the profiles well enough
+        """
+        if count_letters(text) < LANGID_MIN_LETTERS:
+            return None, 0.0
+        log_scores, total = self.log_likelihoods(text)
+        if not total:
+            return None, 0.0
+
+        language = max(log_scores, key=log_scores.get)
+        if log_scores[language] / total < self.profiles[language]["floor"]:
+            return None, 0.0
+
+        best = log_scores[language]
+        norm = sum(math.exp(score - best) for score in log_scores.values())
+        return language, 1.0 / norm
+
+_identifier = None
+_identifier_failed = False
+_identifier_lock = threading.Lock()
+_stats = Counter()
+
+def get_identifier() -> Optional[LanguageIdentifier]:
+    """Get the shared identifier, or None if the profiles cannot be loaded."""
+    global _identifier, _identifier_failed
+    if _identifier_failed:
+        return None
+    with _identifier_lock:
+        if _identifier is None and not _identifier_failed:
+            try:
+                _identifier = LanguageIdentifier.load(LANGID_PROFILE_PATH)
+                logger.info(f"Language profiles loaded from {LANGID_PROFILE_PATH}: {_identifier.languages}")
+            except Exception as e:
+                logger.error(f"Could not load language profiles, every text goes to the LLM: {e}")
+                _identifier_failed = True
+        return _identifier
+
+def local_translation(text: str) -> Optional[Dict[str, str]]:
+    """
+    Answer translate() locally where the LLM is not needed.
+
+    Args:
+        text: Message text
+
+    Returns:
+        {"translation", "language"} for texts without letters (both empty, as
+        the translation prompt asks) and for confidently English texts (the
+        text itself); None when the text should go to the LLM
+    """
+    if not LANGID_ENABLED:
+        return None
+
+    if is_non_linguistic(text):
+        _stats["non_linguistic"] += 1
+        return {"translation": "", "language": ""}
+
+    identifier = get_identifier()
+    if identifier is not None:
+        language, confidence = identifier.identify(text)
+        if language == "English" and confidence >= LANGID_THRESHOLD:
+            _stats["english"] += 1
+            return {"translation": text, "language": "English"}
+
+    _stats["llm"] += 1
+    return None
+
+def get_langid_stats() -> Dict[str, int]:
+    """Return how many texts were answered locally and how many went to the LLM."""
+    return {key: _stats[key] for key in ("english", "non_linguistic", "llm")}
+
+def _message_samples(message: Dict) -> Iterable[Tuple[str, str]]:
+    """(language, text) pairs from one processed message, including English translations"""
+    def text_of(value):
+        if isinstance(value, list):
+            return "".join(part if isinstance(part, str) else part.get("text", "") for part in value)
+        return value if isinstance(value, str) else ""
+
+    pairs = []
+    translation = message.get("TRANSLATION")
+    if isinstance(translation, dict):
+        pairs.append((translation.get("language"), text_of(message.get("text")), translation.get("translation")))
+    if message.get("LANGUAGE"):
+        pairs.append((message.get("LANGUAGE"), text_of(message.get("text")), message.get("TRANSLATED_TEXT")))
+    for entity in message.get("text_entities") or []:
+        if isinstance(entity, dict) and entity.get("LANGUAGE"):
+            pairs.append((entity.get("LANGUAGE"), entity.get("text", ""), entity.get("TRANSLATED_TEXT")))
+
+    for language, text, translated in pairs:
+        if isinstance(language, str) and language.strip():
+            yield language.strip().capitalize(), text
+        if isinstance(translated, str) and translated:
+            yield "English", translated
+
+def collect_samples(paths: Iterable[str]) -> Dict[str, List[str]]:
+    """Labelled texts from processed exports, by language, without duplicates"""
+    samples = {language: set() for language in TRAINING_LANGUAGES}
+    for path in paths:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"Skipping {path}: {e}")
+            continue
+        messages = data.get("messages", []) if isinstance(data, dict) else data
+        for message in messages:
+            if not isinstance(message, dict):
+                continue
+            for language, text in _message_samples(message):
+                if language in samples and count_letters(text) >= LANGID_MIN_LETTERS:
+                    samples[language].add(text.strip())
+    return {language: sorted(texts) for language, texts in samples.items() if texts}
+
+def train_profiles(samples: Dict[str, List[str]], top_ngrams: int = 4000, floor_quantile: float = 0.005,
+                   floor_quantiles: Optional[Dict[str, float]] = None) -> Dict[str, Dict]:
+    """
+    Build language profiles from labelled texts.
+
+    Args:
+        samples: Texts by language
+        top_ngrams: N-grams kept per language
+        floor_quantile: Share of a language's own texts allowed under its floor
+        floor_quantiles: Per-language overrides of floor_quantile
+
+    Returns:
+        Profiles for LanguageIdentifier
+    """
+    profiles = {}
+    for language, texts in samples.items():
+        counts = Counter()
+        for text in texts:
+            counts.update(ngrams(normalize(text)))
+        kept = counts.most_common(top_ngrams)
+        # Add-one smoothing over the kept n-grams
+        denominator = sum(counts.values()) + len(kept) + 1
+        profiles[language] = {
+            "ngrams": {gram: round(math.log((count + 1) / denominator), 4) for gram, count in kept},
+            "unseen": math.log(1 / denominator),
+            "floor": 0.0,
+        }
+
+    # Unseen n-grams cost the same everywhere: that of the best-trained language
+    unseen = round(min(profile["unseen"] for profile in profiles.values()), 4)
+    for profile in profiles.values():
+        profile["unseen"] = unseen
+
+    identifier = LanguageIdentifier(profiles)
+    for language, texts in samples.items():
+        means = []
+        for text in texts:
+            log_scores, total = identifier.log_likelihoods(text)
+            if total:
+                means.append(log_scores[language] / total)
+        means.sort()
+        quantile = (floor_quantiles or {}).get(language, floor_quantile)
+        profiles[language]["floor"] = round(means[int(len(means) * quantile)], 4) if means else -100.0
+    return profiles
+
+def evaluate(identifier: LanguageIdentifier, samples: Dict[str, List[str]], threshold: float) -> Dict[str, Dict]:
+    """Share of each language's texts the local stage would answer as English"""
+    report = {}
+    for language, texts in samples.items():
+        local = 0
+        for text in texts:
+            identified, confidence = identifier.identify(text)
+            if identified == "English" and confidence >= threshold:
+                local += 1
+        report[language] = {"texts": len(texts), "answered_as_english": local}
+    return report
+
+def train(paths: List[str], output: str, holdout: float = 0.2, max_per_language: int = 4000, seed: int = 0) -> Dict:
+    """Train profiles from processed exports, report held-out results and write them to output."""
+    rng = random.Random(seed)
+    samples = collect_samples(paths)
+    train_samples, test_samples = {}, {}
+    for language, texts in samples.items():
+        texts = texts[:]
+        rng.shuffle(texts)
+        texts = texts[:max_per_language]
+        split = int(len(texts) * holdout)
+        test_samples[language] = texts[:split]
+        train_samples[language] = texts[split:]
+
+    # Seed texts only ever go into training
+    for language, texts in SEED_TEXTS.items():
+        train_samples[language] = train_samples.get(language, []) + texts
+
+    floor_quantiles = {"English": ENGLISH_FLOOR_QUANTILE}
+    evaluation_samples = {language: texts + EVALUATION_TEXTS.get(language, []) for language, texts in test_samples.items()}
+    for language, texts in EVALUATION_TEXTS.items():
+        evaluation_samples.setdefault(language, texts)
+    report = evaluate(
+        LanguageIdentifier(train_profiles(train_samples, floor_quantiles=floor_quantiles)),
+        evaluation_samples, LANGID_THRESHOLD
+    )
+
+    # Ship profiles trained on everything but the evaluation texts
+    profiles = train_profiles({
+        language: texts + test_samples.get(language, []) for language, texts in train_samples.items()
+    }, floor_quantiles=floor_quantiles)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({"orders": list(NGRAM_ORDERS), "profiles": profiles}, f, ensure_ascii=False, separators=(",", ":"))
+    return report
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Local language identification")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = subparsers.add_parser("train", help="Build language profiles from processed exports")
+    train_parser.add_argument("exports", nargs="+", help="Processed export JSON files with LANGUAGE labels")
+    train_parser.add_argument("--output", default=LANGID_PROFILE_PATH)
+
+    identify_parser = subparsers.add_parser("identify", help="Identify the language of texts")
+    identify_parser.add_argument("texts", nargs="+")
+
+    args = parser.parse_args()
+    if args.command == "train":
+        print(json.dumps(train(args.exports, args.output), indent=2, ensure_ascii=False))
+    else:
+        identifier = get_identifier()
+        if identifier is None:
+            sys.exit(1)
+        for text in args.texts:
+            language, confidence = identifier.identify(text)
+            print(f"{language or '-'}\t{confidence:.4f}\t{local_translation(text) is not None}\t{text}")
@@ -0,0 +1,137 @@
+from typing import Dict, List
+
+# Short texts in Latin-script languages the labelled exports have too few
+# examples of. They give languageId a profile to compare against, so German
+# or Spanish messages are not mistaken for English and left untranslated.
+SEED_TEXTS: Dict[str, List[str]] = {
+    "German": [
+        "Guten Abend, weiß jemand, wo man in der Stadt eine günstige Wohnung für eine Familie mit zwei Kindern finden kann?",
+        "Wir sind seit drei Monaten hier und warten immer noch auf die Aufenthaltserlaubnis vom Amt.",
+        "Die Kinder gehen jetzt in die Schule, aber sie verstehen die Sprache noch nicht gut und brauchen Hilfe bei den Hausaufgaben.",
+        "Ich suche Arbeit als Krankenschwester oder in der Pflege, ich habe zwanzig Jahre Erfahrung.",
+        "Kann mir jemand sagen, welche Unterlagen man für das Kindergeld braucht und wie lange es dauert?",
+        "Am Samstag gibt es eine kostenlose Verteilung von Lebensmitteln und Kleidung vor der Kirche.",
+        "Der Arzt hat gesagt, dass ich einen Termin beim Spezialisten brauche, aber die Wartezeit ist sehr lang.",
+        "Vielen Dank für eure Unterstützung, ohne euch hätten wir das nicht geschafft.",
+        "Wer fährt nächste Woche mit dem Auto zur Grenze und kann ein Paket für meine Mutter mitnehmen?",
+        "Bitte schreibt mir eine Nachricht, wenn ihr einen Deutschkurs für Erwachsene am Abend kennt.",
+    ],
+    "Spanish": [
+        "Buenas tardes, ¿alguien sabe dónde se puede encontrar un piso barato para una familia con dos niños?",
+        "Llevamos tres meses aquí y todavía estamos esperando el permiso de residencia de la oficina.",
+        "Los niños ya van a la escuela, pero todavía no entienden bien el idioma y necesitan ayuda con los deberes.",
+        "Busco trabajo como enfermera o cuidadora de personas mayores, tengo veinte años de experiencia.",
+        "¿Alguien me puede decir qué documentos se necesitan para la ayuda por hijos y cuánto tiempo tarda?",
+        "El sábado hay un reparto gratuito de comida y ropa delante de la iglesia.",
+        "El médico me dijo que necesito una cita con el especialista, pero la lista de espera es muy larga.",
+        "Muchas gracias por vuestro apoyo, sin vosotros no lo habríamos conseguido.",
+        "¿Quién va en coche a la frontera la semana que viene y puede llevar un paquete para mi madre?",
+        "Por favor, escribidme si conocéis un curso de idioma para adultos por la tarde.",
+    ],
+    "French": [
+        "Bonsoir, est-ce que quelqu'un sait où l'on peut trouver un logement pas cher pour une famille avec deux enfants ?",
+        "Nous sommes ici depuis trois mois et nous attendons toujours le titre de séjour de la préfecture.",
+        "Les enfants vont maintenant à l'école, mais ils ne comprennent pas encore bien la langue et ont besoin d'aide pour les devoirs.",
+        "Je cherche du travail comme infirmière ou aide à domicile, j'ai vingt ans d'expérience.",
+        "Quelqu'un peut-il me dire quels documents il faut pour les allocations familiales et combien de temps cela prend ?",
+        "Samedi, il y a une distribution gratuite de nourriture et de vêtements devant l'église.",
+        "Le médecin m'a dit que j'ai besoin d'un rendez-vous chez le spécialiste, mais l'attente est très longue.",
+        "Merci beaucoup pour votre soutien, sans vous nous n'y serions pas arrivés.",
+        "Qui va en voiture à la frontière la semaine prochaine et peut prendre un colis pour ma mère ?",
+        "Écrivez-moi s'il vous plaît si vous connaissez un cours de langue pour adultes le soir.",
+    ],
+    "Italian": [
+        "Buonasera, qualcuno sa dove si può trovare un appartamento economico per una famiglia con due bambini?",
+        "Siamo qui da tre mesi e stiamo ancora aspettando il permesso di soggiorno dalla questura.",
+        "I bambini adesso vanno a scuola, ma non capiscono ancora bene la lingua e hanno bisogno di aiuto con i compiti.",
+        "Cerco lavoro come infermiera o badante, ho vent'anni di esperienza.",
+        "Qualcuno mi può dire quali documenti servono per l'assegno per i figli e quanto tempo ci vuole?",
+        "Sabato c'è una distribuzione gratuita di cibo e vestiti davanti alla chiesa.",
+        "Il medico mi ha detto che ho bisogno di una visita dallo specialista, ma l'attesa è molto lunga.",
+        "Grazie mille per il vostro sostegno, senza di voi non ce l'avremmo fatta.",
+        "Chi va in macchina al confine la settimana prossima e può portare un pacco per mia madre?",
+        "Scrivetemi per favore se conoscete un corso di lingua per adulti la sera.",
+    ],
+    "Portuguese": [
+        "Boa tarde, alguém sabe onde se pode encontrar um apartamento barato para uma família com dois filhos?",
+        "Estamos aqui há três meses e ainda estamos à espera da autorização de residência.",
+        "As crianças já vão à escola, mas ainda não entendem bem a língua e precisam de ajuda com os trabalhos de casa.",
+        "Procuro trabalho como enfermeira ou cuidadora de idosos, tenho vinte anos de experiência.",
+        "Alguém me pode dizer que documentos são precisos para o abono de família e quanto tempo demora?",
+        "No sábado há uma distribuição gratuita de comida e roupa em frente à igreja.",
+        "O médico disse que preciso de uma consulta com o especialista, mas a lista de espera é muito longa.",
+        "Muito obrigada pelo vosso apoio, sem vocês não teríamos conseguido.",
+        "Quem vai de carro até à fronteira na próxima semana e pode levar uma encomenda para a minha mãe?",
+        "Escrevam-me por favor se conhecerem um curso de língua para adultos à noite.",
+    ],
+    "Czech": [
+        "Dobrý večer, neví někdo, kde se dá najít levný byt pro rodinu se dvěma dětmi?",
+        "Jsme tady už tři měsíce a pořád čekáme na povolení k pobytu z úřadu.",
+        "Děti už chodí do školy, ale ještě dobře nerozumí jazyku a potřebují pomoc s úkoly.",
+        "Hledám práci jako zdravotní sestra nebo pečovatelka, mám dvacet let zkušeností.",
+        "Může mi někdo říct, jaké doklady jsou potřeba na přídavky na děti a jak dlouho to trvá?",
+        "V sobotu je před kostelem bezplatná výdej jídla a oblečení.",
+        "Lékař mi řekl, že potřebuji termín u specialisty, ale čekací doba je velmi dlouhá.",
+        "Moc děkujeme za vaši podporu, bez vás bychom to nezvládli.",
+        "Kdo jede příští týden autem na hranice a může vzít balík pro moji maminku?",
+        "Napište mi prosím, jestli znáte večerní jazykový kurz pro dospělé.",
+    ],
+    "Romanian": [
+        "Bună seara, știe cineva unde se poate găsi un apartament ieftin pentru o familie cu doi copii?",
+        "Suntem aici de trei luni și încă așteptăm permisul de ședere de la birou.",
+        "Copiii merg acum la școală, dar încă nu înțeleg bine limba și au nevoie de ajutor la teme.",
+        "Caut de lucru ca asistentă medicală sau îngrijitoare, am douăzeci de ani de experiență.",
+        "Îmi poate spune cineva ce acte sunt necesare pentru alocația copiilor și cât durează?",
+        "Sâmbătă este o distribuire gratuită de mâncare și haine în fața bisericii.",
+        "Medicul mi-a spus că am nevoie de o programare la specialist, dar așteptarea este foarte lungă.",
+        "Vă mulțumim mult pentru sprijin, fără voi nu am fi reușit.",
+        "Cine merge cu mașina la graniță săptămâna viitoare și poate lua un pachet pentru mama mea?",
+        "Scrieți-mi vă rog dacă știți un curs de limbă pentru adulți seara.",
+    ],
+    # Russian and Ukrainian typed in Latin letters, common in the channels.
+    # Without a profile of their own they fit English best and would be kept
+    # untranslated; identified as this, they go to the LLM like any other language.
+    "Romanised Cyrillic": [
+        "Dobryi vecher, kto-nibud znaet gde v gorode mozhno snyat nedoroguyu kvartiru dlya semi s dvumya detmi?",
+        "My zdes uzhe tri mesyatsa i vse eshche zhdem razresheniya na prozhivanie.",
+        "Deti uzhe hodyat v shkolu, no poka ploho ponimayut yazyk i im nuzhna pomoshch s domashkoy.",
+        "Ishchu rabotu medsestroy ili sidelkoy, u menya dvadtsat let opyta.",
+        "Podskazhite pozhaluysta, kakie dokumenty nuzhny na detskie i skolko eto zanimaet vremeni?",
+        "V subbotu vozle tserkvi budut besplatno razdavat produkty i odezhdu.",
+        "Vrach skazal chto nuzhna zapis k spetsialistu, no ochered ochen bolshaya.",
+        "Spasibo vsem bolshoe za podderzhku, bez vas my by ne spravilis.",
+        "Kto edet na mashine na granitsu na sleduyushchey nedele i mozhet vzyat posylku dlya mamy?",
+        "Napishite mne pozhalujsta esli znaete vechernie kursy yazyka dlya vzroslyh.",
+        "Privet vsem! Gde tut blizhaishaya apteka, kotoraya rabotaet noch'yu?",
+        "Devochki, podskazhite horoshego detskogo vracha, kotoryi govorit po-russki.",
+        "Dobryi vechir, chy hto znaie de v misti mozhna znaity nedorohu kvartyru dlia simi z dvoma ditmy?",
+        "My tut vzhe try misiatsi i dosi chekaiemo na dozvil na prozhyvannia.",
+        "Dity vzhe khodiat do shkoly, ale shche pohano rozumiiut movu i potrebuiut dopomohy z domashnimy zavdanniamy.",
+        "Shukaiu robotu medsestroiu abo dohlialnytseiu, maiu dvadtsiat rokiv dosvidu.",
+        "Pidkazhit bud laska, yaki dokumenty potribni na dytiachi i skilky tse trivaie?",
+        "U subotu bilia tserkvy bude bezkoshtovna rozdacha produktiv i odiahu.",
+        "Likar skazav shcho potriben zapys do spetsialista, ale cherha duzhe velyka.",
+        "Diakuiemo vsim za pidtrymku, bez vas my b ne vporalysia.",
+        "Khto yide mashynoiu na kordon nastupnoho tyzhnia i mozhe vziaty posylku dlia mamy?",
+        "Napyshit meni bud laska, yakshcho znaiete vechirni kursy movy dlia doroslykh.",
+        "Pryvit usim! De tut naiblyzhcha apteka, yaka pratsiuie vnochi?",
+        "Divchata, poradte horoshoho dytiachoho likaria, yakyi hovoryt ukrainskoiu.",
+    ],
+}
+
+# Texts that are only used to evaluate the profiles, never to build them.
+# Each of them has to go to the LLM rather than be kept as English.
+EVALUATION_TEXTS: Dict[str, List[str]] = {
+    "Romanised Cyrillic": [
+        "Privet, kak dela? Gde mozhno poluchit pomosh?",
+        "Podskazhite, pozhaluista, gde mozhno besplatno poluchit odezhdu dlya rebenka?",
+        "Kto znaet, rabotaet li segodnya punkt vydachi gumanitarki na vokzale?",
+        "Nuzhen perevodchik s polskogo na russkiy dlya vizita v urzad, kto mozhet pomoch?",
+        "Skolko stoit proezd na avtobuse do Varshavy i gde kupit bilet?",
+        "Dobryi den, de mozhna otrymaty dopomohu dlia ditei?",
+        "Khto znaie, chy pratsiuie sohodni punkt vydachi humanitarnoi dopomohy?",
+        "Potriben perekladach z polskoi, bud laska dopomozhit, duzhe treba.",
+        "Skilky koshtuie proizd avtobusom do Varshavy i de kupyty kvytok?",
+        "Shchyro diakuiu vsim volonteram za dopomohu nashii rodyni!",
+    ],
+}
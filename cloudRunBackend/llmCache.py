@@ -0,0 +1,352 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+from stageMetrics import record_cache_hit
+
+# Set up logging
+logger = logging.getLogger("json-processor-api")
+
+# =====================================================================
+# CONFIGURATION - Use environment variables for Cloud Run compatibility
+# =====================================================================
+
+LLM_CACHE_ENABLED = os.environ.get("LLM_CACHE_ENABLED", "True").lower() == "true"
+
+# Skip cache reads (responses are still written), e.g. after a prompt fix
+LLM_CACHE_BYPASS = os.environ.get("LLM_CACHE_BYPASS", "False").lower() == "true"
+
+# "sqlite" (one database file) or "files" (one JSON file per response)
+LLM_CACHE_BACKEND = os.environ.get("LLM_CACHE_BACKEND", "sqlite").lower()
+LLM_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", "/tmp/processing/llm_cache.sqlite")
+
+# Responses older than this are ignored and evicted (0 keeps them forever)
+LLM_CACHE_TTL = float(os.environ.get("LLM_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+
+# Least recently used responses are evicted beyond this total size
+LLM_CACHE_MAX_BYTES = int(os.environ.get("LLM_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Bump when the key layout changes so old entries are no longer matched
+KEY_VERSION = 1
+
+# Writes between size checks
+EVICT_EVERY = 200
+
+def hash_file(path: str) -> str:
+    """SHA-256 of a media file, used in place of its content in cache keys."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def make_key(model: str, messages: Any, params: Dict = None, media: Iterable[str] = ()) -> str:
+    """
+    Build the cache key of an LLM call.
+
+    Args:
+        model: Model name
+        messages: Prompt or chat messages (anything JSON-serializable)
+        params: Generation parameters that change the response (e.g. max_tokens)
+        media: Content hashes of media sent with the request
+
+    Returns:
+        Hex SHA-256 of the canonical JSON of all parts
+    """
+    payload = {
+        "v": KEY_VERSION,
+        "model": model,
+        "messages": messages,
+        "params": params or {},
+        "media": list(media),
+    }
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+class SqliteBackend:
+    """Responses in one SQLite table, evicted by last access."""
+
+    def __init__(self, path: str, ttl: float, max_bytes: int):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._writes_since_evict = 0
+
+        parent_dir = os.path.dirname(path)
+        if parent_dir:
+            os.makedirs(parent_dir, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if self.ttl and time.time() - created_at > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            return value
+
+    def put(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value.encode("utf-8")), now, now)
+            )
+            self._conn.commit()
+            self._writes_since_evict += 1
+            if self._writes_since_evict >= EVICT_EVERY:
+                self._evict()
+                self._writes_since_evict = 0
+
+    def _evict(self) -> None:
+        """Drop expired rows, then the least recently used ones until under max_bytes."""
+        if self.ttl:
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total > self.max_bytes:
+            rows = self._conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC").fetchall()
+            doomed = []
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                doomed.append((key,))
+                total -= size
+            self._conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+            logger.info(f"Evicted {len(doomed)} entries from LLM cache")
+        self._conn.commit()
+
+class FileBackend:
+    """Responses as JSON files in a directory tree, evicted by modification time."""
+
+    def __init__(self, path: str, ttl: float, max_bytes: int):
+        self.root = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._writes_since_evict = 0
+        os.makedirs(path, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            if self.ttl and time.time() - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)["value"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, key: str, value: str) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file and rename, so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({"value": value, "created_at": time.time()}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._writes_since_evict += 1
+            if self._writes_since_evict >= EVICT_EVERY:
+                self._evict()
+                self._writes_since_evict = 0
+
+    def _evict(self) -> None:
+        """Drop expired files, then the oldest ones until under max_bytes."""
+        files = []
+        now = time.time()
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if self.ttl and now - stat.st_mtime > self.ttl:
+                    os.remove(path)
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except OSError:
+                pass
+        if removed:
+            logger.info(f"Evicted {removed} entries from LLM cache")
+
+class LLMCache:
+    """
+    Content-addressed cache of LLM responses.
+
+    Callers build a key with make_key from everything that determines the
+    response (model, messages, media hashes, parameters) and store the raw
+    response text after it has been validated, so a bad response is never
+    replayed.
+    """
+
+    def __init__(self, backend, bypass: bool = False):
+        self.backend = backend
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for key, or None."""
+        value = None
+        if not self.bypass:
+            try:
+                value = self.backend.get(key)
+            except Exception as e:
+                logger.error(f"Error reading from LLM cache: {e}")
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def put(self, key: str, value: str) -> None:
+        """Store a response."""
+        if value is None:
+            return
+        try:
+            self.backend.put(key, value)
+        except Exception as e:
+            logger.error(f"Error writing to LLM cache: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": type(self.backend).__name__,
+                "bypass": self.bypass,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+_cache = None
+_cache_failed = False
+_cache_lock = threading.Lock()
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """Get the shared LLM cache, or None if it is disabled or cannot be opened."""
+    global _cache, _cache_failed
+    if not LLM_CACHE_ENABLED or _cache_failed:
+        return None
+    with _cache_lock:
+        if _cache is None and not _cache_failed:
+            try:
+                if LLM_CACHE_BACKEND == "files":
+                    backend = FileBackend(LLM_CACHE_PATH, LLM_CACHE_TTL, LLM_CACHE_MAX_BYTES)
+                elif LLM_CACHE_BACKEND == "sqlite":
+                    backend = SqliteBackend(LLM_CACHE_PATH, LLM_CACHE_TTL, LLM_CACHE_MAX_BYTES)
+                else:
+                    raise ValueError(f"Unsupported LLM_CACHE_BACKEND '{LLM_CACHE_BACKEND}', expected 'sqlite' or 'files'")
+                _cache = LLMCache(backend, bypass=LLM_CACHE_BYPASS)
+                logger.info(f"LLM cache opened at {LLM_CACHE_PATH} ({LLM_CACHE_BACKEND})")
+            except Exception as e:
+                logger.error(f"Could not open LLM cache, continuing without it: {e}")
+                _cache_failed = True
+        return _cache
+
+def get_llm_cache_stats() -> Optional[Dict[str, Any]]:
+    """Return LLM cache counters, or None if the cache is disabled."""
+    cache = get_llm_cache()
+    return cache.stats() if cache is not None else None
+
+def cached_response(key: str, fetch: Callable[[], str], parse: Callable[[str], Any] = None) -> Any:
+    """
+    Return the (parsed) response for key, calling the LLM only on a cache miss.
+
+    The response is stored only after parse succeeds, so a malformed response
+    raises as before and is not replayed on the next run.
+
+    Args:
+        key: Key from make_key
+        fetch: Calls the LLM and returns the raw response text
+        parse: Optional conversion of the response text (e.g. json.loads)
+
+    Returns:
+        parse(response), or the response text without parse
+    """
+    cache = get_llm_cache()
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            try:
+                result = parse(cached) if parse else cached
+                record_cache_hit()
+                return result
+            except Exception as e:
+                logger.warning(f"Ignoring unparsable cached LLM response: {e}")
+
+    value = fetch()
+    result = parse(value) if parse else value
+    if cache is not None:
+        cache.put(key, value)
+    return result
+
+async def cached_response_async(key: str, fetch: Callable[[], Awaitable[str]], parse: Callable[[str], Any] = None) -> Any:
+    """Async variant of cached_response for coroutine fetch functions."""
+    cache = get_llm_cache()
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            try:
+                result = parse(cached) if parse else cached
+                record_cache_hit()
+                return result
+            except Exception as e:
+                logger.warning(f"Ignoring unparsable cached LLM response: {e}")
+
+    value = await fetch()
+    result = parse(value) if parse else value
+    if cache is not None:
+        cache.put(key, value)
+    return result
@@ -0,0 +1,72 @@
+import os
+import re
+import logging
+from typing import Optional
+
+from nerImplementation import clean_text
+
+# Set up logging
+logger = logging.getLogger("json-processor-api")
+
+# =====================================================================
+# CONFIGURATION - Use environment variables for Cloud Run compatibility
+# =====================================================================
+
+PREFILTER_ENABLED = os.environ.get("PREFILTER_ENABLED", "True").lower() == "true"
+
+# Texts with fewer words than this are trivial ("+1", "ok", "thanks!")
+PREFILTER_MIN_WORDS = int(os.environ.get("PREFILTER_MIN_WORDS", "2"))
+
+# Texts where letters make up less of the non-space characters than this are
+# trivial (emoji, stickers, numbers, punctuation)
+PREFILTER_MIN_ALPHA_RATIO = float(os.environ.get("PREFILTER_MIN_ALPHA_RATIO", "0.5"))
+
+# Words containing at least one letter, in any script
+WORD_PATTERN = re.compile(r"[^\W\d_]+(?:['’-][^\W\d_]+)*")
+
+def trivial_reason(text: str) -> Optional[str]:
+    """
+    Cheaply decide whether a text is too trivial to categorize or search for locations.
+
+    Args:
+        text: Fused message text
+
+    Returns:
+        The reason the text is trivial ("empty", "url_only", "non_alphabetic",
+        "too_short"), or None if it should be processed
+    """
+    if not text or not text.strip():
+        return "empty"
+
+    # Same cleaning as the NER stage: drops URLs, e-mail addresses and extra whitespace
+    cleaned = clean_text(text)
+    if not cleaned:
+        return "url_only"
+
+    characters = [c for c in cleaned if not c.isspace()]
+    letters = sum(1 for c in characters if c.isalpha())
+    if letters / len(characters) < PREFILTER_MIN_ALPHA_RATIO:
+        return "non_alphabetic"
+
+    if len(WORD_PATTERN.findall(cleaned)) < PREFILTER_MIN_WORDS:
+        return "too_short"
+
+    return None
+
+def filter_status(text: str) -> Optional[dict]:
+    """
+    Run the pre-filter on a text.
+
+    Args:
+        text: Fused message text
+
+    Returns:
+        {"status": "filtered", "reason": ...} for trivial texts, None otherwise
+        (also None when the pre-filter is disabled)
+    """
+    if not PREFILTER_ENABLED:
+        return None
+    reason = trivial_reason(text)
+    if reason is None:
+        return None
+    return {"status": "filtered", "reason": reason}
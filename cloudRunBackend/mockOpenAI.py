@@ -0,0 +1,187 @@
+import re
+import ast
+import json
+import time
+import uuid
+import random
+import threading
+from collections import deque
+import argparse
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Set up logging
+logger = logging.getLogger("mock_openai")
+
+# Text between the tags of the translation prompt (helpers.buildTranslationPrompt)
+TRANSLATION_TEXT = re.compile(r"<start> (.*?) <end>", re.DOTALL)
+
+# JSON array of {"id", "text"} in the packed prompt (helpers.buildPackedTranslationPrompt)
+PACKED_TEXTS = re.compile(r"<texts>\n(.*)\n</texts>", re.DOTALL)
+
+# Subtopic keyword dictionary in the thematic analysis prompt (themePrompts.buildThemeMessages)
+THEME_KEYWORDS = re.compile(r"<dict>(\{.*\}) <dict>", re.DOTALL)
+
+def guess_language(text):
+    """Rough language label so responses look like the real ones"""
+    if re.search(r"[іїєґІЇЄҐ]", text):
+        return "Ukrainian"
+    if re.search(r"[а-яА-ЯёЁ]", text):
+        return "Russian"
+    if re.search(r"[ąćęłńóśźżĄĆĘŁŃÓŚŹŻ]", text):
+        return "Polish"
+    return "English"
+
+def mock_translation(text):
+    """Translation result dict for one text"""
+    if not re.search(r"\w", text):
+        return {"translation": "", "language": ""}
+    return {"translation": f"[EN] {text}", "language": guess_language(text)}
+
+def mock_reply(prompt, drop_rate=0.0):
+    """Answer a translation (single or packed), thematic analysis or photo prompt"""
+    packed = PACKED_TEXTS.search(prompt)
+    if packed is not None:
+        # Leave out some items, like a model that loses track of long packs
+        items = [
+            {"id": item["id"], **mock_translation(item["text"])}
+            for item in json.loads(packed.group(1))
+            if random.random() >= drop_rate
+        ]
+        return json.dumps(items, ensure_ascii=False)
+
+    themes = THEME_KEYWORDS.search(prompt)
+    match = TRANSLATION_TEXT.search(prompt)
+    if themes is not None and match is not None:
+        # Subtopics whose keywords appear in the text
+        text = match.group(1).lower()
+        keywords = ast.literal_eval(themes.group(1))
+        subtopics = [
+            subtopic for subtopic, words in keywords.items()
+            if any(word.strip().lower() in text for word in words.split(","))
+        ]
+        return str(subtopics or ["Undefined"])
+
+    if prompt.startswith("Describe this image"):
+        return "A mock description of the image."
+
+    if match is None:
+        return "This is a mock response."
+    return json.dumps(mock_translation(match.group(1)), ensure_ascii=False)
+
+def count_tokens(text):
+    """Approximate token count (about four characters per token)"""
+    return max(1, len(text) // 4)
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    """Answers /v1/chat/completions requests like the OpenAI API, without network access"""
+
+    latency = 0.0
+    drop_rate = 0.0
+    # Requests per minute before answering 429, like an account's rate limit (0: unlimited)
+    rpm = 0
+    # Share of requests answered with a 500
+    error_rate = 0.0
+    _recent = deque()
+    _recent_lock = threading.Lock()
+
+    def rate_limit_headers(self):
+        """Take a request from the per-minute budget; returns (allowed, x-ratelimit headers)"""
+        if not self.rpm:
+            return True, {}
+        now = time.time()
+        with self._recent_lock:
+            while self._recent and now - self._recent[0] >= 60:
+                self._recent.popleft()
+            allowed = len(self._recent) < self.rpm
+            if allowed:
+                self._recent.append(now)
+            reset = 60 - (now - self._recent[0]) if self._recent else 0
+            headers = {
+                "x-ratelimit-limit-requests": str(self.rpm),
+                "x-ratelimit-remaining-requests": str(self.rpm - len(self._recent)),
+                "x-ratelimit-reset-requests": f"{reset:.3f}s",
+            }
+        if not allowed:
+            headers["retry-after-ms"] = str(int(reset * 1000))
+        return allowed, headers
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self.send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        allowed, headers = self.rate_limit_headers()
+        if not allowed:
+            self.send_json(429, {"error": {"message": "Rate limit reached for requests", "type": "requests", "code": "rate_limit_exceeded"}}, headers)
+            return
+        if self.latency:
+            time.sleep(self.latency)
+        if random.random() < self.error_rate:
+            self.send_json(500, {"error": {"message": "The server had an error while processing your request.", "type": "server_error"}}, headers)
+            return
+
+        prompt = "".join(
+            message.get("content", "") for message in request.get("messages", [])
+            if isinstance(message.get("content"), str)
+        )
+        content = mock_reply(prompt, self.drop_rate)
+        prompt_tokens = count_tokens(prompt)
+        completion_tokens = count_tokens(content)
+
+        self.send_json(200, {
+            "id": f"chatcmpl-mock-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "gpt-4o"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }, headers)
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Local stand-in for the OpenAI API (set OPENAI_BASE_URL=http://localhost:8090/v1)"
+    )
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", type=float, default=1.0, help="Seconds to wait before each response")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Share of packed items to leave out of replies")
+    parser.add_argument("--rpm", type=int, default=0, help="Requests per minute before answering 429 (0: unlimited)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with a 500")
+    args = parser.parse_args()
+
+    MockOpenAIHandler.latency = args.latency
+    MockOpenAIHandler.drop_rate = args.drop_rate
+    MockOpenAIHandler.rpm = args.rpm
+    MockOpenAIHandler.error_rate = args.error_rate
+
+    server = ThreadingHTTPServer((args.host, args.port), MockOpenAIHandler)
+    logger.info(f"Mock OpenAI API listening on http://{args.host}:{args.port}/v1")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,172 @@
+import os
+import sys
+import json
+import struct
+import logging
+from typing import Dict, Optional
+
+# Set up logging
+logger = logging.getLogger("vector_classifier")
+
+MANIFEST_FILE_NAME = "manifest.json"
+MANIFEST_FORMAT_VERSION = 1
+
+# Weights files in order of preference, with their format
+WEIGHTS_CANDIDATES = [
+    ("model.safetensors", "safetensors"),
+    ("pytorch_model.bin", "pytorch"),
+]
+
+# Files every sentence transformer directory needs
+REQUIRED_MODEL_FILES = ["config.json", "modules.json"]
+
+def validate_safetensors(weights_path: str) -> None:
+    """
+    Check that a file has a readable safetensors header.
+
+    Args:
+        weights_path: Path to the .safetensors file
+
+    Raises:
+        ValueError: If the header is truncated or not valid JSON
+    """
+    with open(weights_path, 'rb') as f:
+        raw_length = f.read(8)
+        if len(raw_length) != 8:
+            raise ValueError(f"Truncated safetensors file: {weights_path}")
+        header_length = struct.unpack("<Q", raw_length)[0]
+        if header_length <= 0 or header_length > os.path.getsize(weights_path):
+            raise ValueError(f"Invalid safetensors header length in {weights_path}")
+        try:
+            json.loads(f.read(header_length))
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid safetensors header in {weights_path}: {e}")
+
+def build_manifest(model_root: str, sentence_transformer_dir: str = "sentence_transformer") -> Dict:
+    """
+    Resolve and validate the files of a vector model package.
+
+    Run this when the package is built, so that the runtime never has to search
+    for the weights or convert them.
+
+    Args:
+        model_root: Root directory of the vector model package
+        sentence_transformer_dir: Sentence transformer directory, relative to model_root
+
+    Returns:
+        Manifest dictionary with paths relative to model_root
+
+    Raises:
+        FileNotFoundError: If a required file is missing
+        ValueError: If the weights file is corrupt
+    """
+    model_dir = os.path.join(model_root, sentence_transformer_dir)
+    if not os.path.isdir(model_dir):
+        raise FileNotFoundError(f"Sentence transformer directory not found: {model_dir}")
+
+    for name in REQUIRED_MODEL_FILES:
+        if not os.path.exists(os.path.join(model_dir, name)):
+            raise FileNotFoundError(f"Required model file missing: {os.path.join(model_dir, name)}")
+
+    weights = None
+    for file_name, weights_format in WEIGHTS_CANDIDATES:
+        weights_path = os.path.join(model_dir, file_name)
+        if os.path.exists(weights_path):
+            if weights_format == "safetensors":
+                validate_safetensors(weights_path)
+            weights = {
+                "path": os.path.join(sentence_transformer_dir, file_name),
+                "format": weights_format,
+                "size": os.path.getsize(weights_path),
+            }
+            break
+    if weights is None:
+        raise FileNotFoundError(f"No model weights found in {model_dir}")
+
+    def optional(file_name):
+        return file_name if os.path.exists(os.path.join(model_root, file_name)) else None
+
+    manifest = {
+        "format_version": MANIFEST_FORMAT_VERSION,
+        "sentence_transformer": sentence_transformer_dir,
+        "weights": weights,
+        "category_embeddings": optional("category_embeddings.json"),
+        "category_vectors": optional("category_vectors.npy"),
+        "category_labels": optional("category_labels.json"),
+        "metadata": optional("metadata.json"),
+        "knn_index": optional("knn_index.json"),
+    }
+
+    has_artifact = manifest["category_vectors"] and manifest["category_labels"]
+    if not has_artifact and not manifest["category_embeddings"]:
+        raise FileNotFoundError(f"No category embeddings found in {model_root}")
+
+    return manifest
+
+def write_manifest(model_root: str) -> Dict:
+    """
+    Build, validate and save the manifest of a vector model package.
+
+    Args:
+        model_root: Root directory of the vector model package
+
+    Returns:
+        The manifest that was written
+    """
+    manifest = build_manifest(model_root)
+    manifest_path = os.path.join(model_root, MANIFEST_FILE_NAME)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    logger.info(f"Wrote model manifest to {manifest_path}")
+    return manifest
+
+def load_manifest(model_root: str) -> Optional[Dict]:
+    """
+    Load a package manifest and resolve its paths against model_root.
+
+    Args:
+        model_root: Root directory of the vector model package
+
+    Returns:
+        Manifest with absolute paths, or None if there is no usable manifest
+    """
+    manifest_path = os.path.join(model_root, MANIFEST_FILE_NAME)
+    if not os.path.exists(manifest_path):
+        return None
+
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except Exception as e:
+        logger.error(f"Error reading model manifest {manifest_path}: {e}")
+        return None
+
+    if manifest.get("format_version") != MANIFEST_FORMAT_VERSION:
+        logger.warning(f"Unsupported manifest version in {manifest_path}, ignoring it")
+        return None
+
+    def resolve(relative_path):
+        return os.path.join(model_root, relative_path) if relative_path else None
+
+    resolved = {
+        "model_path": resolve(manifest["sentence_transformer"]),
+        "weights_path": resolve(manifest["weights"]["path"]),
+        "weights_format": manifest["weights"]["format"],
+        "category_embeddings_path": resolve(manifest.get("category_embeddings")),
+        "category_vectors_path": resolve(manifest.get("category_vectors")),
+        "category_labels_path": resolve(manifest.get("category_labels")),
+        "metadata_path": resolve(manifest.get("metadata")),
+        "knn_index_path": resolve(manifest.get("knn_index")),
+    }
+
+    if not os.path.exists(resolved["weights_path"]):
+        logger.error(f"Manifest weights file does not exist: {resolved['weights_path']}")
+        return None
+
+    return resolved
+
+if __name__ == "__main__":
+    # Build-time step: python modelPackage.py /app/models/vector_model_package
+    logging.basicConfig(level=logging.INFO)
+    root = sys.argv[1] if len(sys.argv) > 1 else os.environ.get("VECTOR_MODEL_PATH", "/app/models/vector_model_package")
+    print(json.dumps(write_manifest(root), indent=2))
@@ -0,0 +1,221 @@
+import os
+import time
+import logging
+import threading
+import traceback
+from typing import Any, Callable, Dict, List, Optional
+
+# Set up logging
+logger = logging.getLogger("model_registry")
+
+# How often the versions directories are checked for a new version
+POLL_SECONDS = float(os.environ.get("MODEL_REGISTRY_POLL_SECONDS", "30"))
+
+# Optional file in a versions directory naming the version to serve
+CURRENT_FILE_NAME = "CURRENT"
+
+class ModelRegistry:
+    """
+    Serve the active version of a model package and hot-swap new versions.
+
+    A versions directory holds one sub-directory per model package version.
+    The version to serve is the one named in the CURRENT file, or the
+    lexicographically latest directory when there is no CURRENT file. A
+    watcher thread polls the directory. When the selected version changes,
+    the new package is loaded in the background and swapped in atomically.
+    Requests keep using the previous version until the swap, and a failed
+    load leaves the previous version active.
+    """
+
+    def __init__(self, name: str, versions_dir: str, loader: Callable[[str], Any], poll_seconds: float = POLL_SECONDS):
+        """
+        Create a registry.
+
+        Args:
+            name: Name used in logs and status reports (e.g. "vector", "ner")
+            versions_dir: Directory containing one sub-directory per version
+            loader: Function that loads a model from a package directory
+            poll_seconds: Interval between checks for a new version
+        """
+        self.name = name
+        self.versions_dir = versions_dir
+        self.loader = loader
+        self.poll_seconds = poll_seconds
+
+        self._model = None
+        self._active_version = None
+        self._loaded_at = None
+        self._loading_version = None
+        self._failed_version = None
+        self._last_error = None
+
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._watcher = None
+
+    def available_versions(self) -> List[str]:
+        """List the version directories, oldest first."""
+        if not os.path.isdir(self.versions_dir):
+            return []
+        return sorted(
+            entry for entry in os.listdir(self.versions_dir)
+            if not entry.startswith(".") and os.path.isdir(os.path.join(self.versions_dir, entry))
+        )
+
+    def selected_version(self) -> Optional[str]:
+        """Return the version that should be active."""
+        current_path = os.path.join(self.versions_dir, CURRENT_FILE_NAME)
+        if os.path.exists(current_path):
+            with open(current_path, 'r', encoding='utf-8') as f:
+                version = f.read().strip()
+            if version and version in self.available_versions():
+                return version
+            logger.warning(f"[{self.name}] CURRENT names unknown version '{version}'")
+        versions = self.available_versions()
+        return versions[-1] if versions else None
+
+    @property
+    def current(self) -> Any:
+        """The active model, or None if nothing has been loaded yet."""
+        return self._model
+
+    def get(self) -> Any:
+        """
+        Get the active model, loading the selected version on first use.
+
+        Returns:
+            The active model
+        """
+        model = self._model
+        if model is not None:
+            return model
+
+        with self._load_lock:
+            if self._model is None:
+                version = self.selected_version()
+                if version is None:
+                    raise FileNotFoundError(f"No {self.name} model versions found in {self.versions_dir}")
+                self._load(version)
+                if self._model is None:
+                    raise RuntimeError(f"Failed to load {self.name} model version {version}: {self._last_error}")
+        self.start_watching()
+        return self._model
+
+    def reload(self, version: str = None, wait: bool = False) -> bool:
+        """
+        Load a version (default: the selected one) in the background and swap it in.
+
+        An explicit version is written to the CURRENT file first, so the
+        watchers of this and every other process serving the versions
+        directory keep that version instead of switching back to the
+        previously selected one.
+
+        Args:
+            version: Version to load, one of available_versions()
+            wait: Block until the load has finished
+
+        Returns:
+            True if a load was started
+
+        Raises:
+            FileNotFoundError: If version is not a directory entry of versions_dir
+                (so paths such as "../x" are never loaded)
+            OSError: If the CURRENT file cannot be written
+        """
+        pin = version is not None
+        version = version or self.selected_version()
+        if version is None or version not in self.available_versions():
+            raise FileNotFoundError(f"Unknown {self.name} model version: {version}")
+
+        with self._lock:
+            # Under the lock, so the watcher sees either the old selection and
+            # the old active version, or the new selection already loading
+            if pin:
+                self._write_current(version)
+            if self._loading_version is not None:
+                logger.info(f"[{self.name}] Already loading version {self._loading_version}")
+                return False
+            self._loading_version = version
+
+        thread = threading.Thread(target=self._load, args=(version,), name=f"{self.name}-model-loader", daemon=True)
+        thread.start()
+        if wait:
+            thread.join()
+        return True
+
+    def check_for_update(self) -> None:
+        """Start a background load if the selected version changed."""
+        try:
+            version = self.selected_version()
+        except Exception as e:
+            logger.error(f"[{self.name}] Error reading versions directory: {e}")
+            return
+        if version is None or version == self._active_version or version == self._failed_version:
+            return
+        logger.info(f"[{self.name}] New model version detected: {version}")
+        self.reload(version)
+
+    def start_watching(self) -> None:
+        """Start the watcher thread (once)."""
+        with self._lock:
+            if self._watcher is not None or self.poll_seconds <= 0:
+                return
+            self._watcher = threading.Thread(target=self._watch, name=f"{self.name}-model-watcher", daemon=True)
+            self._watcher.start()
+
+    def status(self) -> Dict[str, Any]:
+        """Report the active version and loading state."""
+        return {
+            "name": self.name,
+            "versions_dir": self.versions_dir,
+            "active_version": self._active_version,
+            "loaded_at": self._loaded_at,
+            "loading_version": self._loading_version,
+            "failed_version": self._failed_version,
+            "last_error": self._last_error,
+            "available_versions": self.available_versions(),
+        }
+
+    def _watch(self) -> None:
+        """Poll the versions directory until the process exits."""
+        while True:
+            time.sleep(self.poll_seconds)
+            try:
+                self.check_for_update()
+            except Exception as e:
+                logger.error(f"[{self.name}] Error checking for a new model version: {e}")
+
+    def _write_current(self, version: str) -> None:
+        """Write the CURRENT file next to it and rename it into place."""
+        current_path = os.path.join(self.versions_dir, CURRENT_FILE_NAME)
+        tmp_path = f"{current_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(version + "\n")
+        os.replace(tmp_path, current_path)
+        logger.info(f"[{self.name}] CURRENT set to version {version}")
+
+    def _load(self, version: str) -> None:
+        """Load a version and swap it in on success."""
+        path = os.path.join(self.versions_dir, version)
+        start_time = time.time()
+        logger.info(f"[{self.name}] Loading model version {version} from {path}")
+        try:
+            model = self.loader(path)
+        except Exception as e:
+            logger.error(f"[{self.name}] Failed to load version {version}: {e}")
+            logger.error(traceback.format_exc())
+            with self._lock:
+                self._failed_version = version
+                self._last_error = str(e)
+                self._loading_version = None
+            return
+
+        # Swap: a single reference assignment, readers see either the old or the new model
+        with self._lock:
+            self._model = model
+            self._active_version = version
+            self._loaded_at = time.time()
+            self._failed_version = None
+            self._last_error = None
+            self._loading_version = None
+        logger.info(f"[{self.name}] Version {version} active after {time.time() - start_time:.2f} seconds")
@@ -9,13 +9,21 @@ from geopy.geocoders import Nominatim
 import spacy
 from spacy.tokens import Span
 from spacy.language import Language
+from spacy.util import filter_spans
 import tarfile
 import tempfile
 import shutil
-import atexit
 import logging
+import hashlib
 from typing import List, Dict, Any, Tuple, Optional
 
+from modelRegistry import ModelRegistry
+from geocodeCache import GeocodeCache, GEOCODE_CACHE_ENABLED, GEOCODE_CACHE_PATH
+from gazetteer import load_gazetteer
+from placeNames import load_place_names
+from geocodeCache import normalize_place_name
+from geocodeScheduler import GeocodeScheduler, GEOCODE_DOMAIN, GEOCODE_SCHEME
+
 # Set up logging
 logging.basicConfig(level=logging.INFO, 
                     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -26,29 +34,39 @@ warnings.filterwarnings("ignore", message="torch.utils._pytree._register_pytree_
 # Global variables
 nlp = None  # Single best model
 english_nlp = None
-temp_dir = None
 geolocator = None
+geocode_cache = None
+gazetteer = None
+gazetteer_checked = False
+geocode_scheduler = None
 
-def init_temp_dir():
-    """Initialize a temporary directory that will be cleaned up on exit"""
-    global temp_dir
-    temp_dir = tempfile.mkdtemp(prefix="ner_model_")
-    logger.info(f"Created temporary directory: {temp_dir}")
-    
-    # Register cleanup function
-    atexit.register(cleanup_temp_dir)
-    
-    return temp_dir
+# Extracted NER archives, one directory per archive SHA-256. bakeNerModel.py
+# fills this at image build time so that cold starts never extract.
+NER_EXTRACT_CACHE_DIR = os.environ.get("NER_EXTRACT_CACHE_DIR", "/tmp/processing/ner_model_cache")
 
-def cleanup_temp_dir():
-    """Clean up temporary directory on exit"""
-    global temp_dir
-    if temp_dir and os.path.exists(temp_dir):
-        try:
-            shutil.rmtree(temp_dir)
-            logger.info(f"Cleaned up temporary directory: {temp_dir}")
-        except Exception as e:
-            logger.error(f"Error cleaning up temporary directory: {e}")
+# Whether en_core_web_sm may be downloaded at runtime when it is missing
+NER_ALLOW_MODEL_DOWNLOAD = os.environ.get("NER_ALLOW_MODEL_DOWNLOAD", "True").lower() == "true"
+
+# Sidecar file next to the archive holding its SHA-256 (written by bakeNerModel.py)
+CHECKSUM_SUFFIX = ".sha256"
+
+# Seconds spent in each phase of the last NER pipeline load
+load_timings = {}
+
+# Mark known place names (placeNames.py) with a phrase-matching ruler ahead of
+# the statistical NER
+NER_PLACE_RULER = os.environ.get("NER_PLACE_RULER", "False").lower() == "true"
+
+# Messages up to this many characters that contain a known place name skip the
+# statistical models entirely (0 disables the fast path; needs NER_PLACE_RULER)
+NER_FAST_PATH_MAX_CHARS = int(os.environ.get("NER_FAST_PATH_MAX_CHARS", "0"))
+
+# Documents per nlp.pipe batch and number of spaCy processes for batched extraction
+NER_BATCH_SIZE = int(os.environ.get("NER_BATCH_SIZE", "64"))
+NER_PROCESSES = int(os.environ.get("NER_PROCESSES", "1"))
+
+# Optional directory of versioned NER model packages, hot-swapped by a ModelRegistry
+NER_VERSIONS_DIR = os.environ.get("NER_MODEL_VERSIONS_DIR")
 
 def get_model_path():
     """Get the path to the best NER model, handling Cloud Run environment"""
@@ -68,16 +86,94 @@ def get_model_path():
         return best_model_path
         
 
-def load_ner_model():
-    """Load the NER model, handling Cloud Run environment"""
-    global temp_dir
-    
-    # Initialize temp directory if needed
-    if not temp_dir:
-        init_temp_dir()
+def record_load_timing(phase, start_time):
+    """Record the duration of a load phase started at start_time"""
+    load_timings[phase] = round(time.time() - start_time, 3)
+    logger.info(f"NER load phase '{phase}' took {load_timings[phase]:.3f} seconds")
+
+def get_ner_load_timings():
+    """Return the phase timings of the last NER pipeline load"""
+    return dict(load_timings)
+
+def archive_checksum(archive_path):
+    """
+    Get the SHA-256 of a model archive.
+    
+    Uses the sidecar file written at build time when it is at least as new as
+    the archive, otherwise hashes the archive.
+    """
+    sidecar_path = archive_path + CHECKSUM_SUFFIX
+    if os.path.exists(sidecar_path) and os.path.getmtime(sidecar_path) >= os.path.getmtime(archive_path):
+        with open(sidecar_path, 'r') as f:
+            parts = f.read().split()
+        checksum = parts[0] if parts else ""
+        if re.fullmatch(r"[0-9a-f]{64}", checksum):
+            return checksum
+    
+    digest = hashlib.sha256()
+    with open(archive_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def find_model_dir(root):
+    """Find the spaCy model directory (the one holding meta.json) under root"""
+    if os.path.exists(os.path.join(root, "meta.json")):
+        return root
+    if os.path.exists(os.path.join(root, "ner", "meta.json")):
+        return os.path.join(root, "ner")
+    # Look for meta.json in any subdirectory
+    meta_paths = list(Path(root).rglob("meta.json"))
+    if meta_paths:
+        return os.path.dirname(meta_paths[0])
+    raise FileNotFoundError(f"meta.json not found in extracted model at {root}")
+
+def extract_model_archive(archive_path, cache_dir=None):
+    """
+    Extract a model archive into the checksum-keyed cache, unless already there.
+    
+    The archive is extracted into a staging directory and renamed into place,
+    so a partly extracted model is never picked up, even when several
+    processes start at once.
+    
+    Returns:
+        Path of the extracted spaCy model directory
+    """
+    if cache_dir is None:
+        cache_dir = NER_EXTRACT_CACHE_DIR
+    
+    phase_start = time.time()
+    checksum = archive_checksum(archive_path)
+    record_load_timing("checksum", phase_start)
+    
+    target_path = os.path.join(cache_dir, checksum)
+    phase_start = time.time()
+    if os.path.isdir(target_path):
+        logger.info(f"Using extracted NER model from cache: {target_path}")
+        load_timings["extract_cache_hit"] = True
+    else:
+        logger.info(f"Extracting {archive_path} into cache: {target_path}")
+        load_timings["extract_cache_hit"] = False
+        os.makedirs(cache_dir, exist_ok=True)
+        staging_path = tempfile.mkdtemp(prefix=f"{checksum}.", dir=cache_dir)
+        try:
+            with tarfile.open(archive_path) as tar:
+                tar.extractall(path=staging_path)
+            os.rename(staging_path, target_path)
+        except OSError:
+            # Another process finished extracting the same archive first
+            shutil.rmtree(staging_path, ignore_errors=True)
+            if not os.path.isdir(target_path):
+                raise
+    record_load_timing("extract", phase_start)
     
+    return find_model_dir(target_path)
+
+def load_ner_model(model_package_path=None):
+    """Load the NER model, handling Cloud Run environment"""
     # Get the model path
-    model_package_path = get_model_path()
+    if model_package_path is None:
+        model_package_path = get_model_path()
     logger.info(f"Looking for NER model at: {model_package_path}")
     
     # Check if model directory exists
@@ -92,7 +188,9 @@ def load_ner_model():
     if os.path.exists(meta_json_path):
         logger.info(f"Found meta.json at {meta_json_path}, trying to load directly...")
         try:
+            phase_start = time.time()
             nlp = spacy.load(model_package_path)
+            record_load_timing("load_custom_model", phase_start)
             logger.info(f"Successfully loaded NER model directly from: {model_package_path}")
             return nlp
         except Exception as e:
@@ -102,56 +200,14 @@ def load_ner_model():
     # Second try: Look for compressed model
     compressed_model_path = os.path.join(model_package_path, "ner_model.tar.gz")
     if os.path.exists(compressed_model_path):
-        logger.info(f"Found compressed model at {compressed_model_path}, extracting...")
-        
-        # Create a clean extraction directory
-        extract_path = os.path.join(temp_dir, "ner_model")
-        os.makedirs(extract_path, exist_ok=True)
-        
-        # Extract the tar file
-        with tarfile.open(compressed_model_path) as tar:
-            # List contents before extraction
-            members = [m.name for m in tar.getmembers()]
-            logger.info(f"Contents of tar file: {members}")
-            
-            # Extract all files
-            tar.extractall(path=extract_path)
-        
-        # Log the extracted contents
-        logger.info(f"Extracted files to: {extract_path}")
-        logger.info(f"Contents of extract directory: {os.listdir(extract_path)}")
+        logger.info(f"Found compressed model at {compressed_model_path}")
+        model_path = extract_model_archive(compressed_model_path)
         
-        # Try to load the model
-        logger.info(f"Attempting to load model from: {extract_path}")
-        try:
-            nlp = spacy.load(extract_path)
-            logger.info(f"Successfully loaded NER model from: {extract_path}")
-            return nlp
-        except Exception as e:
-            logger.error(f"Failed to load model from {extract_path}: {e}")
-            
-            # Try a more comprehensive search if direct loading fails
-            try:
-                # Check if meta.json is in the root or in a subdirectory
-                if os.path.exists(os.path.join(extract_path, "meta.json")):
-                    model_path = extract_path
-                elif os.path.exists(os.path.join(extract_path, "ner", "meta.json")):
-                    model_path = os.path.join(extract_path, "ner")
-                else:
-                    # Look for meta.json in any subdirectory
-                    meta_paths = list(Path(extract_path).rglob("meta.json"))
-                    if meta_paths:
-                        model_path = os.path.dirname(meta_paths[0])
-                    else:
-                        raise FileNotFoundError(f"meta.json not found in extracted model at {extract_path}")
-                
-                logger.info(f"Trying alternative model path: {model_path}")
-                nlp = spacy.load(model_path)
-                logger.info(f"Successfully loaded model from alternative path: {model_path}")
-                return nlp
-            except Exception as nested_error:
-                logger.error(f"All attempts to load model failed: {nested_error}")
-                raise
+        phase_start = time.time()
+        nlp = spacy.load(model_path)
+        record_load_timing("load_custom_model", phase_start)
+        logger.info(f"Successfully loaded NER model from: {model_path}")
+        return nlp
     
     # If we get here, we couldn't find a model
     raise FileNotFoundError(f"Could not find NER model (neither uncompressed nor compressed) at {model_package_path}")
@@ -161,11 +217,15 @@ def load_english_model():
     try:
         # Just load the model directly by name
         logger.info("Loading English model by name")
+        phase_start = time.time()
         english_nlp = spacy.load("en_core_web_sm", disable=["parser"])
+        record_load_timing("load_english_model", phase_start)
         logger.info("Successfully loaded English model")
         return english_nlp
     except OSError as e:
         logger.error(f"Failed to load English model: {e}")
+        if not NER_ALLOW_MODEL_DOWNLOAD:
+            raise
         # Try to download the model if it's not available
         logger.info("Attempting to download the English model")
         try:
@@ -177,31 +237,151 @@ def load_english_model():
             logger.error(f"Failed to download English model: {download_error}")
             raise
 
-def setup_nlp_pipeline():
-    """Set up the NLP pipeline with both models"""
-    global nlp, english_nlp
-    
-    if nlp is None:
-        nlp = load_ner_model()
+# doc.spans key holding the custom model's entities while the English NER runs
+CUSTOM_ENTS_KEY = "custom_ents"
+
+# doc.spans key written by the place name ruler
+PLACE_SPANS_KEY = "place_names"
+
+# English NER labels that are kept as LOCATION entities
+ENGLISH_LOCATION_LABELS = {"GPE", "LOC"}
+
+@Language.component("entity_stash")
+def stash_entities(doc):
+    """Move the custom model's entities aside so the English NER predicts on a clean doc"""
+    doc.spans[CUSTOM_ENTS_KEY] = list(doc.ents)
+    doc.set_ents([], default="missing")
+    return doc
+
+def add_non_overlapping(accepted, candidates):
+    """
+    Add the candidates that do not overlap an accepted span.
+    
+    Both lists must be sorted by start and free of internal overlaps, so a
+    single two-pointer sweep finds the conflicts.
+    
+    Returns:
+        Merged list sorted by start
+    """
+    added = []
+    j = 0
+    for span in candidates:
+        # Skip accepted spans that end before this one starts
+        while j < len(accepted) and accepted[j].end <= span.start:
+            j += 1
+        if j < len(accepted) and accepted[j].start < span.end:
+            continue
+        added.append(span)
+    return sorted(list(accepted) + added, key=lambda span: span.start)
+
+@Language.component("entity_merger")
+def merge_entities(doc):
+    """
+    Merge the custom model's entities with known place names and the English NER's locations.
+    
+    All entity sets come from the same doc, so no re-parse or offset
+    alignment is needed. Custom entities win, then place name ruler matches,
+    then English GPE/LOC entities, each added as LOCATION where it does not
+    overlap an entity already kept.
+    """
+    merged = sorted(doc.spans.get(CUSTOM_ENTS_KEY, []), key=lambda ent: ent.start)
+    
+    if PLACE_SPANS_KEY in doc.spans:
+        # Longest match wins among overlapping place names
+        place_spans = [
+            Span(doc, span.start, span.end, label="LOCATION")
+            for span in filter_spans(doc.spans[PLACE_SPANS_KEY])
+        ]
+        merged = add_non_overlapping(merged, place_spans)
+        del doc.spans[PLACE_SPANS_KEY]
+    
+    english_ents = [
+        Span(doc, ent.start, ent.end, label="LOCATION")
+        for ent in doc.ents  # already sorted by start
+        if ent.label_ in ENGLISH_LOCATION_LABELS
+    ]
+    doc.ents = add_non_overlapping(merged, english_ents)
+    del doc.spans[CUSTOM_ENTS_KEY]
+    return doc
+
+def add_pipeline_components(pipeline):
+    """Add the English NER and entity merger components to a loaded NER model"""
+    global english_nlp
     
     if english_nlp is None:
         english_nlp = load_english_model()
     
+    phase_start = time.time()
+    
     # Add the English NER component to the pipeline if not already present
-    if "english_ner" not in nlp.pipe_names:
-        nlp.add_pipe("ner", source=english_nlp, name="english_ner", last=True)
+    if "english_ner" not in pipeline.pipe_names:
+        pipeline.add_pipe("ner", source=english_nlp, name="english_ner", last=True)
+    
+    # Match known place names before the statistical models. The matches go to
+    # doc.spans, so the statistical NER still predicts over the whole doc.
+    if NER_PLACE_RULER and "place_ruler" not in pipeline.pipe_names:
+        ruler = pipeline.add_pipe(
+            "span_ruler",
+            name="place_ruler",
+            first=True,
+            config={
+                "spans_key": PLACE_SPANS_KEY,
+                "annotate_ents": False,
+                "phrase_matcher_attr": "LOWER",
+            }
+        )
+        place_names = load_place_names()
+        ruler.add_patterns([{"label": "LOCATION", "pattern": name} for name in place_names])
+        logger.info(f"Added place name ruler with {len(place_names)} names")
+    
+    # Stash the custom entities before the English NER and merge both after it
+    if "entity_stash" not in pipeline.pipe_names:
+        pipeline.add_pipe("entity_stash", before="english_ner")
+    if "entity_merger" not in pipeline.pipe_names:
+        pipeline.add_pipe("entity_merger", after="english_ner")
+    
+    record_load_timing("add_components", phase_start)
+    return pipeline
+
+def build_nlp_pipeline(model_package_path=None):
+    """Load a NER model package and set up the full pipeline"""
+    load_timings.clear()
+    start_time = time.time()
+    pipeline = add_pipeline_components(load_ner_model(model_package_path))
+    record_load_timing("total", start_time)
+    return pipeline
+
+_ner_registry = ModelRegistry("ner", NER_VERSIONS_DIR, build_nlp_pipeline) if NER_VERSIONS_DIR else None
+
+def get_ner_registry():
+    """Get the NER model registry, or None when versioned packages are not used"""
+    return _ner_registry
+
+def setup_nlp_pipeline():
+    """Set up the NLP pipeline with both models"""
+    global nlp
     
-    # Add the entity merger if not present
-    if "entity_merger" not in nlp.pipe_names:
-        nlp.add_pipe("entity_merger", after="english_ner")
+    if _ner_registry is not None:
+        return _ner_registry.get()
+    
+    if nlp is None:
+        nlp = build_nlp_pipeline()
     
     return nlp
 
+def get_nlp():
+    """Get the active NLP pipeline, loading it if needed"""
+    if _ner_registry is not None:
+        return _ner_registry.get()
+    if nlp is None:
+        setup_nlp_pipeline()
+    return nlp
+
 def init_geolocator():
     """Initialize the geolocator with proper timeout for Cloud Run"""
     global geolocator
     if geolocator is None:
-        geolocator = Nominatim(user_agent="cloud_run_geocode", timeout=5)
+        geolocator = Nominatim(user_agent="cloud_run_geocode", timeout=5, domain=GEOCODE_DOMAIN, scheme=GEOCODE_SCHEME)
     return geolocator
 
 def clean_text(text):
@@ -224,62 +404,213 @@ def clean_text(text):
 
 
 
-def get_location_coords(location_name):
-    """Get coordinates for a location name"""
+def init_geocode_cache():
+    """Open the persistent geocode cache (None if disabled or unavailable)"""
+    global geocode_cache
+    if geocode_cache is None and GEOCODE_CACHE_ENABLED:
+        try:
+            geocode_cache = GeocodeCache(GEOCODE_CACHE_PATH)
+        except Exception as e:
+            logger.error(f"Could not open geocode cache, continuing without it: {e}")
+    return geocode_cache
+
+def init_gazetteer():
+    """Open the offline gazetteer once (None if no index has been compiled)"""
+    global gazetteer, gazetteer_checked
+    if not gazetteer_checked:
+        gazetteer = load_gazetteer()
+        gazetteer_checked = True
+    return gazetteer
+
+def get_geocode_cache_stats():
+    """Return geocode cache counters, or None if the cache is disabled"""
+    cache = init_geocode_cache()
+    if cache is None:
+        return None
+    stats = cache.stats()
+    offline = init_gazetteer()
+    if offline is not None:
+        stats["gazetteer"] = offline.stats()
+    if geocode_scheduler is not None:
+        stats["scheduler"] = geocode_scheduler.stats()
+    return stats
+
+def lookup_local_coords(location_name):
+    """
+    Get coordinates for a location name without network access.
+    
+    Tries the offline gazetteer, then the geocode cache.
+    
+    Returns:
+        (lat, lon), (None, None) for a cached negative result, or None if the
+        name has to be geocoded by the provider
+    """
+    offline = init_gazetteer()
+    if offline is not None:
+        found = offline.lookup(location_name)
+        if found is not None:
+            return found[0], found[1]
+    
+    cache = init_geocode_cache()
+    if cache is not None:
+        return cache.get(location_name)
+    return None
+
+def geocode_remote_coords(location_name):
+    """
+    Geocode a location name with the provider and cache the result.
+    
+    Returns:
+        (lat, lon), or (None, None) if the provider has no valid match.
+        Provider errors are raised and not cached.
+    """
     geo = init_geolocator()
     
-    try:
-        location = geo.geocode(location_name)
-        if location:
+    location = geo.geocode(location_name)
+    lat, lon = None, None
+    if location:
+        if -90 <= location.latitude <= 90 and -180 <= location.longitude <= 180:
             lat, lon = location.latitude, location.longitude
-            
-            if -90 <= lat <= 90 and -180 <= lon <= 180:
-                return location_name, lat, lon
-            else:
-                logger.warning(f"Invalid coordinates for {location_name}: {lat}, {lon}")
-                return location_name, None, None
         else:
-            logger.info(f"Could not geocode location: {location_name}")
-            return location_name, None, None
-    except Exception as e:
-        logger.error(f"Error geocoding {location_name}: {e}")
-        return location_name, None, None
+            logger.warning(f"Invalid coordinates for {location_name}: {location.latitude}, {location.longitude}")
+    else:
+        logger.info(f"Could not geocode location: {location_name}")
+    
+    cache = init_geocode_cache()
+    if cache is not None:
+        cache.put(location_name, lat, lon)
+    return lat, lon
+
+def init_geocode_scheduler():
+    """Start the rate-limited geocoding scheduler shared by all requests"""
+    global geocode_scheduler
+    if geocode_scheduler is None:
+        geocode_scheduler = GeocodeScheduler(lookup_local_coords, geocode_remote_coords, normalize_place_name)
+    return geocode_scheduler
 
-def getLocations(text):
-    """Main function to extract locations from text"""
-    # Initialize the pipeline if needed
-    if nlp is None:
-        setup_nlp_pipeline()
+def get_location_coords(location_name):
+    """Get coordinates for a location name"""
+    return init_geocode_scheduler().submit(location_name).result()
+
+def extractLocationNames(text):
+    """Run NER on text and return the unique location names, in order of appearance"""
+    # Get the active pipeline (loads it if needed)
+    pipeline = get_nlp()
     
     # Clean the text
     cleaned_text = clean_text(text)
     
-    # Process with NER model
-    doc = nlp(cleaned_text)
-    
-    # Create a list to store all found locations with coordinates
-    locations = []
+    # Short messages naming a known place skip the statistical models
+    fast_names = fast_path_location_names(pipeline, cleaned_text)
+    if fast_names is not None:
+        return fast_names
     
+    # Process with NER model
+    doc = pipeline(cleaned_text)
+    
+    return location_names_from_doc(doc)
+
+def fast_path_location_names(pipeline, cleaned_text):
+    """
+    Find known place names in a short text with the place name ruler alone.
+    
+    Returns:
+        Unique place names in order of appearance, or None if the text has to
+        go through the full pipeline (fast path disabled, text too long, or no
+        known place found)
+    """
+    if NER_FAST_PATH_MAX_CHARS <= 0 or len(cleaned_text) > NER_FAST_PATH_MAX_CHARS:
+        return None
+    if "place_ruler" not in pipeline.pipe_names:
+        return None
+    
+    doc = pipeline.get_pipe("place_ruler")(pipeline.make_doc(cleaned_text))
+    spans = filter_spans(doc.spans.get(PLACE_SPANS_KEY, []))
+    if not spans:
+        return None
+    return list(dict.fromkeys(span.text for span in spans))
+
+def location_names_from_doc(doc):
+    """Return the unique LOCATION entity texts of a doc, in order of appearance"""
     # Track locations we've already processed to avoid duplicates
+    location_names = []
     processed_locations = set()
     
     for ent in doc.ents:
         if ent.label_ == "LOCATION" and ent.text not in processed_locations:
             processed_locations.add(ent.text)
-            location_name, lat, lon = get_location_coords(ent.text)
-            
-            if lat and lon:
-                locations.append({
-                    "location": location_name,
-                    "latitude": lat,
-                    "longitude": lon
-                })
-            time.sleep(0.5)  # Reduced sleep time for Cloud Run
+            location_names.append(ent.text)
+    
+    return location_names
+
+def extractLocationNamesBatch(texts, batch_size=None, n_process=None):
+    """
+    Run NER on many texts with nlp.pipe and return their location names.
+    
+    Args:
+        texts: Texts to process
+        batch_size: Documents per batch (defaults to NER_BATCH_SIZE)
+        n_process: spaCy worker processes (defaults to NER_PROCESSES)
+        
+    Returns:
+        List of location name lists, aligned with texts
+    """
+    if batch_size is None:
+        batch_size = NER_BATCH_SIZE
+    if n_process is None:
+        n_process = NER_PROCESSES
+    
+    pipeline = get_nlp()
+    cleaned_texts = [clean_text(text) for text in texts]
+    
+    # Short messages naming a known place skip the statistical models
+    results = [fast_path_location_names(pipeline, text) for text in cleaned_texts]
+    pending = [i for i, names in enumerate(results) if names is None]
+    
+    docs = pipeline.pipe([cleaned_texts[i] for i in pending], batch_size=batch_size, n_process=n_process)
+    for i, doc in zip(pending, docs):
+        results[i] = location_names_from_doc(doc)
+    
+    return results
+
+def submitLocationNames(location_names):
+    """Schedule geocoding of location names, returning one future per name"""
+    scheduler = init_geocode_scheduler()
+    return [scheduler.submit(name) for name in location_names]
+
+def collectLocations(futures):
+    """Wait for scheduled lookups and return the locations with valid coordinates"""
+    # Create a list to store all found locations with coordinates
+    locations = []
+    
+    for future in futures:
+        location_name, lat, lon = future.result()
+        
+        if lat and lon:
+            locations.append({
+                "location": location_name,
+                "latitude": lat,
+                "longitude": lon
+            })
     
     return locations
 
-# Initialize the temp directory on module load
-init_temp_dir()
+def geocodeLocationNames(location_names):
+    """Geocode location names and return those with valid coordinates"""
+    return collectLocations(submitLocationNames(location_names))
+
+def getLocations(text):
+    """Main function to extract locations from text"""
+    return geocodeLocationNames(extractLocationNames(text))
+
+def getLocationsBatch(texts, batch_size=None, n_process=None):
+    """Extract and geocode the locations of many texts, returning one list per text in input order"""
+    # Schedule every lookup before waiting on any, so they run concurrently
+    pending = [
+        submitLocationNames(names)
+        for names in extractLocationNamesBatch(texts, batch_size=batch_size, n_process=n_process)
+    ]
+    return [collectLocations(futures) for futures in pending]
 
 '''
 import time
@@ -0,0 +1,176 @@
+import os
+import sys
+import json
+import argparse
+import logging
+from typing import List, Dict
+
+import numpy as np
+
+from vectorImplementation import (
+    VectorClassifier,
+    MODEL_ROOT,
+    THRESHOLD,
+    MULTI_LABEL,
+    ONNX_QUANTIZATION_CONFIG,
+    resolve_package_paths,
+    clean_text,
+)
+
+# Set up logging
+logger = logging.getLogger("vector_classifier")
+
+# Texts for the accuracy check stored in the package by production/vectorTraining.py
+SAMPLE_TEXTS_FILE_NAME = "sample_texts.json"
+
+# Fewer texts than this say nothing meaningful about drift, so the check refuses to run
+MIN_SAMPLE_TEXTS = 200
+
+def export_onnx_models(model_path: str, quantization_config: str = ONNX_QUANTIZATION_CONFIG) -> None:
+    """
+    Export the fine-tuned sentence transformer to ONNX and an int8 variant.
+
+    Writes <model_path>/onnx/model.onnx and
+    <model_path>/onnx/model_qint8_<config>.onnx, which are the files the
+    onnx and onnx-int8 backends in vectorImplementation load.
+
+    Args:
+        model_path: Path to the sentence transformer directory
+        quantization_config: Dynamic quantization config (arm64, avx2, avx512, avx512_vnni)
+    """
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    logger.info(f"Exporting {model_path} to ONNX")
+    model = SentenceTransformer(model_path, backend="onnx")
+    model.save_pretrained(model_path)
+
+    logger.info(f"Quantizing ONNX model with config: {quantization_config}")
+    export_dynamic_quantized_onnx_model(model, quantization_config, model_path)
+    logger.info(f"ONNX models written to {os.path.join(model_path, 'onnx')}")
+
+def load_sample_texts(sample_path: str, limit: int = 1000) -> List[str]:
+    """
+    Load texts for the accuracy check.
+
+    Accepts a processed result.json (uses TRANSLATED_TEXT of each message), a
+    JSON list of strings, or a list of training records with a text (or
+    description) field such as trainvector.json.
+
+    Args:
+        sample_path: Path to a JSON file with sample texts
+        limit: Maximum number of texts to use
+
+    Returns:
+        List of texts
+    """
+    with open(sample_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    if isinstance(data, dict):
+        texts = [m.get("TRANSLATED_TEXT") for m in data.get("messages", [])]
+    else:
+        texts = [(t.get("text") or t.get("description")) if isinstance(t, dict) else t for t in data]
+    texts = [t for t in texts if isinstance(t, str) and t.strip()]
+    return texts[:limit]
+
+def compare_backends(model_root: str, texts: List[str], backend: str = "onnx-int8") -> Dict:
+    """
+    Measure how far an ONNX backend drifts from the torch backend.
+
+    Args:
+        model_root: Root directory of the vector model package
+        texts: Texts to classify with both backends
+        backend: Backend to compare against torch
+
+    Returns:
+        Dictionary with embedding similarity, score deltas and category agreement
+    """
+    paths = resolve_package_paths(model_root)
+    classifiers = {}
+    for name in ("torch", backend):
+        classifiers[name] = VectorClassifier(
+            model_path=paths["model_path"],
+            category_embeddings_path=paths["category_embeddings_path"],
+            metadata_path=paths["metadata_path"],
+            threshold=THRESHOLD,
+            multi_label=MULTI_LABEL,
+            category_vectors_path=paths["category_vectors_path"],
+            category_labels_path=paths["category_labels_path"],
+            backend=name,
+            weights_format=paths["weights_format"]
+        )
+
+    cleaned = [clean_text(t) for t in texts]
+    cleaned = [t for t in cleaned if t]
+
+    reference = classifiers["torch"].encode_texts(cleaned)
+    candidate = classifiers[backend].encode_texts(cleaned)
+
+    # Cosine similarity between the two backends' embeddings of the same text
+    reference_unit = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    candidate_unit = candidate / np.linalg.norm(candidate, axis=1, keepdims=True)
+    embedding_cosine = np.sum(reference_unit * candidate_unit, axis=1)
+
+    # Difference in category scores
+    category_vectors = classifiers["torch"].category_vectors
+    score_delta = np.abs(reference_unit @ category_vectors.T - candidate_unit @ category_vectors.T)
+
+    # Agreement of the final categories
+    reference_results = classifiers["torch"].predict_categories_batch(cleaned, cleaned)
+    candidate_results = classifiers[backend].predict_categories_batch(cleaned, cleaned)
+    same_categories = [
+        set(r.get("categories", [])) == set(c.get("categories", []))
+        for r, c in zip(reference_results, candidate_results)
+    ]
+    same_top_child = [
+        r.get("top_child_category") == c.get("top_child_category")
+        for r, c in zip(reference_results, candidate_results)
+    ]
+
+    return {
+        "backend": backend,
+        "texts": len(cleaned),
+        "mean_embedding_cosine": float(np.mean(embedding_cosine)),
+        "min_embedding_cosine": float(np.min(embedding_cosine)),
+        "mean_score_delta": float(np.mean(score_delta)),
+        "max_score_delta": float(np.max(score_delta)),
+        "category_agreement": float(np.mean(same_categories)),
+        "top_child_agreement": float(np.mean(same_top_child)),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the vector model to ONNX and check accuracy drift")
+    parser.add_argument("model_root", nargs="?", default=MODEL_ROOT, help="Vector model package root")
+    parser.add_argument("--skip-export", action="store_true", help="Only run the accuracy check")
+    parser.add_argument("--backend", default="onnx-int8", choices=["onnx", "onnx-int8"])
+    parser.add_argument("--samples", help=f"result.json, JSON list of texts or training records used for the "
+                                          f"accuracy check (default: {SAMPLE_TEXTS_FILE_NAME} in the package)")
+    parser.add_argument("--min-samples", type=int, default=MIN_SAMPLE_TEXTS,
+                        help="Fail if fewer sample texts are available")
+    parser.add_argument("--min-agreement", type=float, default=0.95,
+                        help="Fail if category agreement with torch falls below this value")
+    args = parser.parse_args()
+
+    sample_path = args.samples or os.path.join(args.model_root, SAMPLE_TEXTS_FILE_NAME)
+    texts = load_sample_texts(sample_path) if os.path.exists(sample_path) else []
+    if len(texts) < args.min_samples:
+        logger.error(
+            f"Only {len(texts)} sample texts in {sample_path}, the accuracy check needs at least "
+            f"{args.min_samples}; rebuild the package with vectorTraining.py or pass --samples"
+        )
+        sys.exit(1)
+
+    if not args.skip_export:
+        export_onnx_models(resolve_package_paths(args.model_root)["model_path"])
+
+    report = compare_backends(args.model_root, texts, backend=args.backend)
+    print(json.dumps(report, indent=2))
+
+    if report["category_agreement"] < args.min_agreement:
+        logger.error(
+            f"Category agreement {report['category_agreement']:.3f} is below {args.min_agreement:.3f}"
+        )
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
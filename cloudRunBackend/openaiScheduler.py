@@ -0,0 +1,461 @@
+import os
+import re
+import time
+import random
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import openai
+
+from stageMetrics import record_request
+
+# Set up logging
+logger = logging.getLogger("json-processor-api")
+
+# =====================================================================
+# CONFIGURATION - Use environment variables for Cloud Run compatibility
+# =====================================================================
+
+# Attempts after the first for 429s, 5xx responses, timeouts and dropped connections
+OPENAI_MAX_RETRIES = int(os.environ.get("OPENAI_MAX_RETRIES", "8"))
+
+# Exponential backoff: a random delay up to base * 2^attempt, capped at max
+OPENAI_BACKOFF_BASE = float(os.environ.get("OPENAI_BACKOFF_BASE_SECONDS", "1.0"))
+OPENAI_BACKOFF_MAX = float(os.environ.get("OPENAI_BACKOFF_MAX_SECONDS", "60"))
+
+# Requests in flight per model; starts at the initial value and adapts between min and max
+OPENAI_INITIAL_CONCURRENCY = int(os.environ.get("OPENAI_INITIAL_CONCURRENCY", "8"))
+OPENAI_MIN_CONCURRENCY = int(os.environ.get("OPENAI_MIN_CONCURRENCY", "1"))
+OPENAI_MAX_CONCURRENCY = int(os.environ.get("OPENAI_MAX_CONCURRENCY", "64"))
+
+# Concurrency stops growing once less than this share of a budget is left
+OPENAI_BUDGET_HEADROOM = float(os.environ.get("OPENAI_BUDGET_HEADROOM", "0.1"))
+
+# OpenAI request and token limits are per minute; a window that has reset
+# without a response to report the new one is assumed to last this long
+RATE_LIMIT_WINDOW_SECONDS = 60.0
+
+# Rough token cost of an image in the request, for budgeting before the headers say otherwise
+IMAGE_TOKEN_ESTIMATE = 1000
+
+# Completion tokens assumed when a request does not set max_tokens
+DEFAULT_COMPLETION_TOKENS = 500
+
+DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds in a rate limit reset header ("1s", "6m0s", "20ms"), or None"""
+    if not value:
+        return None
+    parts = DURATION_PART.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(number) * DURATION_UNITS[unit] for number, unit in parts)
+
+def _header_int(headers, name: str) -> Optional[int]:
+    try:
+        return int(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+def retry_after(headers) -> Optional[float]:
+    """Seconds the server asked to wait before retrying, or None"""
+    if headers is None:
+        return None
+    milliseconds = headers.get("retry-after-ms")
+    if milliseconds:
+        try:
+            return float(milliseconds) / 1000
+        except ValueError:
+            pass
+    return parse_duration(headers.get("retry-after"))
+
+def estimate_tokens(messages: Any, max_tokens: Optional[int] = None) -> int:
+    """Rough token count of a chat request (prompt at four characters per token plus completion)"""
+    prompt_tokens = 0
+    for message in messages or []:
+        content = message.get("content") if isinstance(message, dict) else None
+        if isinstance(content, str):
+            prompt_tokens += len(content) // 4
+        elif isinstance(content, list):
+            for part in content:
+                if part.get("type") == "text":
+                    prompt_tokens += len(part.get("text", "")) // 4
+                else:
+                    prompt_tokens += IMAGE_TOKEN_ESTIMATE
+    return prompt_tokens + (max_tokens or DEFAULT_COMPLETION_TOKENS)
+
+class RateLimitBudget:
+    """Requests and tokens left in the current rate limit window, from response headers."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.limit_requests = None
+        self.remaining_requests = None
+        self.requests_reset_at = 0.0
+        self.limit_tokens = None
+        self.remaining_tokens = None
+        self.tokens_reset_at = 0.0
+        self.blocked_until = 0.0
+
+    def update(self, headers) -> None:
+        """Take the budget from the rate limit headers of a response"""
+        if headers is None:
+            return
+        now = time.time()
+        with self._lock:
+            limit_requests = _header_int(headers, "x-ratelimit-limit-requests")
+            remaining_requests = _header_int(headers, "x-ratelimit-remaining-requests")
+            if limit_requests is not None and remaining_requests is not None:
+                self.limit_requests = limit_requests
+                self.remaining_requests = remaining_requests
+                self.requests_reset_at = now + (parse_duration(headers.get("x-ratelimit-reset-requests")) or 0.0)
+
+            limit_tokens = _header_int(headers, "x-ratelimit-limit-tokens")
+            remaining_tokens = _header_int(headers, "x-ratelimit-remaining-tokens")
+            if limit_tokens is not None and remaining_tokens is not None:
+                self.limit_tokens = limit_tokens
+                self.remaining_tokens = remaining_tokens
+                self.tokens_reset_at = now + (parse_duration(headers.get("x-ratelimit-reset-tokens")) or 0.0)
+
+    def block(self, seconds: float) -> None:
+        """Hold every request back for seconds (after a 429)"""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.time() + seconds)
+
+    def reserve(self, tokens: int) -> float:
+        """
+        Take one request and tokens from the budget.
+
+        Returns:
+            0 if they were taken, otherwise the seconds to wait before trying again
+        """
+        now = time.time()
+        with self._lock:
+            if now < self.blocked_until:
+                return self.blocked_until - now
+
+            # Refill once per window; until a response reports the new window,
+            # later requests draw from the refilled budget instead of refilling it again
+            if self.remaining_requests is not None:
+                if now >= self.requests_reset_at:
+                    self.remaining_requests = self.limit_requests
+                    self.requests_reset_at = now + RATE_LIMIT_WINDOW_SECONDS
+                elif self.remaining_requests < 1:
+                    return self.requests_reset_at - now
+
+            if self.remaining_tokens is not None:
+                if now >= self.tokens_reset_at:
+                    self.remaining_tokens = self.limit_tokens
+                    self.tokens_reset_at = now + RATE_LIMIT_WINDOW_SECONDS
+                # A request larger than the whole budget still goes once the window is fresh
+                elif self.remaining_tokens < min(tokens, self.limit_tokens):
+                    return self.tokens_reset_at - now
+
+            if self.remaining_requests is not None:
+                self.remaining_requests -= 1
+            if self.remaining_tokens is not None:
+                self.remaining_tokens -= tokens
+            return 0.0
+
+    def running_low(self) -> bool:
+        """Whether less than OPENAI_BUDGET_HEADROOM of either budget is left"""
+        with self._lock:
+            for limit, remaining in ((self.limit_requests, self.remaining_requests),
+                                     (self.limit_tokens, self.remaining_tokens)):
+                if limit and remaining is not None and remaining < limit * OPENAI_BUDGET_HEADROOM:
+                    return True
+            return False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "limit_requests": self.limit_requests,
+                "remaining_requests": self.remaining_requests,
+                "limit_tokens": self.limit_tokens,
+                "remaining_tokens": self.remaining_tokens,
+            }
+
+class AdaptiveConcurrency:
+    """
+    Limit on requests in flight that adapts to throttling.
+
+    The limit grows by one per limit-many successful requests (additive
+    increase) and halves whenever a request is throttled (multiplicative
+    decrease).
+    """
+
+    def __init__(self, initial: int, minimum: int, maximum: int):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.in_flight = 0
+        self._condition = threading.Condition()
+        # (loop, future) of coroutines waiting in acquire_async; the lane is
+        # shared by threads and by every event loop that runs requests
+        self._async_waiters = []
+
+    def acquire(self) -> None:
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    async def acquire_async(self) -> None:
+        """acquire for coroutines: waits for a release without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._condition:
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            await waiter
+
+    def release(self, throttled: bool = False, grow: bool = True) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(self.minimum, self.limit / 2)
+            elif grow:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, waiter)
+            except RuntimeError:
+                # The waiter's event loop has been closed
+                pass
+
+def _wake(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+class RequestFailed(Exception):
+    """Raised when a request still fails after all retries."""
+
+class OpenAIScheduler:
+    """
+    Central scheduler for OpenAI requests.
+
+    Every request goes through a per-model lane that holds the rate limit
+    budget reported by the API and an adaptive concurrency limit. Requests
+    wait for budget instead of running into 429s, and 429s, 5xx responses,
+    timeouts and dropped connections are retried with jittered exponential
+    backoff so long runs do not lose messages to transient errors.
+    """
+
+    def __init__(self, max_retries: int = None, backoff_base: float = None, backoff_max: float = None):
+        self.max_retries = OPENAI_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = OPENAI_BACKOFF_BASE if backoff_base is None else backoff_base
+        self.backoff_max = OPENAI_BACKOFF_MAX if backoff_max is None else backoff_max
+        self._lanes: Dict[str, Tuple[RateLimitBudget, AdaptiveConcurrency]] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def _lane(self, model: str) -> Tuple[RateLimitBudget, AdaptiveConcurrency]:
+        with self._lock:
+            if model not in self._lanes:
+                self._lanes[model] = (
+                    RateLimitBudget(),
+                    AdaptiveConcurrency(OPENAI_INITIAL_CONCURRENCY, OPENAI_MIN_CONCURRENCY, OPENAI_MAX_CONCURRENCY)
+                )
+                self._counters[model] = {"requests": 0, "retries": 0, "throttled": 0, "failed": 0}
+            return self._lanes[model]
+
+    def _count(self, model: str, key: str) -> None:
+        with self._lock:
+            self._counters[model][key] += 1
+
+    def _backoff(self, attempt: int, server_delay: Optional[float]) -> float:
+        """Full-jitter exponential backoff, never shorter than what the server asked for"""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if server_delay:
+            delay = max(delay, server_delay)
+        return delay
+
+    def _classify(self, error: Exception) -> Tuple[bool, bool, Any]:
+        """(retryable, throttled, response headers) for a failed request"""
+        headers = getattr(getattr(error, "response", None), "headers", None)
+        if isinstance(error, openai.RateLimitError):
+            # Out of credit is not going to pass by waiting
+            if getattr(error, "code", None) == "insufficient_quota":
+                return False, False, headers
+            return True, True, headers
+        if isinstance(error, openai.APIStatusError):
+            return error.status_code >= 500 or error.status_code in (408, 409), False, headers
+        if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+            return True, False, headers
+        return False, False, headers
+
+    def _after_failure(self, model: str, attempt: int, error: Exception) -> float:
+        """Record a failed attempt and return the seconds to wait, or raise if it is final"""
+        budget, _ = self._lane(model)
+        retryable, throttled, headers = self._classify(error)
+        budget.update(headers)
+        if throttled:
+            self._count(model, "throttled")
+        if not retryable or attempt >= self.max_retries:
+            self._count(model, "failed")
+            if retryable:
+                raise RequestFailed(f"{model} request failed after {attempt + 1} attempts: {error}") from error
+            raise error
+
+        delay = self._backoff(attempt, retry_after(headers))
+        if throttled:
+            budget.block(delay)
+        self._count(model, "retries")
+        logger.warning(f"{model} request failed ({type(error).__name__}), retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+        return delay
+
+    def call(self, model: str, request: Callable[[], Any], tokens: int) -> Any:
+        """
+        Run a request through the scheduler.
+
+        Args:
+            model: Model name, which selects the rate limit lane
+            request: Sends the request and returns the raw response
+                (with_raw_response), which has headers and parse()
+            tokens: Estimated tokens of the request
+
+        Returns:
+            The parsed response
+
+        Raises:
+            RequestFailed: If a retryable error persists past OPENAI_MAX_RETRIES
+        """
+        budget, concurrency = self._lane(model)
+        self._count(model, "requests")
+        attempt = 0
+        while True:
+            wait = budget.reserve(tokens)
+            while wait > 0:
+                time.sleep(wait)
+                wait = budget.reserve(tokens)
+
+            concurrency.acquire()
+            try:
+                raw = request()
+            except Exception as e:
+                _, throttled, _ = self._classify(e)
+                concurrency.release(throttled=throttled, grow=False)
+                time.sleep(self._after_failure(model, attempt, e))
+                attempt += 1
+                continue
+
+            budget.update(raw.headers)
+            concurrency.release(grow=not budget.running_low())
+            return raw.parse()
+
+    async def call_async(self, model: str, request: Callable[[], Awaitable[Any]], tokens: int) -> Any:
+        """Async variant of call for coroutine request functions."""
+        budget, concurrency = self._lane(model)
+        self._count(model, "requests")
+        attempt = 0
+        while True:
+            wait = budget.reserve(tokens)
+            while wait > 0:
+                await asyncio.sleep(wait)
+                wait = budget.reserve(tokens)
+
+            await concurrency.acquire_async()
+            try:
+                raw = await request()
+            except Exception as e:
+                _, throttled, _ = self._classify(e)
+                concurrency.release(throttled=throttled, grow=False)
+                await asyncio.sleep(self._after_failure(model, attempt, e))
+                attempt += 1
+                continue
+
+            budget.update(raw.headers)
+            concurrency.release(grow=not budget.running_low())
+            return raw.parse()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-model counters, concurrency and last known budget"""
+        with self._lock:
+            lanes = dict(self._lanes)
+            counters = {model: dict(values) for model, values in self._counters.items()}
+        return {
+            model: {
+                **counters[model],
+                "concurrency_limit": int(concurrency.limit),
+                "in_flight": concurrency.in_flight,
+                **budget.snapshot(),
+            }
+            for model, (budget, concurrency) in lanes.items()
+        }
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler() -> OpenAIScheduler:
+    """Get the shared scheduler."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = OpenAIScheduler()
+        return _scheduler
+
+def get_scheduler_stats() -> Dict[str, Dict[str, Any]]:
+    return get_scheduler().stats()
+
+def media_bytes(messages: Any) -> int:
+    """Bytes of image data (base64 data URLs) in chat messages"""
+    total = 0
+    for message in messages or []:
+        content = message.get("content") if isinstance(message, dict) else None
+        if isinstance(content, list):
+            for part in content:
+                if isinstance(part, dict) and part.get("type") == "image_url":
+                    total += len(part.get("image_url", {}).get("url", ""))
+    return total
+
+def create_chat_completion(client, **kwargs) -> Any:
+    """client.chat.completions.create through the scheduler"""
+    # Retries are the scheduler's job; the client's own would hide the rate limit headers
+    raw_client = client.with_options(max_retries=0)
+    response = get_scheduler().call(
+        kwargs["model"],
+        lambda: raw_client.chat.completions.with_raw_response.create(**kwargs),
+        estimate_tokens(kwargs.get("messages"), kwargs.get("max_tokens"))
+    )
+    record_request(kwargs["model"], getattr(response, "usage", None), media_bytes(kwargs.get("messages")))
+    return response
+
+async def create_chat_completion_async(client, **kwargs) -> Any:
+    """Async client.chat.completions.create through the scheduler"""
+    raw_client = client.with_options(max_retries=0)
+    response = await get_scheduler().call_async(
+        kwargs["model"],
+        lambda: raw_client.chat.completions.with_raw_response.create(**kwargs),
+        estimate_tokens(kwargs.get("messages"), kwargs.get("max_tokens"))
+    )
+    record_request(kwargs["model"], getattr(response, "usage", None), media_bytes(kwargs.get("messages")))
+    return response
+
+def create_transcription(client, path: str, audio_seconds: float = 0.0, **kwargs) -> Any:
+    """
+    client.audio.transcriptions.create for a file through the scheduler
+
+    audio_seconds is the duration of the file, which transcription is billed by.
+    """
+    raw_client = client.with_options(max_retries=0)
+
+    def request():
+        # Reopened on every attempt, a retried upload has to start from the beginning
+        with open(path, "rb") as audio_file:
+            return raw_client.audio.transcriptions.with_raw_response.create(file=audio_file, **kwargs)
+
+    response = get_scheduler().call(kwargs["model"], request, DEFAULT_COMPLETION_TOKENS)
+    record_request(kwargs["model"], media_bytes=os.path.getsize(path), audio_seconds=audio_seconds)
+    return response
@@ -0,0 +1,114 @@
+import os
+import json
+import logging
+from typing import Dict, List
+
+# Set up logging
+logger = logging.getLogger("ner_implementation")
+
+# Optional JSON file with more place names: either a list of names or a
+# mapping of canonical name to a list of variants
+PLACE_NAMES_PATH = os.environ.get("NER_PLACE_NAMES_PATH")
+
+# Places that come up again and again in the Ukraine/Poland channels, with
+# their Polish, Ukrainian and Latin-transliterated spellings
+PLACE_NAMES: Dict[str, List[str]] = {
+    # Polish cities
+    "Warsaw": ["Warszawa", "Варшава", "Varshava"],
+    "Kraków": ["Krakow", "Cracow", "Краків", "Krakiv"],
+    "Wrocław": ["Wroclaw", "Вроцлав", "Vrotslav"],
+    "Gdańsk": ["Gdansk", "Гданськ", "Hdansk"],
+    "Poznań": ["Poznan", "Познань", "Poznan'"],
+    "Łódź": ["Lodz", "Лодзь", "Lodz'"],
+    "Lublin": ["Люблін", "Liublin"],
+    "Rzeszów": ["Rzeszow", "Жешув", "Zheshuv"],
+    "Przemyśl": ["Przemysl", "Перемишль", "Peremyshl"],
+    "Katowice": ["Катовіце", "Katovitse"],
+    "Szczecin": ["Щецин", "Shchetsyn"],
+    "Bydgoszcz": ["Бидгощ", "Bydhoshch"],
+    "Białystok": ["Bialystok", "Білосток", "Bilostok"],
+    "Chełm": ["Chelm", "Холм", "Kholm"],
+    "Zamość": ["Zamosc", "Замостя", "Zamostia"],
+    "Gdynia": ["Гдиня", "Hdynia"],
+    "Toruń": ["Torun", "Торунь"],
+    # Ukrainian cities
+    "Kyiv": ["Kijów", "Kijow", "Київ", "Kiev"],
+    "Lviv": ["Lwów", "Lwow", "Львів", "Lvov"],
+    "Kharkiv": ["Charków", "Charkow", "Харків", "Kharkov"],
+    "Odesa": ["Odessa", "Одеса"],
+    "Dnipro": ["Dniepr", "Дніпро"],
+    "Zaporizhzhia": ["Zaporoże", "Zaporoze", "Запоріжжя", "Zaporizhia"],
+    "Mykolaiv": ["Mikołajów", "Mikolajow", "Миколаїв"],
+    "Kherson": ["Chersoń", "Cherson", "Херсон"],
+    "Lutsk": ["Łuck", "Luck", "Луцьк"],
+    "Rivne": ["Równe", "Rowne", "Рівне"],
+    "Ternopil": ["Tarnopol", "Тернопіль"],
+    "Ivano-Frankivsk": ["Iwano-Frankiwsk", "Івано-Франківськ"],
+    "Uzhhorod": ["Użhorod", "Uzhgorod", "Ужгород"],
+    "Chernivtsi": ["Czerniowce", "Чернівці"],
+    "Vinnytsia": ["Winnica", "Вінниця", "Vinnitsa"],
+    "Zhytomyr": ["Żytomierz", "Zytomierz", "Житомир"],
+    "Chernihiv": ["Czernihów", "Chernigov", "Чернігів"],
+    "Sumy": ["Суми"],
+    "Poltava": ["Połtawa", "Poltawa", "Полтава"],
+    "Mariupol": ["Mariupol'", "Маріуполь"],
+    "Kramatorsk": ["Краматорськ"],
+    "Bucha": ["Bucza", "Буча"],
+    "Irpin": ["Irpień", "Ірпінь"],
+    # Voivodeships
+    "Masovian Voivodeship": ["Mazowieckie", "Мазовецьке воєводство"],
+    "Lesser Poland Voivodeship": ["Małopolskie", "Malopolskie", "Малопольське воєводство"],
+    "Lublin Voivodeship": ["Lubelskie", "Люблінське воєводство"],
+    "Subcarpathian Voivodeship": ["Podkarpackie", "Підкарпатське воєводство"],
+    "Lower Silesian Voivodeship": ["Dolnośląskie", "Dolnoslaskie", "Нижньосілезьке воєводство"],
+    "Silesian Voivodeship": ["Śląskie", "Slaskie", "Сілезьке воєводство"],
+    "Greater Poland Voivodeship": ["Wielkopolskie", "Великопольське воєводство"],
+    "Pomeranian Voivodeship": ["Pomorskie", "Поморське воєводство"],
+    "Łódź Voivodeship": ["Łódzkie", "Lodzkie", "Лодзинське воєводство"],
+    "Podlaskie Voivodeship": ["Podlaskie", "Підляське воєводство"],
+    "West Pomeranian Voivodeship": ["Zachodniopomorskie", "Західнопоморське воєводство"],
+    # Border crossings
+    "Medyka": ["Медика", "Medyka-Shehyni"],
+    "Shehyni": ["Szeginie", "Шегині", "Shehini"],
+    "Dorohusk": ["Дорогуськ", "Dorohusk-Yahodyn"],
+    "Yahodyn": ["Jagodzin", "Ягодин"],
+    "Hrebenne": ["Гребенне", "Hrebenne-Rava-Ruska"],
+    "Rava-Ruska": ["Rawa Ruska", "Рава-Руська"],
+    "Korczowa": ["Корчова", "Korchova"],
+    "Krakovets": ["Krakowiec", "Краковець"],
+    "Budomierz": ["Будомєж", "Budomierz-Hrushiv"],
+    "Hrushiv": ["Hruszów", "Грушів"],
+    "Zosin": ["Зосин", "Zosin-Ustyluh"],
+    "Ustyluh": ["Uściług", "Устилуг"],
+    "Dołhobyczów": ["Dolhobyczow", "Долгобичів"],
+    "Uhryniv": ["Uhrynów", "Угринів"],
+    "Krościenko": ["Kroscienko", "Кросценко"],
+    "Smilnytsia": ["Smolnica", "Смільниця"],
+}
+
+def load_place_names() -> List[str]:
+    """
+    Return every known spelling of every place, including NER_PLACE_NAMES_PATH.
+
+    Returns:
+        Unique place names in a stable order
+    """
+    names = []
+    for canonical, variants in PLACE_NAMES.items():
+        names.append(canonical)
+        names.extend(variants)
+
+    if PLACE_NAMES_PATH:
+        try:
+            with open(PLACE_NAMES_PATH, 'r', encoding='utf-8') as f:
+                extra = json.load(f)
+            if isinstance(extra, dict):
+                for canonical, variants in extra.items():
+                    names.append(canonical)
+                    names.extend(variants)
+            else:
+                names.extend(extra)
+        except Exception as e:
+            logger.error(f"Error loading place names from {PLACE_NAMES_PATH}: {e}")
+
+    return list(dict.fromkeys(name for name in names if name and name.strip()))
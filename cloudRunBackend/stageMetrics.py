@@ -0,0 +1,198 @@
+import os
+import json
+import time
+import logging
+import threading
+import contextvars
+from datetime import datetime, timezone
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterable, List, Optional
+
+# Set up logging
+logger = logging.getLogger("json-processor-api")
+
+# USD per million prompt / completion tokens (OpenAI standard tier list prices)
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+}
+
+# USD per minute of audio
+AUDIO_PRICES = {
+    "whisper-1": 0.006,
+}
+
+# Written next to result.json
+METRICS_FILE_NAME = "pipeline_metrics.json"
+
+FIELDS = ("wall_seconds", "calls", "cached_calls", "prompt_tokens", "completion_tokens",
+          "media_bytes", "audio_seconds", "cost_usd")
+
+def _price(prices: Dict[str, Any], model: str) -> Any:
+    """Price of a model, matching dated snapshots (gpt-4o-2024-08-06) by prefix"""
+    for name in sorted(prices, key=len, reverse=True):
+        if model == name or model.startswith(name + "-"):
+            return prices[name]
+    return None
+
+def request_cost(model: str, prompt_tokens: int = 0, completion_tokens: int = 0, audio_seconds: float = 0.0) -> float:
+    """USD cost of one request, 0 for models without a known price"""
+    cost = 0.0
+    token_price = _price(MODEL_PRICES, model)
+    if token_price:
+        cost += (prompt_tokens * token_price[0] + completion_tokens * token_price[1]) / 1_000_000
+    audio_price = _price(AUDIO_PRICES, model)
+    if audio_price:
+        cost += audio_seconds / 60 * audio_price
+    return cost
+
+class _Scope:
+    """Stage and messages that requests made in this context are attributed to."""
+
+    def __init__(self, metrics: "SessionMetrics", message_ids: List, stage: str, parent: Optional["_Scope"]):
+        self.metrics = metrics
+        self.message_ids = message_ids
+        self.stage = stage
+        self.parent = parent
+        # Time spent in nested timed scopes, left out of this scope's own wall time
+        self.child_seconds = 0.0
+
+_current_scope: contextvars.ContextVar = contextvars.ContextVar("stage_metrics_scope", default=None)
+
+class SessionMetrics:
+    """
+    Wall time, tokens, media bytes and cost per message and stage of one processing run.
+
+    Stage totals are exact. Stages that work on a batch of messages (the
+    translation stage, categorization, NER/geocoding) split their values
+    evenly over the messages of the batch.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Dict[str, float]] = {}
+        self._messages: Dict[str, Dict[str, Dict[str, float]]] = {}
+
+    def add(self, message_ids: Iterable, stage: str, **values: float) -> None:
+        """Add values to a stage, shared evenly by message_ids"""
+        ids = [str(message_id) for message_id in message_ids if message_id is not None]
+        with self._lock:
+            totals = self._stages.setdefault(stage, dict.fromkeys(FIELDS, 0))
+            for key, value in values.items():
+                totals[key] += value
+            for message_id in ids:
+                record = self._messages.setdefault(message_id, {}).setdefault(stage, dict.fromkeys(FIELDS, 0))
+                for key, value in values.items():
+                    record[key] += value / len(ids)
+
+    @contextmanager
+    def measure(self, message_ids: Iterable, stage: str):
+        """
+        Time a stage for some messages and attribute the requests made inside it.
+
+        Time spent in nested measure / stage_scope blocks counts for the inner
+        stage only.
+        """
+        parent = _current_scope.get()
+        scope = _Scope(self, list(message_ids), stage, parent)
+        token = _current_scope.set(scope)
+        start = time.perf_counter()
+        try:
+            yield scope
+        finally:
+            elapsed = time.perf_counter() - start
+            _current_scope.reset(token)
+            self.add(scope.message_ids, stage, wall_seconds=max(0.0, elapsed - scope.child_seconds))
+            if parent is not None and parent.metrics is self:
+                parent.child_seconds += elapsed
+
+    def report(self, include_messages: bool = True) -> Dict[str, Any]:
+        """Totals, per-stage values and (optionally) per-message values"""
+        with self._lock:
+            stages = {stage: _rounded(values) for stage, values in self._stages.items()}
+            messages = {
+                message_id: {stage: _rounded(values) for stage, values in record.items()}
+                for message_id, record in self._messages.items()
+            } if include_messages else None
+
+        totals = dict.fromkeys(FIELDS, 0)
+        for values in stages.values():
+            for key in FIELDS:
+                totals[key] += values[key]
+
+        report = {
+            "started_at": datetime.fromtimestamp(self.started_at, timezone.utc).isoformat(),
+            "elapsed_seconds": round(time.time() - self.started_at, 3),
+            "totals": _rounded(totals),
+            "stages": stages,
+        }
+        if include_messages:
+            report["messages"] = messages
+        return report
+
+def _rounded(values: Dict[str, float]) -> Dict[str, float]:
+    return {
+        "wall_seconds": round(values["wall_seconds"], 3),
+        "calls": round(values["calls"], 2),
+        "cached_calls": round(values["cached_calls"], 2),
+        "prompt_tokens": round(values["prompt_tokens"], 1),
+        "completion_tokens": round(values["completion_tokens"], 1),
+        "media_bytes": round(values["media_bytes"]),
+        "audio_seconds": round(values["audio_seconds"], 2),
+        "cost_usd": round(values["cost_usd"], 6),
+    }
+
+def stage_scope(stage: str):
+    """Time a sub-stage for the messages of the current scope (does nothing outside one)"""
+    scope = _current_scope.get()
+    if scope is None:
+        return nullcontext()
+    return scope.metrics.measure(scope.message_ids, stage)
+
+@contextmanager
+def message_scope(message_ids: Iterable):
+    """Attribute requests to some of the current scope's messages, without timing"""
+    scope = _current_scope.get()
+    if scope is None:
+        yield
+        return
+    token = _current_scope.set(_Scope(scope.metrics, list(message_ids), scope.stage, scope))
+    try:
+        yield
+    finally:
+        _current_scope.reset(token)
+
+def record_request(model: str, usage: Any = None, media_bytes: int = 0, audio_seconds: float = 0.0) -> None:
+    """Record a completed OpenAI request against the current scope"""
+    scope = _current_scope.get()
+    if scope is None:
+        return
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    scope.metrics.add(
+        scope.message_ids, scope.stage,
+        calls=1,
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        media_bytes=media_bytes,
+        audio_seconds=audio_seconds,
+        cost_usd=request_cost(model, prompt_tokens, completion_tokens, audio_seconds),
+    )
+
+def record_cache_hit() -> None:
+    """Record an LLM call answered from the cache against the current scope"""
+    scope = _current_scope.get()
+    if scope is not None:
+        scope.metrics.add(scope.message_ids, scope.stage, cached_calls=1)
+
+def write_report(metrics: SessionMetrics, result_json_path: str) -> Optional[str]:
+    """Write the full report next to result.json; returns its path, or None on failure"""
+    path = os.path.join(os.path.dirname(result_json_path), METRICS_FILE_NAME)
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(metrics.report(), f, ensure_ascii=False, indent=2)
+        return path
+    except Exception as e:
+        logger.error(f"Error writing pipeline metrics to {path}: {e}")
+        return None
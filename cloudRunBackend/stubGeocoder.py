@@ -0,0 +1,86 @@
+import json
+import time
+import argparse
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from geocodeCache import normalize_place_name
+
+# Set up logging
+logger = logging.getLogger("stub_geocoder")
+
+# Places answered when no data file is given
+DEFAULT_PLACES = {
+    "warszawa": (52.2297, 21.0122),
+    "warsaw": (52.2297, 21.0122),
+    "kraków": (50.0647, 19.9450),
+    "krakow": (50.0647, 19.9450),
+    "przemyśl": (49.7838, 22.7678),
+    "przemysl": (49.7838, 22.7678),
+    "wrocław": (51.1079, 17.0385),
+    "lviv": (49.8397, 24.0297),
+    "kyiv": (50.4501, 30.5234),
+    "medyka": (49.8031, 22.9336),
+}
+
+class StubGeocoderHandler(BaseHTTPRequestHandler):
+    """Answers Nominatim-style /search requests from a fixed table of places"""
+
+    places = DEFAULT_PLACES
+    latency = 0.0
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.rstrip("/") != "/search":
+            self.send_error(404)
+            return
+
+        query = parse_qs(url.query).get("q", [""])[0]
+        if self.latency:
+            time.sleep(self.latency)
+
+        coords = self.places.get(normalize_place_name(query))
+        results = []
+        if coords is not None:
+            results.append({
+                "lat": str(coords[0]),
+                "lon": str(coords[1]),
+                "display_name": query,
+                "importance": 1.0,
+            })
+
+        body = json.dumps(results).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.info(format % args)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Local stand-in for Nominatim (run with GEOCODE_PROVIDER=stub)"
+    )
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--data", help='JSON file mapping place names to [lat, lon]')
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before each response")
+    args = parser.parse_args()
+
+    if args.data:
+        with open(args.data, 'r', encoding='utf-8') as f:
+            StubGeocoderHandler.places = {
+                normalize_place_name(name): tuple(coords) for name, coords in json.load(f).items()
+            }
+    StubGeocoderHandler.latency = args.latency
+
+    server = ThreadingHTTPServer((args.host, args.port), StubGeocoderHandler)
+    logger.info(f"Stub geocoder listening on http://{args.host}:{args.port}/search")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,233 @@
+import os
+import sys
+import time
+import json
+import asyncio
+import argparse
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from aiLoader import createAsyncAI
+from helpers import translateAsync, translatePackedAsync
+from languageId import local_translation
+from stageMetrics import message_scope
+
+# Set up logging
+logger = logging.getLogger("json-processor-api")
+
+# =====================================================================
+# CONFIGURATION - Use environment variables for Cloud Run compatibility
+# =====================================================================
+
+# Translation requests in flight at once; 1 keeps the old one-by-one behaviour
+TRANSLATION_CONCURRENCY = int(os.environ.get("TRANSLATION_CONCURRENCY", "16"))
+
+# Group several messages into one request instead of one request per message
+TRANSLATION_PACKED = os.environ.get("TRANSLATION_PACKED", "True").lower() == "true"
+
+# Estimated input tokens of message text per packed request; the reply is
+# about as long again, which keeps packs well under the output limit
+TRANSLATION_PACK_TOKEN_BUDGET = int(os.environ.get("TRANSLATION_PACK_TOKEN_BUDGET", "1500"))
+
+# Messages per packed request; more ids make dropped items likelier
+TRANSLATION_PACK_MAX_MESSAGES = int(os.environ.get("TRANSLATION_PACK_MAX_MESSAGES", "40"))
+
+# Added to each text's estimate for its JSON wrapping ({"id": .., "text": ..})
+PACK_ITEM_OVERHEAD_TOKENS = 8
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count (about four characters per token)"""
+    return max(1, len(text) // 4)
+
+def stage_enabled() -> bool:
+    """Whether processJson should translate all messages up front with the async stage"""
+    return TRANSLATION_CONCURRENCY > 1
+
+def pack_texts(texts: List[str], token_budget: int = None, max_messages: int = None) -> List[List[int]]:
+    """
+    Group texts into packs for packed translation requests.
+
+    Texts are taken in order; a pack is closed when the next text would take
+    it over token_budget or max_messages. A text over the budget on its own
+    gets a pack to itself.
+
+    Args:
+        texts: Texts to translate
+        token_budget: Estimated tokens per pack (defaults to TRANSLATION_PACK_TOKEN_BUDGET)
+        max_messages: Texts per pack (defaults to TRANSLATION_PACK_MAX_MESSAGES)
+
+    Returns:
+        Packs as lists of indexes into texts
+    """
+    if token_budget is None:
+        token_budget = TRANSLATION_PACK_TOKEN_BUDGET
+    if max_messages is None:
+        max_messages = TRANSLATION_PACK_MAX_MESSAGES
+
+    packs = []
+    current = []
+    current_tokens = 0
+    for i, text in enumerate(texts):
+        tokens = estimate_tokens(text) + PACK_ITEM_OVERHEAD_TOKENS
+        if current and (current_tokens + tokens > token_budget or len(current) >= max_messages):
+            packs.append(current)
+            current = []
+            current_tokens = 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        packs.append(current)
+    return packs
+
+async def _attributed(message_ids: Optional[List], indexes: List[int], coroutine):
+    """Await a translation request, its tokens counted for the messages of the given texts."""
+    if message_ids is None:
+        return await coroutine
+    with message_scope([message_ids[i] for i in indexes]):
+        return await coroutine
+
+async def _translate_packs(texts: List[str], packs: List[List[int]], client, semaphore, message_ids: Optional[List] = None) -> Tuple[List[Optional[Dict]], Dict[str, int]]:
+    """Translate packs concurrently, then retry missing texts one request each."""
+    results: List[Optional[Dict]] = [None] * len(texts)
+    counts = {"packed_requests": 0, "single_requests": 0, "retried": 0}
+
+    multi = [pack for pack in packs if len(pack) > 1]
+    counts["packed_requests"] = len(multi)
+    replies = await asyncio.gather(*(
+        _attributed(message_ids, pack, translatePackedAsync([texts[i] for i in pack], client, semaphore)) for pack in multi
+    ))
+    for pack, reply in zip(multi, replies):
+        for position, i in enumerate(pack):
+            results[i] = reply.get(position)
+
+    # Single-text packs, and texts a packed reply dropped or mangled
+    missing = [i for i, result in enumerate(results) if result is None]
+    packed_indexes = {i for pack in multi for i in pack}
+    counts["retried"] = sum(1 for i in missing if i in packed_indexes)
+    counts["single_requests"] = len(missing)
+    singles = await asyncio.gather(*(
+        _attributed(message_ids, [i], translateAsync(texts[i], client, semaphore)) for i in missing
+    ))
+    for i, result in zip(missing, singles):
+        results[i] = result
+
+    return results, counts
+
+async def _translate_all(texts: List[str], concurrency: int, packed: bool, message_ids: Optional[List] = None) -> Tuple[List[Optional[Dict]], Dict[str, int]]:
+    """Translate texts concurrently, at most concurrency requests at a time."""
+    client = createAsyncAI()
+    semaphore = asyncio.Semaphore(concurrency)
+    try:
+        if packed:
+            return await _translate_packs(texts, pack_texts(texts), client, semaphore, message_ids)
+        # gather returns results in the order of the texts
+        results = await asyncio.gather(*(
+            _attributed(message_ids, [i], translateAsync(text, client, semaphore)) for i, text in enumerate(texts)
+        ))
+        return results, {"packed_requests": 0, "single_requests": len(texts), "retried": 0}
+    finally:
+        await client.close()
+
+def translate_all(texts: List[str], concurrency: int = None, packed: bool = None, message_ids: Optional[List] = None) -> List[Optional[Dict]]:
+    """
+    Translate many texts concurrently.
+
+    Args:
+        texts: Texts to translate
+        concurrency: Requests in flight at once (defaults to TRANSLATION_CONCURRENCY)
+        packed: Group texts into shared requests (defaults to TRANSLATION_PACKED)
+        message_ids: Ids aligned with texts, for per-message metrics
+
+    Returns:
+        List aligned with texts holding the translate() result dict, or None
+        where a translation failed
+    """
+    if not texts:
+        return []
+    if concurrency is None:
+        concurrency = TRANSLATION_CONCURRENCY
+    if packed is None:
+        packed = TRANSLATION_PACKED
+
+    start_time = time.time()
+
+    # Answer English and letterless texts locally; only the rest go to the LLM
+    results: List[Optional[Dict]] = [local_translation(text) for text in texts]
+    remote = [i for i, result in enumerate(results) if result is None]
+
+    counts = {"packed_requests": 0, "single_requests": 0, "retried": 0}
+    if remote:
+        remote_ids = [message_ids[i] for i in remote] if message_ids is not None else None
+        remote_results, counts = asyncio.run(_translate_all([texts[i] for i in remote], max(1, concurrency), packed, remote_ids))
+        for i, result in zip(remote, remote_results):
+            results[i] = result
+
+    logger.info(
+        f"Translated {sum(1 for r in results if r)}/{len(texts)} texts in "
+        f"{time.time() - start_time:.2f} seconds ({len(texts) - len(remote)} answered locally, "
+        f"concurrency {concurrency}, "
+        f"{counts['packed_requests']} packed + {counts['single_requests']} single requests, "
+        f"{counts['retried']} retried individually)"
+    )
+    return results
+
+def translate_messages(messages: List[Dict], concurrency: int = None) -> None:
+    """
+    Translate the text of every message and write LANGUAGE / TRANSLATED_TEXT back.
+
+    Args:
+        messages: Telegram export messages; those without text are left alone
+        concurrency: Requests in flight at once (defaults to TRANSLATION_CONCURRENCY)
+    """
+    pending = [message for message in messages if message.get("text")]
+    results = translate_all(
+        [message["text"] for message in pending], concurrency, message_ids=[message.get("id") for message in pending]
+    )
+
+    for message, result in zip(pending, results):
+        if result:
+            message['LANGUAGE'] = result.get("language", "unknown")
+            message['TRANSLATED_TEXT'] = result.get("translation", "")
+        else:
+            logger.warning("Translation returned None")
+
+def benchmark(count: int, concurrencies: List[int], packed: bool = False) -> Dict:
+    """
+    Time the translation stage at several concurrency levels.
+
+    Meant to run against mockOpenAI.py (OPENAI_BASE_URL=http://localhost:8090/v1)
+    with the LLM cache off, so every run makes real requests.
+
+    Args:
+        count: Number of synthetic texts
+        concurrencies: Concurrency levels to compare
+        packed: Group texts into shared requests
+
+    Returns:
+        Seconds taken and requests made per concurrency level
+    """
+    texts = [f"Де можна отримати номер PESEL? Повідомлення {i}" for i in range(count)]
+    timings = {}
+    for concurrency in concurrencies:
+        start_time = time.time()
+        results, counts = asyncio.run(_translate_all(texts, max(1, concurrency), packed))
+        timings[concurrency] = {
+            "seconds": round(time.time() - start_time, 3),
+            "translated": sum(1 for r in results if r),
+            "requests": counts["packed_requests"] + counts["single_requests"],
+            **counts,
+        }
+    return timings
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    parser = argparse.ArgumentParser(description="Benchmark the async translation stage")
+    parser.add_argument("--count", type=int, default=200, help="Number of texts to translate")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--packed", action="store_true", help="Group texts into shared requests")
+    args = parser.parse_args()
+
+    if not os.environ.get("OPENAI_BASE_URL"):
+        print("Set OPENAI_BASE_URL (e.g. http://localhost:8090/v1 for mockOpenAI.py)", file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(benchmark(args.count, [int(c) for c in args.concurrency.split(",")], args.packed), indent=2))
@@ -12,6 +12,18 @@ import contractions
 import unicodedata 
 from typing import List, Dict, Tuple, Union, Any
 import time 
+import hashlib
+
+from embeddingCache import (
+    EmbeddingCache,
+    CACHE_ENABLED,
+    CACHE_PATH,
+    CACHE_MEMORY_ITEMS,
+    CACHE_MAX_ITEMS,
+)
+from modelPackage import load_manifest
+from knnIndex import KnnIndex
+from modelRegistry import ModelRegistry
 
 # Set up logging - Use Cloud Run friendly configuration (output to stdout/stderr)
 logging.basicConfig(
@@ -30,14 +42,50 @@ logger = logging.getLogger("vector_classifier")
 # Root directory for the model package - customizable via environment variable
 MODEL_ROOT = os.environ.get("VECTOR_MODEL_PATH", "/app/models/vector_model_package")
 
+# Optional directory with one sub-directory per model package version.
+# When set, packages are served through a hot-reloading ModelRegistry.
+VERSIONS_DIR = os.environ.get("VECTOR_MODEL_VERSIONS_DIR")
+
 # Derived paths for model components
 SENTENCE_TRANSFORMER_PATH = os.path.join(MODEL_ROOT, "sentence_transformer")
 CATEGORY_EMBEDDINGS_PATH = os.path.join(MODEL_ROOT, "category_embeddings.json")
+CATEGORY_VECTORS_PATH = os.path.join(MODEL_ROOT, "category_vectors.npy")
+CATEGORY_LABELS_PATH = os.path.join(MODEL_ROOT, "category_labels.json")
 METADATA_PATH = os.path.join(MODEL_ROOT, "metadata.json")
 
 # Allow configuring these via environment variables too
 THRESHOLD = float(os.environ.get("VECTOR_THRESHOLD", "0.6"))
 MULTI_LABEL = os.environ.get("VECTOR_MULTI_LABEL", "True").lower() == "true"
+BATCH_SIZE = int(os.environ.get("VECTOR_BATCH_SIZE", "32"))
+
+# Padded tokens per encoder batch: texts are sorted by token length and grouped
+# so that (longest text in the batch x batch size) stays under this budget
+TOKEN_BUDGET = int(os.environ.get("VECTOR_TOKEN_BUDGET", "8192"))
+
+# Texts longer than the model's max sequence length: "head" keeps the start,
+# "head_tail" keeps the start and the end, "chunk" averages the embeddings of
+# consecutive windows over the whole text
+TRUNCATION = os.environ.get("VECTOR_TRUNCATION", "head").lower()
+SUPPORTED_TRUNCATION = ("head", "head_tail", "chunk")
+
+# Share of the token window kept from the start of the text with head_tail
+HEAD_TAIL_RATIO = 0.75
+
+# Inference backend for the sentence transformer: torch, onnx or onnx-int8
+BACKEND = os.environ.get("VECTOR_BACKEND", "torch").lower()
+SUPPORTED_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+# Quantization config used for onnx-int8 (avx2 runs on any x86 Cloud Run instance)
+ONNX_QUANTIZATION_CONFIG = os.environ.get("VECTOR_ONNX_QUANTIZATION", "avx2")
+ONNX_INT8_FILE_NAME = f"model_qint8_{ONNX_QUANTIZATION_CONFIG}.onnx"
+
+# Category scoring: "centroid" compares against one vector per category,
+# "knn" votes over the nearest labelled training examples (needs knn_index.json)
+SCORING = os.environ.get("VECTOR_SCORING", "centroid").lower()
+
+# Minimum vote share (0-1) for a category with knn scoring; VECTOR_THRESHOLD
+# is a cosine similarity and only applies to centroid scoring
+KNN_THRESHOLD = float(os.environ.get("VECTOR_KNN_THRESHOLD", "0.3"))
 
 # =====================================================================
 # TEXT CLEANING FUNCTION
@@ -73,6 +121,114 @@ def clean_text(text: str) -> str:
     
     return text
 
+# =====================================================================
+# COMPILED CATEGORY ARTIFACT
+# =====================================================================
+
+def normalize_category_vectors(vectors: np.ndarray) -> np.ndarray:
+    """
+    Normalize category vectors to unit length as float32.
+    
+    Args:
+        vectors: (C x D) array of category embeddings
+        
+    Returns:
+        (C x D) float32 array with unit-length rows
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1)
+    norms[norms == 0] = 1.0
+    return vectors / norms[:, np.newaxis]
+
+def load_category_artifact(vectors_path: str, labels_path: str) -> Tuple[List[str], np.ndarray]:
+    """
+    Open the compiled category artifact written at package time.
+    
+    The vectors are memory-mapped read-only, so every worker process shares
+    the same page-cached copy instead of holding its own parsed JSON.
+    
+    Args:
+        vectors_path: Path to category_vectors.npy
+        labels_path: Path to category_labels.json
+        
+    Returns:
+        Tuple of (category labels, (C x D) category vector matrix)
+    """
+    with open(labels_path, 'r', encoding='utf-8') as f:
+        label_index = json.load(f)
+    labels = label_index["labels"]
+    
+    vectors = np.load(vectors_path, mmap_mode='r')
+    if vectors.shape[0] != len(labels):
+        raise ValueError(
+            f"Category artifact mismatch: {vectors.shape[0]} vectors but {len(labels)} labels"
+        )
+    if not label_index.get("normalized", False):
+        vectors = normalize_category_vectors(vectors)
+    return labels, vectors
+
+def load_sentence_transformer(model_path: str, backend: str = "torch", weights_format: str = None) -> SentenceTransformer:
+    """
+    Load the sentence transformer with the requested inference backend.
+    
+    The ONNX backends expect the exported model under <model_path>/onnx
+    (see onnxExport.py). If it is missing, sentence-transformers exports the
+    fp32 ONNX model on the fly, which is slow, so run the export at build time.
+    
+    Args:
+        model_path: Path to the sentence transformer directory
+        backend: One of "torch", "onnx" or "onnx-int8"
+        weights_format: "safetensors" to load model.safetensors directly
+        
+    Returns:
+        Loaded SentenceTransformer
+    """
+    if backend not in SUPPORTED_BACKENDS:
+        raise ValueError(f"Unsupported VECTOR_BACKEND '{backend}', expected one of {SUPPORTED_BACKENDS}")
+    
+    if backend == "torch":
+        if weights_format == "safetensors":
+            return SentenceTransformer(model_path, model_kwargs={"use_safetensors": True})
+        return SentenceTransformer(model_path)
+    
+    if backend == "onnx":
+        return SentenceTransformer(model_path, backend="onnx")
+    
+    # onnx-int8: dynamically quantized model written by onnxExport.py
+    quantized_path = os.path.join(model_path, "onnx", ONNX_INT8_FILE_NAME)
+    if not os.path.exists(quantized_path):
+        raise FileNotFoundError(
+            f"Quantized ONNX model not found at {quantized_path}. "
+            f"Run 'python onnxExport.py {model_path}' at build time."
+        )
+    return SentenceTransformer(
+        model_path,
+        backend="onnx",
+        model_kwargs={"file_name": f"onnx/{ONNX_INT8_FILE_NAME}"}
+    )
+
+def compute_model_version(model_path: str) -> str:
+    """
+    Fingerprint the model weights for use as a cache version.
+    
+    Uses the path, size and modification time of the weights file rather than
+    hashing its contents, so it stays cheap on cold start.
+    
+    Args:
+        model_path: Path to the sentence transformer directory
+        
+    Returns:
+        Short hex identifier of the model
+    """
+    fingerprint = [os.path.abspath(model_path)]
+    for name in ("model.safetensors", "pytorch_model.bin"):
+        weights_path = os.path.join(model_path, name)
+        if os.path.exists(weights_path):
+            stat = os.stat(weights_path)
+            fingerprint.append(f"{name}:{stat.st_size}:{int(stat.st_mtime)}")
+            break
+    return hashlib.sha256("|".join(fingerprint).encode("utf-8")).hexdigest()[:16]
+
 # =====================================================================
 # VECTOR CLASSIFIER CLASS
 # =====================================================================
@@ -84,21 +240,56 @@ class VectorClassifier:
         category_embeddings_path: str, 
         metadata_path: str = None,
         threshold: float = 0.6,
-        multi_label: bool = True
+        multi_label: bool = True,
+        category_vectors_path: str = None,
+        category_labels_path: str = None,
+        embedding_cache_path: str = None,
+        backend: str = "torch",
+        weights_format: str = None,
+        scoring: str = "centroid",
+        knn_index_path: str = None,
+        knn_threshold: float = 0.3,
+        token_budget: int = 8192,
+        truncation: str = "head"
     ):
         """
         Initialize classifier with model and category embeddings.
         
+        If the compiled category artifact (category_vectors.npy plus
+        category_labels.json) is available it is memory-mapped instead of
+        parsing category_embeddings.json.
+        
         Args:
             model_path: Path to the trained model directory
-            category_embeddings_path: Path to saved category embeddings
+            category_embeddings_path: Path to saved category embeddings (JSON fallback)
             metadata_path: Path to model metadata
             threshold: Minimum similarity score to assign a category
             multi_label: Whether to allow multiple categories per text
+            category_vectors_path: Path to pre-normalized float32 category vectors (.npy)
+            category_labels_path: Path to the label index for category_vectors_path
+            embedding_cache_path: Path to the on-disk embedding cache (None disables caching)
+            backend: Inference backend for the sentence transformer (torch, onnx, onnx-int8)
+            weights_format: Weights format recorded in the package manifest, if any
+            scoring: "centroid" or "knn" (vote over nearest training examples)
+            knn_index_path: Path to knn_index.json, required for knn scoring
+            knn_threshold: Minimum vote share to assign a category with knn scoring
+            token_budget: Maximum padded tokens per encoder batch
+            truncation: Policy for texts over the max sequence length (head, head_tail, chunk)
         """
         self.temp_dir = None
         self.threshold = threshold
         self.multi_label = multi_label
+        self.backend = backend
+        self.model_version = None
+        self.embedding_cache = None
+        self.knn_index = None
+        self.knn_threshold = knn_threshold
+        self.token_budget = token_budget
+        self.truncation = truncation
+        self.truncated_texts = 0
+        
+        if truncation not in SUPPORTED_TRUNCATION:
+            raise ValueError(f"Unsupported VECTOR_TRUNCATION '{truncation}', expected one of {SUPPORTED_TRUNCATION}")
         
         # Initialize hierarchy containers
         self.category_hierarchy = {}
@@ -121,8 +312,14 @@ class VectorClassifier:
             if os.path.isdir(model_path):
                 logger.info(f"Model directory contents: {os.listdir(model_path)}")
         
+        use_artifact = bool(
+            category_vectors_path and category_labels_path
+            and os.path.exists(category_vectors_path)
+            and os.path.exists(category_labels_path)
+        )
+        
         # Check if category embeddings file exists
-        if not os.path.exists(category_embeddings_path):
+        if not use_artifact and not os.path.exists(category_embeddings_path):
             logger.error(f"Category embeddings file does not exist: {category_embeddings_path}")
             parent_dir = os.path.dirname(category_embeddings_path)
             if os.path.exists(parent_dir):
@@ -130,8 +327,8 @@ class VectorClassifier:
         
         # Try to load the model
         try:
-            logger.info(f"Loading SentenceTransformer model from: {model_path}")
-            self.model = SentenceTransformer(model_path)
+            logger.info(f"Loading SentenceTransformer model from: {model_path} (backend={backend})")
+            self.model = load_sentence_transformer(model_path, backend, weights_format)
             logger.info("Successfully loaded SentenceTransformer model")
         except Exception as e:
             logger.error(f"Failed to load model from {model_path}: {str(e)}")
@@ -143,6 +340,8 @@ class VectorClassifier:
             try:
                 with open(metadata_path, 'r') as f:
                     metadata = json.load(f)
+                if 'model_version' in metadata:
+                    self.model_version = str(metadata['model_version'])
                 # Set multi-label mode from metadata if available
                 if 'multi_label' in metadata:
                     self.multi_label = metadata['multi_label']
@@ -169,19 +368,108 @@ class VectorClassifier:
         else:
             logger.info(f"No metadata file found or specified, using default settings")
         
+        # Fall back to fingerprinting the weights file when metadata has no version
+        if self.model_version is None:
+            self.model_version = compute_model_version(model_path)
+        # Embeddings differ slightly between backends, so keep their cache entries apart
+        if self.backend != "torch":
+            self.model_version = f"{self.model_version}-{self.backend}"
+        # Long texts embed differently under other truncation policies
+        if self.truncation != "head":
+            self.model_version = f"{self.model_version}-{self.truncation}"
+        logger.info(f"Model version: {self.model_version}")
+        
+        # Open the embedding cache (optional, classification works without it)
+        if embedding_cache_path:
+            try:
+                self.embedding_cache = EmbeddingCache(
+                    embedding_cache_path,
+                    self.model_version,
+                    memory_items=CACHE_MEMORY_ITEMS,
+                    max_items=CACHE_MAX_ITEMS
+                )
+            except Exception as e:
+                logger.error(f"Could not open embedding cache, continuing without it: {e}")
+                self.embedding_cache = None
+        
         # Load category embeddings
         try:
-            logger.info(f"Loading category embeddings from: {category_embeddings_path}")
-            with open(category_embeddings_path, 'r') as f:
-                self.category_embeddings = json.load(f)
-                
-            # Convert category embeddings to numpy arrays
-            self.categories = list(self.category_embeddings.keys())
-            self.category_vectors = np.array([self.category_embeddings[cat] for cat in self.categories])
+            if use_artifact:
+                logger.info(f"Memory-mapping category vectors from: {category_vectors_path}")
+                self.categories, self.category_vectors = load_category_artifact(
+                    category_vectors_path, category_labels_path
+                )
+            else:
+                logger.info(f"Loading category embeddings from: {category_embeddings_path}")
+                with open(category_embeddings_path, 'r') as f:
+                    category_embeddings = json.load(f)
+                    
+                # Convert category embeddings to a normalized float32 matrix once
+                self.categories = list(category_embeddings.keys())
+                self.category_vectors = normalize_category_vectors(
+                    np.array([category_embeddings[cat] for cat in self.categories])
+                )
             logger.info(f"Loaded {len(self.categories)} categories")
         except Exception as e:
             logger.error(f"Error loading category embeddings: {str(e)}")
             raise
+        
+        # Load the nearest neighbour index for knn scoring
+        if scoring == "knn":
+            if not knn_index_path or not os.path.exists(knn_index_path):
+                raise FileNotFoundError(f"VECTOR_SCORING=knn but kNN index not found at: {knn_index_path}")
+            self.knn_index = KnnIndex(knn_index_path)
+            missing = [cat for cat in self.categories if cat not in self.knn_index.labels]
+            if missing:
+                logger.warning(f"Categories without training examples in kNN index: {missing}")
+        elif scoring != "centroid":
+            raise ValueError(f"Unsupported VECTOR_SCORING '{scoring}', expected 'centroid' or 'knn'")
+        logger.info(f"Using {scoring} scoring")
+        
+        # Precompute per-category thresholds and parent indices
+        self._build_category_index()
+    
+    def _build_category_index(self):
+        """
+        Precompute the arrays used to threshold and rank similarity scores.
+        
+        With centroid scoring, child categories use half the regular threshold
+        to improve their detection. With knn scoring the scores are vote
+        shares, so every category uses the minimum vote share instead and
+        there are no near-miss (low confidence) results. Parents of child
+        categories that have no embedding of their own are appended to the
+        label space so they can still be back-filled.
+        """
+        num_categories = len(self.categories)
+        self._is_child = np.array([cat in self.child_to_parent for cat in self.categories], dtype=bool)
+        
+        if self.knn_index is not None:
+            self.child_threshold = self.knn_threshold
+            self._thresholds = np.full(num_categories, self.knn_threshold, dtype=np.float32)
+            # Best child reported only if it has the minimum vote share itself
+            self._top_child_min_score = self.knn_threshold
+            self._low_confidence_score = np.inf
+            self._low_confidence_child_score = np.inf
+        else:
+            # Use a lower threshold for child categories to improve their detection
+            self.child_threshold = self.threshold * 0.5
+            self._thresholds = np.where(self._is_child, self.child_threshold, self.threshold).astype(np.float32)
+            self._top_child_min_score = self.child_threshold * 0.5
+            # Best match returned as low confidence within 80% of the threshold
+            self._low_confidence_score = self.threshold * 0.8
+            self._low_confidence_child_score = self.child_threshold * 0.5
+        
+        # Label space: all categories followed by parents that have no embedding
+        self._labels = list(self.categories)
+        label_index = {cat: i for i, cat in enumerate(self._labels)}
+        self._parent_index = np.full(num_categories, -1, dtype=np.int64)
+        for i, cat in enumerate(self.categories):
+            if cat in self.child_to_parent:
+                parent = self.child_to_parent[cat]
+                if parent not in label_index:
+                    label_index[parent] = len(self._labels)
+                    self._labels.append(parent)
+                self._parent_index[i] = label_index[parent]
     
     def __del__(self):
         """Clean up temporary files when the classifier is destroyed."""
@@ -209,176 +497,451 @@ class VectorClassifier:
         
         # Generate embedding for input text
         try:
-            text_embedding = self.model.encode(text)
-            
-            # Calculate cosine similarities with all category embeddings
-            # Proper normalization for cosine similarity
-            text_norm = np.linalg.norm(text_embedding)
-            if text_norm == 0:
-                logger.warning("Text embedding has zero norm, cannot calculate similarities")
-                return {
-                    'original_text': original_text,
-                    'cleaned_text': text,
-                    'categories': ['null'],
-                    'confidence_scores': {},
-                    'status': 'error',
-                    'error': 'Zero embedding vector'
-                }
-                    
-            text_embedding_normalized = text_embedding / text_norm
-            category_norms = np.linalg.norm(self.category_vectors, axis=1)
-            category_vectors_normalized = self.category_vectors / category_norms[:, np.newaxis]
-            similarities = np.dot(category_vectors_normalized, text_embedding_normalized)
-            
-            # Collect all categories and their similarities
-            all_similarities = [(self.categories[i], float(score)) for i, score in enumerate(similarities)]
-            
-            # Sort all categories by similarity score (descending)
-            all_similarities = sorted(all_similarities, key=lambda x: x[1], reverse=True)
-            
-            # Use a lower threshold for child categories to improve their detection
-            child_threshold = self.threshold * 0.5 # 10% lower threshold for child categories
-            
-            # Keep track of categories above threshold
-            results = []
-            for cat, score in all_similarities:
-                # Use regular threshold for parent categories
-                if cat in self.category_hierarchy and score >= self.threshold:
-                    results.append((cat, score))
-                # Use lower threshold for child categories
-                elif cat in self.child_to_parent and score >= child_threshold:
-                    results.append((cat, score))
-                # Use regular threshold for standalone categories
-                elif score >= self.threshold:
-                    results.append((cat, score))
-            
-            # If no categories above threshold but we have valid scores
-            if not results and len(all_similarities) > 0:
-                # Get the best match
-                best_cat, max_score = all_similarities[0]
-                
-                # Check if the max score is close to threshold
-                if max_score > (self.threshold * 0.8):  # Within 80% of threshold
-                    # Check if it's a child category that's close to the child threshold
-                    if best_cat in self.child_to_parent and max_score > (child_threshold * 0.5):
-                        return {
-                            'original_text': original_text,
-                            'cleaned_text': text,
-                            'categories': [best_cat],
-                            'confidence_scores': {best_cat: float(max_score)},
-                            'status': 'low_confidence_child'  # Mark as low confidence child
-                        }
-                    else:
-                        # Return best match but mark as low confidence
-                        return {
-                            'original_text': original_text,
-                            'cleaned_text': text,
-                            'categories': [best_cat],
-                            'confidence_scores': {best_cat: float(max_score)},
-                            'status': 'low_confidence'
-                        }
-                else:
-                    # No good match at all
-                    return {
-                        'original_text': original_text,
-                        'cleaned_text': text,
-                        'categories': ['no_category'],
-                        'confidence_scores': {},
-                        'status': 'no_match'
-                    }
-            
-            # If not multi-label, only return the top category if it's above threshold
-            if not self.multi_label and results:
-                results = [results[0]]
-            
-            # Process results to handle hierarchy (add missing parent categories)
-            processed_results = self._process_hierarchical_results(results)
-            
-            # Extract categories and scores
-            categories = [cat for cat, _ in processed_results]
-            confidence_scores = {cat: score for cat, score in processed_results}
+            text_embedding = self.encode_texts([text])
+            return self._predict_from_embeddings([text], [original_text], text_embedding)[0]
+        except Exception as e:
+            logger.error(f"Error in category prediction: {str(e)}")
+            return self._error_result(text, original_text, e)
+
+    def predict_categories_batch(self, texts: List[str], original_texts: List[str], batch_size: int = 32) -> List[Dict]:
+        """
+        Predict categories for many texts at once.
+
+        All non-empty texts are encoded together in length buckets and scored
+        against the category vectors with one (N x D) @ (D x C) matrix product.
+        Results are returned in the same order as the input texts and have the
+        same structure as predict_categories.
+
+        Args:
+            texts: Cleaned texts to classify
+            original_texts: Original (uncleaned) texts, aligned with texts
+            batch_size: Batch size passed to the sentence transformer
+
+        Returns:
+            List of prediction dictionaries, one per input text
+        """
+        results = [None] * len(texts)
+
+        # Empty texts are filtered without touching the model
+        pending = []
+        for i, text in enumerate(texts):
+            if not text.strip():
+                results[i] = self.predict_categories(text, original_texts[i])
+            else:
+                pending.append(i)
+
+        if not pending:
+            return results
+
+        pending_texts = [texts[i] for i in pending]
+        pending_originals = [original_texts[i] for i in pending]
+        try:
+            embeddings = self.encode_texts(pending_texts, batch_size=batch_size)
+            predictions = self._predict_from_embeddings(pending_texts, pending_originals, embeddings)
+        except Exception as e:
+            logger.error(f"Error in batch category prediction: {str(e)}")
+            predictions = [self._error_result(t, o, e) for t, o in zip(pending_texts, pending_originals)]
+
+        for i, prediction in zip(pending, predictions):
+            results[i] = prediction
+
+        return results
+
+    def encode_texts(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """
+        Encode texts, serving repeated texts from the embedding cache.
+        
+        Only texts that miss the cache go through the sentence transformer,
+        each distinct text at most once.
+        
+        Args:
+            texts: Cleaned texts to encode
+            batch_size: Batch size passed to the sentence transformer
             
-            # Create hierarchy info for results
-            hierarchy_info = self._create_hierarchy_info(categories)
+        Returns:
+            (N x D) array of embeddings aligned with texts
+        """
+        if self.embedding_cache is None:
+            return self._encode_bucketed(texts, batch_size)
+        
+        embeddings = self.embedding_cache.get_many(texts)
+        missing = [i for i, vector in enumerate(embeddings) if vector is None]
+        
+        if missing:
+            unique_texts = list(dict.fromkeys(texts[i] for i in missing))
+            encoded = self._encode_bucketed(unique_texts, batch_size)
+            self.embedding_cache.put_many(unique_texts, encoded)
             
-            # Explicitly identify the top child category for the output
-            top_child_category = None
-            top_child_score = 0
+            encoded_by_text = dict(zip(unique_texts, encoded))
+            for i in missing:
+                embeddings[i] = encoded_by_text[texts[i]]
+        
+        return np.vstack(embeddings)
+
+    def _encode_bucketed(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """
+        Encode texts in length buckets under the token budget.
+        
+        Texts are truncated according to the truncation policy, sorted by token
+        length and grouped so that each batch pads to roughly the same length.
+        Short texts are batched widely, long texts a few at a time. The result
+        is restored to input order.
+        
+        Args:
+            texts: Cleaned texts to encode
+            batch_size: Maximum number of texts per batch
             
-            # Look for child categories in original results (before processing hierarchical results)
-            # This helps ensure we find the actual top child, not one that was added for hierarchical consistency
-            for cat, score in results:
-                if cat in self.child_to_parent and score > top_child_score:
-                    top_child_category = cat
-                    top_child_score = score
+        Returns:
+            (N x D) array of embeddings aligned with texts
+        """
+        segments, owners, lengths = self._apply_truncation(texts)
+        
+        segment_embeddings = [None] * len(segments)
+        for bucket in self._bucket_batches(lengths, batch_size):
+            encoded = np.asarray(self.model.encode([segments[i] for i in bucket], batch_size=len(bucket)))
+            for i, vector in zip(bucket, encoded):
+                segment_embeddings[i] = vector
+        segment_embeddings = np.vstack(segment_embeddings)
+        
+        if len(segments) == len(texts):
+            return segment_embeddings
+        
+        # chunk policy: average the window embeddings of each text
+        owners = np.asarray(owners)
+        embeddings = np.zeros((len(texts), segment_embeddings.shape[1]), dtype=segment_embeddings.dtype)
+        np.add.at(embeddings, owners, segment_embeddings)
+        embeddings /= np.bincount(owners, minlength=len(texts))[:, np.newaxis]
+        return embeddings
+
+    def _max_tokens(self) -> int:
+        """Token window of the model, special tokens included"""
+        return int(getattr(self.model, "max_seq_length", None) or 512)
+
+    def _apply_truncation(self, texts: List[str]) -> Tuple[List[str], List[int], List[int]]:
+        """
+        Apply the truncation policy to texts over the model's max sequence length.
+        
+        Args:
+            texts: Cleaned texts
             
-            # If we didn't find any child categories in results, check all_similarities
-            if top_child_category is None:
-                for cat, score in all_similarities:
-                    if cat in self.child_to_parent and score > top_child_score:
-                        # Only add if it's reasonably close to the threshold
-                        if score >= child_threshold * 0.5:
-                            top_child_category = cat
-                            top_child_score = score
+        Returns:
+            Tuple of (segments to encode, index of the text each segment belongs
+            to, token length of each segment)
+        """
+        max_tokens = self._max_tokens()
+        tokenizer = getattr(self.model, "tokenizer", None)
+        if tokenizer is None:
+            # No tokenizer to measure with: approximate by words, let the model truncate
+            lengths = [min(len(text.split()) + 2, max_tokens) for text in texts]
+            return list(texts), list(range(len(texts))), lengths
+        
+        token_ids = tokenizer(list(texts), add_special_tokens=False, truncation=False)["input_ids"]
+        window = max(1, max_tokens - 2)  # room for [CLS] and [SEP]
+        
+        segments, owners, lengths = [], [], []
+        truncated = 0
+        for i, (text, ids) in enumerate(zip(texts, token_ids)):
+            if len(ids) <= window:
+                segments.append(text)
+                owners.append(i)
+                lengths.append(len(ids) + 2)
+                continue
             
-            result = {
-                'original_text': original_text,
-                'cleaned_text': text,
-                'categories': categories,
-                'confidence_scores': confidence_scores,
-                'hierarchy_info': hierarchy_info,
-                'status': 'processed'
-            }
+            truncated += 1
+            if self.truncation == "head":
+                # The model keeps the first window of tokens
+                pieces = [text]
+            elif self.truncation == "head_tail":
+                head = int(window * HEAD_TAIL_RATIO)
+                tail = window - head
+                pieces = [tokenizer.decode(ids[:head]) + " " + tokenizer.decode(ids[-tail:])]
+            else:
+                pieces = [tokenizer.decode(ids[start:start + window]) for start in range(0, len(ids), window)]
             
-            # Add top child category if found
-            if top_child_category:
-                result['top_child_category'] = top_child_category
-                result['top_child_score'] = top_child_score
+            for piece in pieces:
+                segments.append(piece)
+                owners.append(i)
+                lengths.append(max_tokens)
+        
+        if truncated:
+            self.truncated_texts += truncated
+            logger.info(
+                f"{truncated} of {len(texts)} texts exceed {max_tokens} tokens "
+                f"(truncation={self.truncation})"
+            )
+        return segments, owners, lengths
+
+    def _bucket_batches(self, lengths: List[int], batch_size: int) -> List[List[int]]:
+        """
+        Group segment indices into batches of similar token length.
+        
+        Args:
+            lengths: Token length of each segment
+            batch_size: Maximum number of segments per batch
             
-            return result
+        Returns:
+            List of batches, each a list of segment indices
+        """
+        order = np.argsort(np.asarray(lengths), kind='stable')
+        
+        batches = []
+        current = []
+        for i in order:
+            # Lengths are ascending, so the newest item sets the padded length
+            padded_tokens = int(lengths[i]) * (len(current) + 1)
+            if current and (len(current) >= batch_size or padded_tokens > self.token_budget):
+                batches.append(current)
+                current = []
+            current.append(int(i))
+        if current:
+            batches.append(current)
+        return batches
+
+    def _compute_similarities(self, text_embeddings: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Calculate cosine similarities between text embeddings and all categories.
+
+        Args:
+            text_embeddings: (N x D) array of text embeddings
+
+        Returns:
+            Tuple of the (N x C) similarity matrix and an (N,) mask of zero-norm embeddings.
+            With knn scoring the matrix holds neighbour vote scores instead.
+        """
+        # Proper normalization for cosine similarity
+        text_norms = np.linalg.norm(text_embeddings, axis=1)
+        zero_norm = text_norms == 0
+        safe_norms = np.where(zero_norm, 1.0, text_norms)
+        text_embeddings_normalized = text_embeddings / safe_norms[:, np.newaxis]
+
+        if self.knn_index is not None:
+            similarity_matrix = self.knn_index.category_scores(text_embeddings_normalized, self.categories)
+            return similarity_matrix, zero_norm
+
+        # Category vectors are already unit length (normalized at load or package time)
+        similarity_matrix = text_embeddings_normalized @ self.category_vectors.T
+        return similarity_matrix, zero_norm
+
+    def _rank_categories(self, similarity_matrix: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Threshold and rank a matrix of similarity scores with array operations.
+
+        Args:
+            similarity_matrix: (N x C) cosine similarities, or vote shares with knn scoring
+
+        Returns:
+            Dictionary of per-row arrays:
+                ranked: (N x K) category indices above threshold, best first
+                counts: (N,) number of valid entries in each row of ranked
+                best: (N,) index of the best scoring category
+                top_child: (N,) index of the best scoring child category (-1 if none)
+        """
+        num_rows, num_categories = similarity_matrix.shape
+        rows = np.arange(num_rows)
+
+        # Threshold mask with per-category thresholds
+        above = similarity_matrix >= self._thresholds
+        counts = above.sum(axis=1)
+        masked = np.where(above, similarity_matrix, -np.inf)
+
+        # Top-k selection: only the K = max(count) best columns need to be sorted
+        k = int(counts.max()) if num_rows else 0
+        if k == 0:
+            ranked = np.zeros((num_rows, 0), dtype=np.int64)
+        else:
+            if k < num_categories:
+                top = np.argpartition(-masked, k - 1, axis=1)[:, :k]
+            else:
+                top = np.tile(np.arange(num_categories), (num_rows, 1))
+            top_scores = np.take_along_axis(masked, top, axis=1)
+            ranked = np.take_along_axis(top, np.argsort(-top_scores, axis=1, kind='stable'), axis=1)
+
+        best = np.argmax(similarity_matrix, axis=1)
+
+        # Best child per row, kept only if it is reasonably close to the child threshold
+        top_child = np.full(num_rows, -1, dtype=np.int64)
+        if self._is_child.any():
+            child_scores = np.where(self._is_child, similarity_matrix, -np.inf)
+            best_child = np.argmax(child_scores, axis=1)
+            best_child_score = child_scores[rows, best_child]
+            keep = (best_child_score > 0) & (best_child_score >= self._top_child_min_score)
+            top_child = np.where(keep, best_child, -1)
+
+        return {"ranked": ranked, "counts": counts, "best": best, "top_child": top_child}
+
+    def _predict_from_embeddings(self, texts: List[str], original_texts: List[str], embeddings: np.ndarray) -> List[Dict]:
+        """
+        Score, threshold and rank a batch of embeddings.
+
+        Args:
+            texts: Cleaned texts
+            original_texts: Original texts, aligned with texts
+            embeddings: (N x D) embeddings, aligned with texts
+
+        Returns:
+            List of prediction dictionaries, one per text
+        """
+        similarity_matrix, zero_norm = self._compute_similarities(np.asarray(embeddings))
+        ranking = self._rank_categories(similarity_matrix)
+
+        predictions = []
+        for row, (text, original_text) in enumerate(zip(texts, original_texts)):
+            try:
+                if zero_norm[row]:
+                    logger.warning("Text embedding has zero norm, cannot calculate similarities")
+                    predictions.append(self._zero_norm_result(text, original_text))
+                    continue
+                predictions.append(self._build_prediction(
+                    text,
+                    original_text,
+                    similarity_matrix[row],
+                    ranking["ranked"][row, :ranking["counts"][row]],
+                    int(ranking["best"][row]),
+                    int(ranking["top_child"][row])
+                ))
+            except Exception as e:
+                logger.error(f"Error in category prediction: {str(e)}")
+                predictions.append(self._error_result(text, original_text, e))
+        return predictions
+
+    def _zero_norm_result(self, text: str, original_text: str) -> Dict:
+        """Result returned when a text embeds to the zero vector."""
+        return {
+            'original_text': original_text,
+            'cleaned_text': text,
+            'categories': ['null'],
+            'confidence_scores': {},
+            'status': 'error',
+            'error': 'Zero embedding vector'
+        }
+
+    def _error_result(self, text: str, original_text: str, error: Exception) -> Dict:
+        """Result returned when prediction fails."""
+        return {
+            'original_text': original_text,
+            'cleaned_text': text,
+            'categories': ['error'],
+            'confidence_scores': {},
+            'status': 'error',
+            'error': str(error)
+        }
+
+    def _build_prediction(
+        self,
+        text: str,
+        original_text: str,
+        similarities: np.ndarray,
+        ranked: np.ndarray,
+        best: int,
+        top_child: int
+    ) -> Dict:
+        """
+        Turn the ranked scores of one text into a prediction result.
+
+        Args:
+            text: Cleaned text
+            original_text: Original text
+            similarities: Cosine similarity (or knn vote share) with each category
+            ranked: Indices of categories above threshold, best first
+            best: Index of the best scoring category
+            top_child: Index of the best scoring child category, or -1
+
+        Returns:
+            Prediction dictionary
+        """
+        # If no categories above threshold
+        if len(ranked) == 0:
+            best_cat = self.categories[best]
+            max_score = float(similarities[best])
             
-        except Exception as e:
-            logger.error(f"Error in category prediction: {str(e)}")
+            # Check if the max score is close to threshold
+            if max_score > self._low_confidence_score:  # Close to the threshold (centroid scoring only)
+                # Check if it's a child category that's close to the child threshold
+                if self._is_child[best] and max_score > self._low_confidence_child_score:
+                    status = 'low_confidence_child'  # Mark as low confidence child
+                else:
+                    status = 'low_confidence'  # Return best match but mark as low confidence
+                return {
+                    'original_text': original_text,
+                    'cleaned_text': text,
+                    'categories': [best_cat],
+                    'confidence_scores': {best_cat: max_score},
+                    'status': status
+                }
+            # No good match at all
             return {
                 'original_text': original_text,
                 'cleaned_text': text,
-                'categories': ['error'],
+                'categories': ['no_category'],
                 'confidence_scores': {},
-                'status': 'error',
-                'error': str(e)
+                'status': 'no_match'
             }
-    
-    def _process_hierarchical_results(self, results: List[Tuple[str, float]]) -> List[Tuple[str, float]]:
+        
+        # If not multi-label, only return the top category if it's above threshold
+        if not self.multi_label:
+            ranked = ranked[:1]
+        
+        # Process results to handle hierarchy (add missing parent categories)
+        label_ids, label_scores = self._add_parent_categories(ranked, similarities)
+        
+        # Extract categories and scores
+        categories = [self._labels[i] for i in label_ids]
+        confidence_scores = {self._labels[i]: float(score) for i, score in zip(label_ids, label_scores)}
+        
+        # Create hierarchy info for results
+        hierarchy_info = self._create_hierarchy_info(categories)
+        
+        result = {
+            'original_text': original_text,
+            'cleaned_text': text,
+            'categories': categories,
+            'confidence_scores': confidence_scores,
+            'hierarchy_info': hierarchy_info,
+            'status': 'processed'
+        }
+        
+        # Add top child category if found
+        if top_child >= 0:
+            result['top_child_category'] = self.categories[top_child]
+            result['top_child_score'] = float(similarities[top_child])
+        
+        return result
+
+    def _add_parent_categories(self, ranked: np.ndarray, similarities: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
         """
-        Process results to include parent categories when child categories are detected.
+        Add parent categories when child categories are detected.
+        
+        A parent that was not matched itself gets the score of its highest
+        scoring child.
         
         Args:
-            results: List of (category, score) tuples
+            ranked: Indices of matched categories, best first
+            similarities: Cosine similarity (or knn vote share) with each category
             
         Returns:
-            Processed list of (category, score) tuples with parent categories added
+            Tuple of label indices and scores, sorted by score (descending)
         """
-        processed_results = []
-        seen_categories = set()
+        scores = similarities[ranked]
         
-        # First pass: add all direct matches
-        for cat, score in results:
-            if cat not in seen_categories:
-                processed_results.append((cat, score))
-                seen_categories.add(cat)
+        child_mask = self._is_child[ranked]
+        if not child_mask.any():
+            return ranked, scores
         
-        # Second pass: add parent categories for any children that were detected
-        for cat, score in results:
-            if cat in self.child_to_parent:
-                parent = self.child_to_parent[cat]
-                if parent not in seen_categories:
-                    # Add parent with the same score as the highest scoring child
-                    processed_results.append((parent, score))
-                    seen_categories.add(parent)
+        # Ranked is best first, so the first occurrence of each parent is its best child
+        parent_ids = self._parent_index[ranked[child_mask]]
+        unique_parents, first = np.unique(parent_ids, return_index=True)
+        parent_scores = scores[child_mask][first]
+        
+        # Skip parents that were matched directly
+        missing = ~np.isin(unique_parents, ranked)
+        
+        label_ids = np.concatenate([ranked, unique_parents[missing]])
+        label_scores = np.concatenate([scores, parent_scores[missing]])
         
         # Sort processed results by score
-        return sorted(processed_results, key=lambda x: x[1], reverse=True)
-    
+        order = np.argsort(-label_scores, kind='stable')
+        return label_ids[order], label_scores[order]
+
     def _create_hierarchy_info(self, categories: List[str]) -> Dict:
         """
         Create hierarchy information for the predicted categories.
@@ -478,16 +1041,90 @@ def find_model_path(root_path):
 # Global variable to store the classifier instance (initialize on first use)
 _classifier = None
 
-def ensure_model_compatibility(model_dir):
-    safetensors_path = os.path.join(model_dir, "model.safetensors")
-    if os.path.exists(safetensors_path) and not os.path.exists(os.path.join(model_dir, "pytorch_model.bin")):
-        # Create symlink or copy - symlink might not work in all environments
-        shutil.copy(safetensors_path, os.path.join(model_dir, "pytorch_model.bin"))
-        logger.info("Created compatible model file from safetensors")
+def resolve_package_paths(root_path):
+    """
+    Resolve the file paths of a vector model package.
+    
+    Uses the manifest written at package build time (see modelPackage.py) when
+    present, so no directory search happens on cold start. Packages without a
+    manifest fall back to find_model_path.
+    
+    Args:
+        root_path: Root directory of the vector model package
+        
+    Returns:
+        Dictionary of paths used to construct the VectorClassifier
+    """
+    manifest = load_manifest(root_path)
+    if manifest is not None:
+        logger.info(f"Using model manifest: weights={manifest['weights_path']} ({manifest['weights_format']})")
+        return manifest
+    
+    logger.warning(f"No model manifest found in {root_path}, searching for the model directory")
+    return {
+        "model_path": find_model_path(root_path),
+        "weights_path": None,
+        "weights_format": None,
+        "category_embeddings_path": os.path.join(root_path, "category_embeddings.json"),
+        "category_vectors_path": os.path.join(root_path, "category_vectors.npy"),
+        "category_labels_path": os.path.join(root_path, "category_labels.json"),
+        "metadata_path": os.path.join(root_path, "metadata.json"),
+        "knn_index_path": os.path.join(root_path, "knn_index.json"),
+    }
+
+def build_classifier(root_path):
+    """
+    Construct a VectorClassifier for the package at root_path.
+    
+    Args:
+        root_path: Root directory of the vector model package
+        
+    Returns:
+        Initialized VectorClassifier
+    """
+    paths = resolve_package_paths(root_path)
+    
+    # Verify paths
+    logger.info(f"Using model path: {paths['model_path']}")
+    logger.info(f"Using category embeddings path: {paths['category_embeddings_path']}")
+    if paths['metadata_path'] and os.path.exists(paths['metadata_path']):
+        logger.info(f"Using metadata path: {paths['metadata_path']}")
+    else:
+        logger.warning(f"Metadata file not found at: {paths['metadata_path']}")
+    
+    return VectorClassifier(
+        model_path=paths['model_path'],
+        category_embeddings_path=paths['category_embeddings_path'],
+        metadata_path=paths['metadata_path'],
+        threshold=THRESHOLD,
+        multi_label=MULTI_LABEL,
+        category_vectors_path=paths['category_vectors_path'],
+        category_labels_path=paths['category_labels_path'],
+        embedding_cache_path=CACHE_PATH if CACHE_ENABLED else None,
+        backend=BACKEND,
+        weights_format=paths['weights_format'],
+        scoring=SCORING,
+        knn_index_path=paths.get('knn_index_path'),
+        knn_threshold=KNN_THRESHOLD,
+        token_budget=TOKEN_BUDGET,
+        truncation=TRUNCATION
+    )
+
+# Registry serving versioned packages from VERSIONS_DIR (hot reload)
+_registry = ModelRegistry("vector", VERSIONS_DIR, build_classifier) if VERSIONS_DIR else None
+
+def get_model_registry():
+    """Get the vector model registry, or None when versioned packages are not used."""
+    return _registry
 
 def get_classifier():
     """Get or initialize the classifier instance."""
     global _classifier
+    
+    # Versioned packages: the registry loads, watches and swaps them
+    if _registry is not None:
+        return _registry.get()
+    
     if _classifier is None:
         try:
             start_time = time.time()
@@ -501,33 +1138,9 @@ def get_classifier():
             if os.path.exists(MODEL_ROOT):
                 logger.info(f"Contents of MODEL_ROOT: {os.listdir(MODEL_ROOT)}")
                 
-                # Find model directory looking for safetensors
-                model_path = find_model_path(MODEL_ROOT)
-                
-                # Ensure model compatibility - add this line
-                ensure_model_compatibility(model_path)
-                
-                # Get category embeddings and metadata paths
-                category_embeddings_path = os.path.join(MODEL_ROOT, "category_embeddings.json")
-                metadata_path = os.path.join(MODEL_ROOT, "metadata.json")
-                
-                # Verify paths
-                logger.info(f"Using model path: {model_path}")
-                logger.info(f"Using category embeddings path: {category_embeddings_path}")
-                if os.path.exists(metadata_path):
-                    logger.info(f"Using metadata path: {metadata_path}")
-                else:
-                    logger.warning(f"Metadata file not found at: {metadata_path}")
-                
                 # Initialize the classifier
-                _classifier = VectorClassifier(
-                    model_path=model_path,
-                    category_embeddings_path=category_embeddings_path,
-                    metadata_path=metadata_path,
-                    threshold=THRESHOLD,
-                    multi_label=MULTI_LABEL
-                )
-                logger.info(f"Initialized classifier with threshold={THRESHOLD}, multi_label={MULTI_LABEL}")
+                _classifier = build_classifier(MODEL_ROOT)
+                logger.info(f"Initialized classifier with threshold={THRESHOLD}, multi_label={MULTI_LABEL}, backend={BACKEND}, scoring={SCORING}")
             else:
                 logger.error(f"MODEL_ROOT does not exist: {MODEL_ROOT}")
                 # Try alternative paths
@@ -540,20 +1153,9 @@ def get_classifier():
                 for alt_path in alternative_paths:
                     if os.path.exists(alt_path):
                         logger.info(f"Found alternative path: {alt_path}")
-                        model_path = find_model_path(alt_path)
-                        # Add model compatibility check here too
-                        ensure_model_compatibility(model_path)
-                        category_embeddings_path = os.path.join(alt_path, "category_embeddings.json")
-                        metadata_path = os.path.join(alt_path, "metadata.json")
                         
                         # Initialize classifier with alternative paths
-                        _classifier = VectorClassifier(
-                            model_path=model_path,
-                            category_embeddings_path=category_embeddings_path,
-                            metadata_path=metadata_path,
-                            threshold=THRESHOLD,
-                            multi_label=MULTI_LABEL
-                        )
+                        _classifier = build_classifier(alt_path)
                         logger.info(f"Initialized classifier with alternative paths")
                         break
                 
@@ -572,6 +1174,76 @@ def get_classifier():
     
     return _classifier  # Make sure this return statement is present
 
+def get_embedding_cache_stats():
+    """
+    Get hit/miss counters of the embedding cache.
+    
+    Returns:
+        Dictionary of cache counters, or None if the classifier is not loaded
+        or caching is disabled
+    """
+    classifier = _registry.current if _registry is not None else _classifier
+    if classifier is None or classifier.embedding_cache is None:
+        return None
+    return classifier.embedding_cache.stats()
+
+def _format_classification(classification_result: Dict, classifier: VectorClassifier) -> List[Dict]:
+    """
+    Format a prediction result into the structure returned by categorize.
+
+    Args:
+        classification_result: Output of VectorClassifier.predict_categories
+        classifier: Classifier that produced the result
+
+    Returns:
+        List containing one item with classification results in the desired format
+    """
+    # Format the result
+    confidence_scores = classification_result.get("confidence_scores", {})
+    categories = classification_result.get("categories", [])
+
+    # Get top child category from result
+    top_child_category = classification_result.get("top_child_category", None)
+    top_child_score = classification_result.get("top_child_score", 0)
+
+    # Find parent category (assume first category that's a parent)
+    parent_category = None
+    parent_score = 0
+
+    for cat in categories:
+        if cat in classifier.category_hierarchy:  # If it's a parent category
+            parent_category = cat
+            parent_score = confidence_scores.get(cat, 0)
+            break
+
+    # Make sure to format scores as strings with 2 decimal places
+    parent_score_str = f"{parent_score:.2f}" if parent_score else ""
+    child_score_str = f"{top_child_score:.2f}" if top_child_score else ""
+
+    # Create return object with the new desired structure
+    return [{
+        "classification": {
+            "parent_category": parent_category or "",
+            "parent_confidence_score": parent_score_str,
+            "child_category": top_child_category or "",
+            "child_confidence_score": child_score_str,
+            "all_confidence_scores": confidence_scores,
+            "all_categories": categories
+        }
+    }]
+
+def _error_classification(error: Exception) -> List[Dict]:
+    """Return a properly structured fallback response."""
+    return [{
+        "classification": {
+            "parent_category": "Error",
+            "parent_confidence_score": "",
+            "child_category": "",
+            "child_confidence_score": "",
+            "error": str(error)
+        }
+    }]
+
 def categorize(text):
     """
     Main function to categorize text with separate parent and child categories.
@@ -594,72 +1266,54 @@ def categorize(text):
         
         # Get classification result
         classification_result = classifier.predict_categories(cleaned_text, original_text)
+        result = _format_classification(classification_result, classifier)
         
-        # Format the result
-        confidence_scores = classification_result.get("confidence_scores", {})
-        categories = classification_result.get("categories", [])
-        hierarchy_info = classification_result.get("hierarchy_info", {})
-        
-        # Get top child category from result
-        top_child_category = classification_result.get("top_child_category", None)
-        top_child_score = classification_result.get("top_child_score", 0)
-        
-        # Find parent category (assume first category that's a parent)
-        parent_category = None
-        parent_score = 0
-        
-        for cat in categories:
-            if cat in classifier.category_hierarchy:  # If it's a parent category
-                parent_category = cat
-                parent_score = confidence_scores.get(cat, 0)
-                break
-        
-        # Make sure to format scores as strings with 2 decimal places
-        parent_score_str = f"{parent_score:.2f}" if parent_score else ""
-        child_score_str = f"{top_child_score:.2f}" if top_child_score else ""
-        
-        # Create return object with the new desired structure
-        result = [{
-            "classification": {
-                "parent_category": parent_category or "",
-                "parent_confidence_score": parent_score_str,
-                "child_category": top_child_category or "",
-                "child_confidence_score": child_score_str,
-                "all_confidence_scores": confidence_scores,
-                "all_categories": categories
-            }
-        }]
-        
-        logger.info(f"Categorization complete. Parent: {parent_category}, Child: {top_child_category}")
+        classification = result[0]["classification"]
+        logger.info(f"Categorization complete. Parent: {classification['parent_category']}, Child: {classification['child_category']}")
         return result
         
     except Exception as e:
         logger.error(f"Error in categorize function: {str(e)}")
         import traceback
         logger.error(traceback.format_exc())
-        # Return a properly structured fallback response
-        return [{
-            "classification": {
-                "parent_category": "Error",
-                "parent_confidence_score": "",
-                "child_category": "",
-                "child_confidence_score": "",
-                "error": str(e)
-            }
-        }]
+        return _error_classification(e)
+
+def categorize_many(texts, batch_size=None):
+    """
+    Categorize many texts with a single batched encoder pass.
+    
+    Args:
+        texts: List of texts to categorize
+        batch_size: Encoder batch size (defaults to VECTOR_BATCH_SIZE)
         
-        # Also include the full data for backward compatibility
-        result[0]["classification"]["all_confidence_scores"] = confidence_scores
-        result[0]["classification"]["all_categories"] = categories
+    Returns:
+        List with one categorize-style result per input text, in input order
+    """
+    if batch_size is None:
+        batch_size = BATCH_SIZE
+    logger.info(f"Categorizing {len(texts)} texts in batches of {batch_size}")
+    
+    try:
+        classifier = get_classifier()
         
-        logger.info(f"Categorization complete. Parent: {parent_category}, Child: {top_child_category}")
-        return result
+        original_texts = list(texts)
+        cleaned_texts = [clean_text(text) for text in original_texts]
+        
+        classification_results = classifier.predict_categories_batch(
+            cleaned_texts, original_texts, batch_size=batch_size
+        )
+        
+        results = [_format_classification(r, classifier) for r in classification_results]
+        logger.info(f"Batch categorization complete for {len(results)} texts")
+        if classifier.embedding_cache is not None:
+            logger.info(f"Embedding cache stats: {classifier.embedding_cache.stats()}")
+        return results
         
     except Exception as e:
-        logger.error(f"Error in categorize function: {str(e)}")
+        logger.error(f"Error in categorize_many function: {str(e)}")
         import traceback
         logger.error(traceback.format_exc())
-        return [{"classification": {"error": str(e)}}]
+        return [_error_classification(e) for _ in texts]
 
 # For testing
 if __name__ == "__main__":
@@ -9,6 +9,9 @@ logger = logging.getLogger("json-processor-api")
 # Import dependencies at module level
 from aiLoader import loadAI
 from imageAnalysis import analyzePhoto
+from llmCache import make_key, cached_response
+from openaiScheduler import create_chat_completion
+from stageMetrics import stage_scope
 
 # Constants
 PROMPT_PART_1 = "Each of the paragraphs in this string between the <start> and <end> tags are descriptions of an image. Each image is a frame from a single video. Use the descriptions of each frame to generate a summary of what the video is depicting. <start>"
@@ -66,7 +69,8 @@ def summarize(framesDir, client=None):
     logger.info(f"Generating summary for frames in: {framesDir}")
     
     # Get frame analysis log
-    responseLog = logFrames(framesDir)
+    with stage_scope("frame_analysis"):
+        responseLog = logFrames(framesDir)
     
     if not responseLog:
         logger.warning("No frame data to summarize")
@@ -75,15 +79,20 @@ def summarize(framesDir, client=None):
     # Generate summary
     try:
         logger.info("Sending frame descriptions for summarization")
-        completion = client.chat.completions.create(
-            model="gpt-4o",
-            store=True,
-            messages=[
-                {"role": "user", "content": PROMPT_PART_1 + responseLog + PROMPT_PART_2}
-            ]
-        )
+        messages = [
+            {"role": "user", "content": PROMPT_PART_1 + responseLog + PROMPT_PART_2}
+        ]
         
-        summary = completion.choices[0].message.content.strip()
+        def fetch():
+            completion = create_chat_completion(
+                client,
+                model="gpt-4o",
+                store=True,
+                messages=messages
+            )
+            return completion.choices[0].message.content
+        
+        summary = cached_response(make_key("gpt-4o", messages), fetch).strip()
         logger.info(f"Summary generated: {summary[:50]}...")
         return summary
     except Exception as e:
@@ -0,0 +1,127 @@
+import os
+import logging
+import multiprocessing
+import threading
+from typing import Iterator, List, Tuple
+
+# Set up logging
+logger = logging.getLogger("json-processor-api")
+
+# =====================================================================
+# CONFIGURATION - Use environment variables for Cloud Run compatibility
+# =====================================================================
+
+# Number of worker processes; 0 or 1 keeps everything in the request thread
+WORKERS = int(os.environ.get("PROCESSING_WORKERS", "0"))
+
+# Number of message texts sent to a worker at a time
+CHUNK_SIZE = int(os.environ.get("PROCESSING_CHUNK_SIZE", "64"))
+
+# "spawn" avoids inheriting torch thread pools and locks from the parent process
+START_METHOD = os.environ.get("PROCESSING_START_METHOD", "spawn")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Set once the pool has failed; processing stays in-process afterwards
+_disabled = False
+
+# In a worker: why its models could not be loaded, if they could not
+_init_error = None
+
+class WorkerInitError(RuntimeError):
+    """Raised by tasks of a worker whose models failed to load."""
+
+def pool_enabled():
+    """Whether finalize processing should use the worker pool"""
+    return WORKERS > 1 and not _disabled
+
+def _init_worker(workers):
+    """Load the vector and NER models once per worker process"""
+    global _init_error
+
+    # Split the vCPUs between workers instead of every worker using all of them
+    try:
+        import torch
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // workers))
+    except ImportError:
+        pass
+
+    # An exception here would make the pool replace the worker forever and
+    # leave imap waiting, so the error is raised by the worker's tasks instead
+    try:
+        from vectorImplementation import get_classifier
+        from nerImplementation import setup_nlp_pipeline
+
+        get_classifier()
+        setup_nlp_pipeline()
+    except Exception as e:
+        _init_error = f"{type(e).__name__}: {e}"
+        logger.error(f"Worker {os.getpid()} could not load models: {_init_error}")
+        return
+    logger.info(f"Worker {os.getpid()} loaded vector and NER models")
+
+def _process_chunk(texts):
+    """Categorize a chunk of texts and extract their location names"""
+    if _init_error is not None:
+        raise WorkerInitError(f"Worker {os.getpid()} could not load models: {_init_error}")
+
+    from vectorImplementation import categorize_many
+    from nerImplementation import extractLocationNamesBatch
+
+    categories = categorize_many(texts)
+
+    try:
+        # The pool already provides the parallelism, so spaCy stays single-process here
+        location_names = extractLocationNamesBatch(texts, n_process=1)
+    except Exception as e:
+        logger.error(f"Error extracting locations in worker: {e}")
+        location_names = [[] for _ in texts]
+
+    return categories, location_names
+
+def get_pool():
+    """Get or start the worker pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            logger.info(f"Starting worker pool with {WORKERS} processes ({START_METHOD})")
+            context = multiprocessing.get_context(START_METHOD)
+            _pool = context.Pool(processes=WORKERS, initializer=_init_worker, initargs=(WORKERS,))
+        return _pool
+
+def disable_pool():
+    """Stop the worker pool and process in the request thread from now on"""
+    global _pool, _disabled
+    with _pool_lock:
+        _disabled = True
+        if _pool is not None:
+            _pool.terminate()
+            _pool.join()
+            _pool = None
+
+def iter_process_texts(texts: List[str]) -> Iterator[Tuple[List, List[List[str]]]]:
+    """
+    Categorize texts and extract their location names using the worker pool,
+    yielding results chunk by chunk as the workers finish them.
+
+    Texts are split into chunks of PROCESSING_CHUNK_SIZE and spread over the
+    worker processes. Geocoding is not done here, so the caller keeps control
+    of the rate at which the geocoding provider is called, and can start
+    geocoding a chunk while later chunks are still being processed.
+
+    Args:
+        texts: Fused message texts
+
+    Yields:
+        Tuples of (categorize results, location names) per chunk, in input order
+
+    Raises:
+        WorkerInitError: If the workers could not load the models
+    """
+    chunks = [texts[i:i + CHUNK_SIZE] for i in range(0, len(texts), CHUNK_SIZE)]
+    logger.info(f"Sending {len(texts)} texts to {WORKERS} workers in {len(chunks)} chunks")
+
+    # imap keeps the chunks in input order
+    for chunk_categories, chunk_locations in get_pool().imap(_process_chunk, chunks):
+        yield chunk_categories, chunk_locations
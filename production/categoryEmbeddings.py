@@ -1,7 +1,40 @@
 import json
+import os
 from sentence_transformers import SentenceTransformer
 import numpy as np
 from collections import defaultdict
+from typing import Dict, List
+
+def save_category_artifact(category_embeddings: Dict[str, np.ndarray], output_dir: str):
+    """
+    Save the compiled category artifact used by the classifier at runtime.
+
+    Writes category_vectors.npy (pre-normalized float32, one row per label)
+    and category_labels.json (the label order for those rows). The runtime
+    memory-maps the .npy file instead of parsing category_embeddings.json.
+    """
+    labels = list(category_embeddings.keys())
+    vectors = np.array([category_embeddings[label] for label in labels], dtype=np.float32)
+
+    # Pre-normalize so the classifier can use a plain dot product
+    norms = np.linalg.norm(vectors, axis=1)
+    norms[norms == 0] = 1.0
+    vectors = vectors / norms[:, np.newaxis]
+
+    os.makedirs(output_dir, exist_ok=True)
+    vectors_path = os.path.join(output_dir, "category_vectors.npy")
+    labels_path = os.path.join(output_dir, "category_labels.json")
+
+    np.save(vectors_path, np.ascontiguousarray(vectors, dtype=np.float32))
+    with open(labels_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            "labels": labels,
+            "dimension": int(vectors.shape[1]),
+            "dtype": "float32",
+            "normalized": True
+        }, f, indent=2)
+
+    print(f"Compiled category artifact saved to {vectors_path} and {labels_path}")
 
 def generate_category_embeddings(model_path: str, training_data_path: str, output_path: str):
     """
@@ -36,10 +69,103 @@ def generate_category_embeddings(model_path: str, training_data_path: str, outpu
     
     print(f"\nCategory embeddings saved to {output_path}")
 
+    # Write the compiled artifact alongside the JSON
+    save_category_artifact(category_embeddings, os.path.dirname(os.path.abspath(output_path)))
+
+def build_ivf_lists(vectors: np.ndarray, nlist: int, iterations: int = 20, seed: int = 42):
+    """
+    Cluster unit-length vectors into inverted lists with spherical k-means.
+
+    Returns the list centroids and the list assignment of every vector.
+    """
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        for c in range(nlist):
+            members = vectors[assignment == c]
+            if len(members):
+                mean = members.sum(axis=0)
+                centroids[c] = mean / max(np.linalg.norm(mean), 1e-12)
+
+    assignment = np.argmax(vectors @ centroids.T, axis=1)
+    return centroids, assignment
+
+def generate_knn_index(model_path: str, training_data_path: str, output_dir: str, nlist: int = None):
+    """
+    Build the nearest neighbour index used by the classifier's knn scoring mode
+    from a saved model and a training data file (see build_knn_index).
+    """
+    print("Loading model and training data for kNN index...")
+    model = SentenceTransformer(model_path)
+
+    with open(training_data_path, 'r', encoding='utf-8') as f:
+        training_data = json.load(f)
+
+    build_knn_index(model, training_data, output_dir, nlist)
+
+def build_knn_index(model: SentenceTransformer, training_data: List[Dict], output_dir: str, nlist: int = None):
+    """
+    Build the nearest neighbour index used by the classifier's knn scoring mode.
+
+    Every labelled training example is embedded and grouped into inverted
+    lists, so the runtime only scans the few lists closest to a query.
+    Writes knn_index.json, knn_vectors.npy, knn_labels.npy, knn_centroids.npy
+    and knn_offsets.npy to output_dir.
+    """
+    examples = [item for item in training_data if item.get('text') and item.get('label')]
+    labels = sorted({category for item in examples for category in item['label']})
+    label_column = {label: i for i, label in enumerate(labels)}
+
+    print(f"Embedding {len(examples)} training examples...")
+    vectors = np.asarray(model.encode([item['text'] for item in examples]), dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1)
+    norms[norms == 0] = 1.0
+    vectors = vectors / norms[:, np.newaxis]
+
+    label_matrix = np.zeros((len(examples), len(labels)), dtype=np.uint8)
+    for row, item in enumerate(examples):
+        for category in item['label']:
+            label_matrix[row, label_column[category]] = 1
+
+    # About sqrt(N) lists keeps both the centroid scan and each list scan small
+    if nlist is None:
+        nlist = max(1, int(np.sqrt(len(examples))))
+    nlist = min(nlist, len(examples))
+    print(f"Clustering into {nlist} inverted lists...")
+    centroids, assignment = build_ivf_lists(vectors, nlist)
+
+    # Store each list as a contiguous block of rows
+    order = np.argsort(assignment, kind='stable')
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=nlist))]).astype(np.int64)
+
+    os.makedirs(output_dir, exist_ok=True)
+    np.save(os.path.join(output_dir, "knn_vectors.npy"), np.ascontiguousarray(vectors[order]))
+    np.save(os.path.join(output_dir, "knn_labels.npy"), np.ascontiguousarray(label_matrix[order]))
+    np.save(os.path.join(output_dir, "knn_centroids.npy"), centroids.astype(np.float32))
+    np.save(os.path.join(output_dir, "knn_offsets.npy"), offsets)
+    with open(os.path.join(output_dir, "knn_index.json"), 'w', encoding='utf-8') as f:
+        json.dump({
+            "labels": labels,
+            "num_examples": len(examples),
+            "nlist": nlist,
+            "dimension": int(vectors.shape[1])
+        }, f, indent=2)
+
+    print(f"kNN index with {len(examples)} examples saved to {output_dir}")
+
 if __name__ == "__main__":
     # Call the function with your specific paths
     generate_category_embeddings(
         model_path="fine_tuned_model3",
         training_data_path="formatted_clean_export.json",
         output_path="category_embeddings.json"
-    )
\ No newline at end of file
+    )
+
+    # Build the nearest neighbour index for knn scoring from the same data
+    generate_knn_index(
+        model_path="fine_tuned_model3",
+        training_data_path="formatted_clean_export.json",
+        output_dir="."
+    )
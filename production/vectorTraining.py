@@ -4,12 +4,19 @@ from torch.utils.data import DataLoader
 import random
 from typing import List, Dict, Tuple
 import os
+import sys
 import numpy as np
 import random
 import torch
 
 # Import our consistent text cleaning function
 from cleanText import clean_text
+from categoryEmbeddings import save_category_artifact, build_knn_index
+
+# Package manifests are built and validated by the runtime's own module,
+# so there is a single manifest schema
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cloudRunBackend"))
+from modelPackage import write_manifest
 
 # Define category hierarchy
 CATEGORY_HIERARCHY = {
@@ -43,7 +50,7 @@ def load_data(file: str) -> List[Dict]:
     except json.JSONDecodeError:
         raise Exception(f"Invalid JSON format in {file}")
 
-def save_model_package(model: SentenceTransformer, labels: List[str], output_dir: str) -> None:
+def save_model_package(model: SentenceTransformer, labels: List[str], output_dir: str, training_data: List[Dict] = None) -> None:
     """
     Save the complete model package including embeddings and metadata.
     
@@ -51,6 +58,8 @@ def save_model_package(model: SentenceTransformer, labels: List[str], output_dir
         model: Trained SentenceTransformer model
         labels: List of category labels
         output_dir: Directory to save the model package
+        training_data: Labelled examples ({"text", "label"}) for the kNN index;
+            without them the package only supports centroid scoring
     """
     try:
         # Create output directory if it doesn't exist
@@ -71,6 +80,9 @@ def save_model_package(model: SentenceTransformer, labels: List[str], output_dir
         with open(embeddings_path, 'w') as f:
             json.dump(category_embeddings, f)
         
+        # 2b. Save the compiled (memory-mappable) category artifact
+        save_category_artifact(category_embeddings, output_dir)
+        
         # 3. Save metadata with hierarchy information
         metadata = {
             "model_type": "sentence_transformer",
@@ -85,12 +97,29 @@ def save_model_package(model: SentenceTransformer, labels: List[str], output_dir
         metadata_path = os.path.join(output_dir, "metadata.json")
         with open(metadata_path, 'w') as f:
             json.dump(metadata, f)
+        
+        # 4. Build the nearest neighbour index for knn scoring, and keep a
+        #    sample of texts for the ONNX accuracy check (onnxExport.py)
+        if training_data:
+            build_knn_index(model, training_data, output_dir)
+            texts = [entry["text"] for entry in training_data if entry.get("text")]
+            sample_texts = random.Random(0).sample(texts, min(len(texts), 1000))
+            with open(os.path.join(output_dir, "sample_texts.json"), 'w', encoding='utf-8') as f:
+                json.dump(sample_texts, f, ensure_ascii=False)
+        
+        # 5. Validate the package and record its resolved files for the runtime
+        write_manifest(output_dir)
             
         print(f"Model package successfully saved to {output_dir}")
         print(f"Package contains:")
         print(f"- Trained model")
         print(f"- Category embeddings for {len(labels)} categories")
+        print(f"- Compiled category vectors (category_vectors.npy, category_labels.json)")
         print(f"- Model metadata with hierarchy information")
+        if training_data:
+            print(f"- kNN index over {len(training_data)} training examples (knn_index.json)")
+            print(f"- Sample texts for the ONNX accuracy check (sample_texts.json)")
+        print(f"- Package manifest (manifest.json)")
         
     except Exception as e:
         print(f"Error saving model package: {str(e)}")
@@ -259,7 +288,7 @@ def train_multi_stage(
         print("Stage 2 training complete.")
     
     # Save the final model package
-    save_model_package(model, labels, output_dir)
+    save_model_package(model, labels, output_dir, training_data=data)
     print(f"Multi-stage training completed and model saved to {output_dir}")
 
 def evaluate_model(model, data, labels):